@@ -0,0 +1,464 @@
+#!/usr/bin/env python3
+from exception import ArithmeticExpressionError
+from functools import lru_cache
+from re import compile
+
+
+# Integers wrap around like the 64-bit integers of bash
+INTEGER_MASK = (1 << 64) - 1
+SIGN_BIT = 1 << 63
+# A number, a variable name or an operator, after optional whitespace
+TOKEN_PATTERN = compile(
+    r"\s*(?:(?P<number>[0-9][0-9A-Za-z_@#]*)|"
+    r"(?P<name>[A-Za-z_][A-Za-z0-9_]*)|"
+    r"(?P<operator><<=|>>=|\*\*|\+\+|--|<<|>>|<=|>=|==|!=|&&|\|\||"
+    r"[-+*/%&^|]=|[-+*/%<>&^|!~?:=(),]))"
+)
+# Digits of the numbers written in a base, in the order of their values
+DIGITS = "0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ@_"
+# Binary operators from the lowest precedence to the highest one
+BINARY_LEVELS = (("||",), ("&&",), ("|",), ("^",), ("&",), ("==", "!="),
+                 ("<", ">", "<=", ">="), ("<<", ">>"), ("+", "-"),
+                 ("*", "/", "%"))
+ASSIGNMENT_OPERATORS = frozenset(["=", "*=", "/=", "%=", "+=", "-=", "<<=",
+                                  ">>=", "&=", "^=", "|="])
+
+
+def wrap(value):
+    """
+    Convert an integer to the value of a signed 64-bit integer
+    """
+    value &= INTEGER_MASK
+    return value - (1 << 64) if value & SIGN_BIT else value
+
+
+#################################
+#           Operators           #
+#################################
+
+
+def divide(left, right):
+    # The quotient is truncated toward zero as in C
+    quotient = abs(left) // abs(right)
+    return wrap(-quotient if (left < 0) != (right < 0) else quotient)
+
+
+def get_remainder(left, right):
+    # The remainder has the sign of the dividend as in C
+    remainder = abs(left) % abs(right)
+    return -remainder if left < 0 else remainder
+
+
+# Functions of the binary operators that cannot fail, the shift count is
+# masked as on x86
+BINARY_FUNCTIONS = {
+    "+": lambda left, right: wrap(left + right),
+    "-": lambda left, right: wrap(left - right),
+    "*": lambda left, right: wrap(left * right),
+    "<<": lambda left, right: wrap(left << (right & 63)),
+    ">>": lambda left, right: left >> (right & 63),
+    "<": lambda left, right: int(left < right),
+    ">": lambda left, right: int(left > right),
+    "<=": lambda left, right: int(left <= right),
+    ">=": lambda left, right: int(left >= right),
+    "==": lambda left, right: int(left == right),
+    "!=": lambda left, right: int(left != right),
+    "&": lambda left, right: left & right,
+    "^": lambda left, right: left ^ right,
+    "|": lambda left, right: left | right
+}
+# Functions of the operators whose right operand can be invalid, with the
+# message of the error
+CHECKED_FUNCTIONS = {
+    "/": (divide, lambda right: right == 0, "division by 0"),
+    "%": (get_remainder, lambda right: right == 0, "division by 0"),
+    "**": (lambda left, right: wrap(pow(left, right, 1 << 64)),
+           lambda right: right < 0, "exponent less than 0")
+}
+UNARY_FUNCTIONS = {
+    "-": lambda value: wrap(-value),
+    "+": lambda value: value,
+    "!": lambda value: int(not value),
+    "~": lambda value: ~value
+}
+
+
+#################################
+#            Numbers            #
+#################################
+
+
+def parse_number(string):
+    """
+    Get the value of an integer constant: a decimal number, an octal number
+    starting with 0, a hexadecimal number starting with 0x, or base#digits
+
+    Output:
+        - The value of the number, None if it isn't valid
+    """
+    base = 10
+    digit_string = string
+    if "#" in string:
+        base_string, _, digit_string = string.partition("#")
+        if not base_string.isdigit() or not 2 <= int(base_string) <= 64:
+            return None
+        base = int(base_string)
+    elif string[:2] in ("0x", "0X"):
+        base = 16
+        digit_string = string[2:]
+    elif string.startswith("0"):
+        base = 8
+    if not digit_string:
+        return None
+    value = 0
+    for char in digit_string:
+        # The letters of the bases up to 36 don't depend on their case
+        digit = DIGITS.find(char.lower() if base <= 36 else char)
+        if digit < 0 or digit >= base:
+            return None
+        value = value * base + digit
+    return wrap(value)
+
+
+#################################
+#            Parser             #
+#################################
+
+
+class Arithmetic_Parser:
+    """
+    Parser of an arithmetic expression that compiles it into a function,
+    which takes the variables of the shell and returns the integer value.
+    Each node of the expression is a tuple of its function, the name of
+    the variable if the node is a single variable, and its value if it is a
+    constant, so that the constant parts are only computed once.
+    """
+
+    def __init__(self, expression):
+        self.expression = expression
+        # List of tuples of the kind, the text and the offset of each token
+        self.token_list = []
+        self.index = 0
+        position = 0
+        while True:
+            match = TOKEN_PATTERN.match(expression, position)
+            if not match:
+                break
+            self.token_list.append((match.lastgroup, match.group(
+                match.lastgroup), match.start(match.lastgroup)))
+            position = match.end()
+        if expression[position:].strip():
+            self.fail("syntax error: invalid arithmetic operator",
+                      expression[position:].strip())
+
+    def fail(self, message, error_token=None):
+        raise ArithmeticExpressionError(
+            "%s: %s%s" % (self.expression, message,
+                          ' (error token is "%s")' % error_token
+                          if error_token is not None else "")
+        )
+
+    def get_rest(self):
+        """
+        Get the text of the expression from the current token
+        """
+        if self.index < len(self.token_list):
+            return self.expression[self.token_list[self.index][2]:]
+        return ""
+
+    def peek(self):
+        if self.index < len(self.token_list):
+            return self.token_list[self.index][1]
+        return None
+
+    def next_token(self):
+        token = self.token_list[self.index]
+        self.index += 1
+        return token
+
+    def split_token(self):
+        """
+        Split a ++ or -- that isn't an increment into two signs
+        """
+        kind, text, offset = self.token_list[self.index]
+        self.token_list[self.index:self.index + 1] = [
+            (kind, text[0], offset), (kind, text[0], offset + 1)
+        ]
+
+    def compile(self):
+        """
+        Compile the whole expression
+
+        Output:
+            - The function of the expression
+        """
+        if not self.token_list:
+            return lambda variables: 0
+        function, _, value = self.parse_comma()
+        if self.index < len(self.token_list):
+            self.fail("syntax error in expression", self.get_rest())
+        if value is not None:
+            return lambda variables: value
+        return function
+
+    #################################
+    #            Levels             #
+    #################################
+
+    def parse_comma(self):
+        node = self.parse_assignment()
+        while self.peek() == ",":
+            self.index += 1
+            left_function = node[0]
+            right_function = self.parse_assignment()[0]
+
+            def evaluate_comma(variables, left_function=left_function,
+                               right_function=right_function):
+                left_function(variables)
+                return right_function(variables)
+            node = (evaluate_comma, None, None)
+        return node
+
+    def parse_assignment(self):
+        node = self.parse_conditional()
+        operator = self.peek()
+        if operator not in ASSIGNMENT_OPERATORS:
+            return node
+        name = node[1]
+        if name is None:
+            self.fail("attempted assignment to non-variable",
+                      self.get_rest())
+        self.index += 1
+        error_rest = self.get_rest()
+        value_function = self.parse_assignment()[0]
+        if operator == "=":
+            def assign(variables):
+                value = value_function(variables)
+                variables[name] = str(value)
+                return value
+            return (assign, None, None)
+        operator = operator[:-1]
+        calculate = self.get_binary_function(operator, error_rest)
+
+        def assign_operation(variables):
+            value = calculate(get_variable_value(variables, name),
+                              value_function(variables))
+            variables[name] = str(value)
+            return value
+        return (assign_operation, None, None)
+
+    def parse_conditional(self):
+        node = self.parse_binary(0)
+        if self.peek() != "?":
+            return node
+        self.index += 1
+        true_function = self.parse_comma()[0]
+        if self.peek() != ":":
+            self.fail("syntax error: `:' expected for conditional "
+                      "expression", self.get_rest())
+        self.index += 1
+        false_function = self.parse_conditional()[0]
+        condition_function = node[0]
+
+        def evaluate_conditional(variables):
+            if condition_function(variables):
+                return true_function(variables)
+            return false_function(variables)
+        return (evaluate_conditional, None, None)
+
+    def get_binary_function(self, operator, error_rest):
+        """
+        Get the function that computes a binary operator from the values of
+        its operands
+
+        Input:
+            - operator: the binary operator
+            - error_rest: the text of the right operand and of the rest of
+            the expression, shown if the operator fails
+        """
+        if operator in BINARY_FUNCTIONS:
+            return BINARY_FUNCTIONS[operator]
+        function, is_invalid, message = CHECKED_FUNCTIONS[operator]
+
+        def calculate(left, right):
+            if is_invalid(right):
+                self.fail(message, error_rest)
+            return function(left, right)
+        return calculate
+
+    def parse_binary(self, level):
+        if level == len(BINARY_LEVELS):
+            return self.parse_power()
+        operator_tuple = BINARY_LEVELS[level]
+        node = self.parse_binary(level + 1)
+        while True:
+            operator = self.peek()
+            # A ++ or -- after an operand is an addition or a subtraction
+            if operator in ("++", "--") and "+" in operator_tuple:
+                self.split_token()
+                operator = operator[0]
+            if operator not in operator_tuple:
+                return node
+            self.index += 1
+            error_rest = self.get_rest()
+            right_node = self.parse_binary(level + 1)
+            node = self.combine(operator, node, right_node, error_rest)
+
+    def combine(self, operator, left_node, right_node, error_rest):
+        """
+        Create the node of a binary operator
+        """
+        left_function, right_function = left_node[0], right_node[0]
+        # The logical operators only evaluate their right operand if it is
+        # needed
+        if operator == "&&":
+            return (lambda variables: int(bool(left_function(variables)) and
+                                          bool(right_function(variables))),
+                    None, None)
+        if operator == "||":
+            return (lambda variables: int(bool(left_function(variables)) or
+                                          bool(right_function(variables))),
+                    None, None)
+        calculate = self.get_binary_function(operator, error_rest)
+        left_value, right_value = left_node[2], right_node[2]
+        if left_value is not None and right_value is not None:
+            # A constant that fails is only an error if it is evaluated
+            try:
+                value = calculate(left_value, right_value)
+                return (lambda variables: value, None, value)
+            except ArithmeticExpressionError:
+                pass
+        return (lambda variables: calculate(left_function(variables),
+                                            right_function(variables)),
+                None, None)
+
+    def parse_power(self):
+        node = self.parse_unary()
+        if self.peek() != "**":
+            return node
+        self.index += 1
+        error_rest = self.get_rest()
+        # The power operator is right associative
+        return self.combine("**", node, self.parse_power(), error_rest)
+
+    def parse_unary(self):
+        operator = self.peek()
+        if operator in ("++", "--"):
+            if (self.index + 1 < len(self.token_list) and
+                    self.token_list[self.index + 1][0] == "name"):
+                self.index += 1
+                name = self.next_token()[1]
+                step = 1 if operator == "++" else -1
+
+                def increment(variables):
+                    value = wrap(get_variable_value(variables, name) + step)
+                    variables[name] = str(value)
+                    return value
+                return (increment, None, None)
+            # Else it is two signs
+            self.split_token()
+            operator = operator[0]
+        if operator not in UNARY_FUNCTIONS:
+            return self.parse_postfix()
+        self.index += 1
+        function, _, value = self.parse_unary()
+        calculate = UNARY_FUNCTIONS[operator]
+        if value is not None:
+            value = calculate(value)
+            return (lambda variables: value, None, value)
+        return (lambda variables: calculate(function(variables)), None, None)
+
+    def parse_postfix(self):
+        node = self.parse_primary()
+        name = node[1]
+        operator = self.peek()
+        if name is None or operator not in ("++", "--"):
+            return node
+        self.index += 1
+        step = 1 if operator == "++" else -1
+
+        def increment(variables):
+            value = get_variable_value(variables, name)
+            variables[name] = str(wrap(value + step))
+            return value
+        return (increment, None, None)
+
+    def parse_primary(self):
+        if self.index == len(self.token_list):
+            self.fail("syntax error: operand expected",
+                      self.token_list[-1][1])
+        kind, text, _ = self.token_list[self.index]
+        if kind == "number":
+            value = parse_number(text)
+            if value is None:
+                self.fail("value too great for base", text)
+            self.index += 1
+            return (lambda variables: value, None, value)
+        if kind == "name":
+            self.index += 1
+            return (lambda variables: get_variable_value(variables, text),
+                    text, None)
+        if text == "(":
+            self.index += 1
+            node = self.parse_comma()
+            if self.peek() != ")":
+                self.fail("missing `)'", self.get_rest() or None)
+            self.index += 1
+            # A variable in parentheses cannot be assigned
+            return (node[0], None, node[2])
+        self.fail("syntax error: operand expected", self.get_rest())
+
+
+#################################
+#          Evaluation           #
+#################################
+
+
+@lru_cache(maxsize=1024)
+def compile_expression(expression):
+    """
+    Compile an arithmetic expression, once for each different text
+
+    Input:
+        - expression: the text of the expression after its parameter
+        expansions
+
+    Output:
+        - A function that takes the variables of the shell and returns the
+        value of the expression
+    """
+    return Arithmetic_Parser(expression).compile()
+
+
+def get_variable_value(variables, name):
+    """
+    Get the integer value of a variable. An unset or empty variable is 0,
+    another value is evaluated as an expression.
+    """
+    value = variables.get(name)
+    if not value:
+        return 0
+    if value.isdigit() and (value[0] != "0" or len(value) == 1):
+        return wrap(int(value))
+    return evaluate_expression(value, variables)
+
+
+def evaluate_expression(expression, variables):
+    """
+    Evaluate an arithmetic expression with the integer semantics of bash
+
+    Input:
+        - expression: the text of the expression
+        - variables: the variables of the shell, which are read and
+        assigned by the expression
+
+    Output:
+        - The integer value of the expression
+    """
+    try:
+        return compile_expression(expression)(variables)
+    except RecursionError:
+        raise ArithmeticExpressionError(
+            '%s: expression recursion level exceeded (error token is "%s")'
+            % (expression, expression)
+        )
@@ -0,0 +1,956 @@
+#!/usr/bin/env python3
+from naive_lexer import get_token_list, get_token_stream
+from command_splitting import get_command_list, get_command_list_multi_pass,\
+                              get_command_list_single_pass,\
+                              parse_subshell_token
+from command_execution import execute_command_list
+from expansion_plan import Command_Plan
+from param_expansion import expand_parameter
+from globbing import globbing, directory_cache
+from token_definition import Command, Subshell_Token
+from exception import Error
+from history_store import shell_history
+from profiler import get_percentile
+from utility import set_continuation_reader, get_error_message
+from shell import Shell
+from os import dup, dup2, close, open as open_file, O_WRONLY, O_CREAT, devnull
+from os.path import join, dirname, abspath, isfile
+from subprocess import run
+from tempfile import TemporaryDirectory
+from time import perf_counter, perf_counter_ns
+from argparse import ArgumentParser
+from random import Random
+from json import load, dump
+from contextlib import redirect_stdout
+from io import StringIO
+from traceback import extract_tb
+import tracemalloc
+import sys
+
+
+# Path of the shell that is run by the script benchmark
+INTEK_SH_PATH = join(dirname(abspath(__file__)), "intek-sh.py")
+# Results of the suite that the later runs are compared with
+BASELINE_PATH = join(dirname(abspath(__file__)), "benchmark_baseline.json")
+
+
+#################################
+#            Utility            #
+#################################
+
+
+def run_intek_sh_line(input_string, shell):
+    """
+    Lex, parse and execute a line in the current process with the stdout
+    pointed to /dev/null
+
+    Input:
+        - input_string: the line that will be executed
+        - shell: the shell instance that executes the line
+
+    Output:
+        - The number of seconds the execution took
+    """
+    null_fd = open_file(devnull, O_WRONLY)
+    saved_stdout_fd = dup(1)
+    sys.stdout.flush()
+    dup2(null_fd, 1)
+    try:
+        start_time = perf_counter()
+        token_list = get_token_list(input_string)[0]
+        execute_command_list(get_command_list(token_list), shell)
+        return perf_counter() - start_time
+    finally:
+        sys.stdout.flush()
+        dup2(saved_stdout_fd, 1)
+        close(saved_stdout_fd)
+        close(null_fd)
+
+
+def run_sh_line(input_string):
+    """
+    Execute a line with /bin/sh with the stdout pointed to /dev/null
+
+    Input:
+        - input_string: the line that will be executed
+
+    Output:
+        - The number of seconds the execution took
+    """
+    start_time = perf_counter()
+    run(["/bin/sh", "-c", input_string], stdout=open(devnull, "w"))
+    return perf_counter() - start_time
+
+
+def generate_command_line(piece_count, random, piece_list=None):
+    """
+    Generate a command line by joining random pieces of commands
+
+    Input:
+        - piece_count: the number of pieces in the command line
+        - random: the Random object used to choose the pieces
+        - piece_list: the pieces that can be chosen
+
+    Output:
+        - The generated command line
+    """
+    piece_list = piece_list or [
+        "ls", "-l", "grep", "foo", "sort", " ", " ", " ", "|", "&&", "||",
+        ";", "&", ">", ">>", "<", "'single quoted'", '"double $HOME"', "$PATH",
+        "${HOME:-/}", "(cd /)", "out.log", "*.py"
+    ]
+    return "".join(random.choice(piece_list) for _ in range(piece_count))
+
+
+def describe_command_list(parse_function, token_list):
+    """
+    Get a comparable description of the result of a parser
+
+    Input:
+        - parse_function: the function that builds the command list
+        - token_list: the tokens that will be parsed
+
+    Output:
+        - A list of the string of each command, or the name of the error
+        raised by the parser
+    """
+    try:
+        return [str(command) for command in parse_function(token_list)]
+    except Exception as e:
+        return type(e).__name__
+
+
+#################################
+#           Benchmarks          #
+#################################
+
+
+def benchmark_pipeline(size, repeat):
+    """
+    Measure the throughput of a pipe command that streams a file through
+    several processes, compared with /bin/sh
+
+    Input:
+        - size: the size of the file in megabytes
+        - repeat: the number of times each shell runs the pipe command
+    """
+    with TemporaryDirectory() as directory:
+        file_name = join(directory, "pipeline.log")
+        # Write the file one megabyte at a time
+        line = b"%s INFO request handled in 12ms by worker-7\n" % (b"x" * 20)
+        chunk = line * (1048576 // len(line) + 1)
+        with open(file_name, "wb") as log_file:
+            for _ in range(size):
+                log_file.write(chunk[:1048576])
+        input_string = "cat %s | grep -v ERROR | tr a-z A-Z | wc -c" % (
+            file_name
+        )
+        shell = Shell()
+        result_list = [
+            ("intek-sh", min(run_intek_sh_line(input_string, shell)
+                             for _ in range(repeat))),
+            ("/bin/sh", min(run_sh_line(input_string)
+                            for _ in range(repeat)))
+        ]
+    for name, duration in result_list:
+        print("%-10s %8.1f MB/s (%.3f s)" % (name, size / duration, duration))
+
+
+def benchmark_parser(token_count, repeat):
+    """
+    Compare the time the single-pass parser and the multi-pass parser take
+    to build the command list of a long command line
+
+    Input:
+        - token_count: the approximate number of tokens in the command line
+        - repeat: the number of times each parser runs
+    """
+    # Build a valid command line so that both parsers go through every token
+    command_list = []
+    length = 0
+    index = 0
+    while length < token_count:
+        command = ("grep -e pattern%d file%d.txt < in%d | sort -u > out%d.log"
+                   % (index, index, index, index))
+        command_list.append(command)
+        length += len(get_token_list(command)[0]) + 2
+        index += 1
+    token_list = get_token_list(" && ".join(command_list))[0]
+    print("%d tokens" % len(token_list))
+    for name, parse_function in (("multi-pass", get_command_list_multi_pass),
+                                 ("single-pass",
+                                  get_command_list_single_pass)):
+        duration = float("inf")
+        for _ in range(repeat):
+            start_time = perf_counter()
+            parse_function(token_list)
+            duration = min(duration, perf_counter() - start_time)
+        print("%-12s %8.2f ms" % (name, duration * 1000))
+
+
+def generate_parser_line(random):
+    """
+    Generate a random command line that both parsers can parse without
+    reading more input
+
+    Input:
+        - random: the random generator
+    """
+    # Command lines ending with a logical operator or a pipe would ask for
+    # more input
+    input_string = generate_command_line(random.randint(1, 12),
+                                         random).rstrip("&| ")
+    # A here-document would read its body from the standard input
+    while "<<" in input_string:
+        input_string = input_string.replace("<<", "<")
+    return input_string
+
+
+def get_parser_mismatch(input_string):
+    """
+    Compare the command lists built by the multi-pass parser and by the
+    single-pass parser from a token list and from a token stream
+
+    Input:
+        - input_string: the command line
+
+    Output:
+        - The description of the difference, None if the parsers agree
+    """
+    multi_pass_result = describe_command_list(
+        get_command_list_multi_pass, get_token_list(input_string)[0]
+    )
+    single_pass_result = describe_command_list(
+        get_command_list_single_pass, get_token_list(input_string)[0]
+    )
+    stream_result = describe_command_list(
+        get_command_list_single_pass, get_token_stream(input_string)[0]
+    )
+    # The parser builds the same commands from a token stream
+    if stream_result != single_pass_result:
+        return "stream mismatch: %r\n  stream:      %s\n  single-pass: %s" % (
+            input_string, stream_result, single_pass_result
+        )
+    # Lines with several syntax errors may report a different one
+    if (multi_pass_result != single_pass_result and
+            not (isinstance(multi_pass_result, str) and
+                 isinstance(single_pass_result, str))):
+        return "mismatch: %r\n  multi-pass:  %s\n  single-pass: %s" % (
+            input_string, multi_pass_result, single_pass_result
+        )
+    return None
+
+
+def check_parser(count, seed):
+    """
+    Check that the single-pass parser builds the same command lists as the
+    multi-pass parser on random command lines, from a token list and from a
+    token stream
+
+    Input:
+        - count: the number of command lines that will be checked
+        - seed: the seed of the random generator
+    """
+    random = Random(seed)
+    mismatch_count = 0
+    for _ in range(count):
+        mismatch = get_parser_mismatch(generate_parser_line(random))
+        if mismatch:
+            mismatch_count += 1
+            print(mismatch)
+    print("%d command lines checked, %d mismatches" % (count, mismatch_count))
+    return mismatch_count
+
+
+def benchmark_script(line_count, repeat):
+    """
+    Measure the number of lines per second a script is run at in script
+    mode, compared with /bin/sh
+
+    Input:
+        - line_count: the number of lines in the script
+        - repeat: the number of times each shell runs the script
+    """
+    # Builtin commands of both shells only, so that the time is spent in the
+    # shell
+    line_list = ["export VAR_%d=value%d", "cd /tmp && cd /", "unset VAR_%d",
+                 "cd / || exit 1"]
+    with TemporaryDirectory() as directory:
+        file_name = join(directory, "script.sh")
+        with open(file_name, "w") as script_file:
+            for index in range(line_count):
+                line = line_list[index % len(line_list)]
+                script_file.write((line % ((index,) * line.count("%d")))
+                                  + "\n")
+        for name, command in (("intek-sh", [sys.executable, INTEK_SH_PATH,
+                                            file_name]),
+                              ("/bin/sh", ["/bin/sh", file_name])):
+            duration = float("inf")
+            for _ in range(repeat):
+                start_time = perf_counter()
+                run(command, stdout=open(devnull, "w"))
+                duration = min(duration, perf_counter() - start_time)
+            print("%-10s %10.0f lines/s (%.3f s)" % (
+                name, line_count / duration, duration
+            ))
+
+
+def benchmark_memory(line_count):
+    """
+    Measure the memory used by the tokens of a large script, stored in a
+    list of token objects and in a compact token stream, and the time the
+    command list takes to be built from each of them
+
+    Input:
+        - line_count: the number of lines in the script
+    """
+    line = ("grep -e \"pattern $HOME\" file.txt | sort -u > out.log && "
+            "echo done ; ls -l ${DIR:-/tmp} 'x y'\n")
+    script = line * line_count
+    for name, lex_function in (("list", get_token_list),
+                               ("stream", get_token_stream)):
+        tracemalloc.start()
+        token_list = lex_function(script)[0]
+        retained_size, peak_size = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        start_time = perf_counter()
+        command_count = len(get_command_list(token_list))
+        duration = perf_counter() - start_time
+        print("%-8s %8d tokens, retained %6.1f MB, peak %6.1f MB, "
+              "%d commands parsed in %.3f s" % (
+                  name, len(token_list), retained_size / 1e6,
+                  peak_size / 1e6, command_count, duration
+              ))
+        del token_list
+
+
+def benchmark_expansion(line_count, repeat, seed):
+    """
+    Measure the time the compiled expansion plans take to expand the
+    commands of random command lines
+
+    Input:
+        - line_count: the number of command lines
+        - repeat: the number of times each command is expanded
+        - seed: the seed of the random generator
+    """
+    random = Random(seed)
+    piece_list = ["echo", "ls", "-l", "foo", " ", " ", " ", "$HOME", "$NONE",
+                  '"a $HOME b"', "'q $x'", "${HOME}", "${NONE:-default}",
+                  "x${HOME#/}y", '"${PWD%/*}"', "*.py", "out.log"]
+    shell = Shell({"HOME": "/root", "PWD": "/root/package", "PATH": "/bin"})
+    plan_list = []
+    for _ in range(line_count):
+        input_string = generate_command_line(random.randint(1, 12), random,
+                                             piece_list)
+        plan_list.extend(
+            Command_Plan(command)
+            for command in get_command_list(get_token_list(input_string)[0])
+        )
+    start_time = perf_counter()
+    for _ in range(repeat):
+        for plan in plan_list:
+            plan.expand(shell)
+    duration = perf_counter() - start_time
+    print("%-8s %10.0f commands/s" % (
+        "plan", len(plan_list) * repeat / duration
+    ))
+
+
+#################################
+#            Corpora            #
+#################################
+
+
+def generate_pipeline_corpus(random, line_count, stage_count):
+    """
+    Generate long pipe commands with redirections
+
+    Input:
+        - random: the random generator
+        - line_count: the number of command lines
+        - stage_count: the number of commands in each pipe command
+
+    Output:
+        - The list of the command lines
+    """
+    stage_list = ["grep -e pattern", "sort -u", "cut -d: -f1", "tr a-z A-Z",
+                  "uniq -c", "head -n 10", "sed s/a/b/g", "wc -l"]
+    return ["cat in%d.log | %s > out%d.log" % (
+        index, " | ".join(random.choice(stage_list)
+                          for _ in range(stage_count)), index
+    ) for index in range(line_count)]
+
+
+def generate_nested_quote(random, depth):
+    """
+    Generate a word of quotes nested in parameter expansions, such as
+    "${A:-"${B:-'x' $HOME}"}"
+    """
+    if not depth:
+        return random.choice(["plain $HOME text", "x'y'z", "a \\$b",
+                              "${HOME}", "'single $x'"])
+    return '"${%s:-%s}"' % (random.choice(["UNSET", "EMPTY", "NONE"]),
+                            generate_nested_quote(random, depth - 1))
+
+
+def generate_quote_corpus(random, line_count, depth):
+    """
+    Generate command lines of deeply nested quotes and of long runs of
+    adjacent quoted parts
+
+    Output:
+        - The list of the command lines
+    """
+    line_list = []
+    for _ in range(line_count):
+        adjacent_word = "".join(random.choice(["'a b'", '"c $HOME"', "d",
+                                               "'$e'", '"f g"'])
+                                for _ in range(depth * 4))
+        line_list.append("echo %s %s" % (generate_nested_quote(random, depth),
+                                          adjacent_word))
+    return line_list
+
+
+# Parameter expansions of the suite, the pattern ones are repeated so that
+# they make up most of the corpus
+PARAMETER_OPERATORS = ["%%", "%%", "%%", "%", "##", "#", ":-", ":+", "-"]
+PARAMETER_PATTERNS = ["*/", ".*", "*.", "/*", "[a-m]*", "?", "*[0-9]",
+                      "default"]
+
+
+def generate_parameter_corpus(random, count):
+    """
+    Generate parameter expansions, mostly of the ${VAR%%pattern} form
+
+    Output:
+        - The list of the (name, operator, value) tuples
+        - The list of the command lines that contain them
+    """
+    expansion_list = [(random.choice(["PATH_VALUE", "FILE_NAME", "UNSET"]),
+                       random.choice(PARAMETER_OPERATORS),
+                       random.choice(PARAMETER_PATTERNS))
+                      for _ in range(count)]
+    line_list = ["echo " + " ".join("${%s%s%s}" % expansion
+                                    for expansion in expansion_list[
+                                        index:index + 10
+                                    ])
+                 for index in range(0, count, 10)]
+    return expansion_list, line_list
+
+
+# Variables of the shell used by the expansion stages of the suite
+SUITE_VARIABLES = {
+    "HOME": "/home/user",
+    "PATH": "/usr/local/bin:/usr/bin:/bin",
+    "PATH_VALUE": "/usr/local/share/very/deep/path/to/some/file.tar.gz",
+    "FILE_NAME": "archive-2024-01-01.backup.tar.gz",
+    "EMPTY": ""
+}
+
+
+def create_glob_directory(directory, entry_count):
+    """
+    Fill a directory with files for the globbing stages
+
+    Input:
+        - directory: the path of the directory
+        - entry_count: the number of files
+    """
+    extension_list = [".log", ".txt", ".py", ".gz", ""]
+    for index in range(entry_count):
+        close(open_file(join(directory, "file%06d%s" % (
+            index, extension_list[index % len(extension_list)]
+        )), O_WRONLY | O_CREAT, 0o644))
+
+
+#################################
+#             Suite             #
+#################################
+
+
+def measure_stage(function, operation_count, repeat):
+    """
+    Measure the throughput and the peak memory of a stage
+
+    Input:
+        - function: the function that runs the stage once over its corpus
+        - operation_count: the number of operations of a single run
+        - repeat: the number of timed runs, the fastest one is kept
+
+    Output:
+        - A dictionary of the operations per second and the peak memory in
+        bytes
+    """
+    duration = float("inf")
+    for _ in range(repeat):
+        start_time = perf_counter()
+        function()
+        duration = min(duration, perf_counter() - start_time)
+    # The memory is measured in a separate run, since tracing slows it down
+    tracemalloc.start()
+    try:
+        function()
+        peak_size = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {"ops_per_second": operation_count / duration,
+            "peak_bytes": peak_size}
+
+
+def get_suite_stages(random, scale, directory):
+    """
+    Generate the corpora and the stages of the suite
+
+    Input:
+        - random: the random generator
+        - scale: the factor applied to the size of every corpus
+        - directory: an empty directory for the globbing stages
+
+    Output:
+        - A list of tuples of the name of each stage, the function that runs
+        it over its corpus and the number of operations of a run
+    """
+    line_count = max(1, int(200 * scale))
+    pipeline_list = generate_pipeline_corpus(random, line_count, 50)
+    quote_list = generate_quote_corpus(random, line_count, 8)
+    expansion_list, parameter_line_list = generate_parameter_corpus(
+        random, max(10, int(5000 * scale))
+    )
+    line_list = pipeline_list + quote_list + parameter_line_list
+    token_list_list = [get_token_list(line)[0] for line in line_list]
+    shell = Shell(SUITE_VARIABLES)
+    command_list = [command
+                    for line in quote_list + parameter_line_list
+                    for command in get_command_list(get_token_list(line)[0])]
+    plan_list = [Command_Plan(command) for command in command_list]
+    variable_dict = dict(SUITE_VARIABLES)
+    create_glob_directory(directory, max(10, int(100000 * scale)))
+    pattern_list = [join(directory, pattern)
+                    for pattern in ("*.log", "file00*", "*[0-9]?.txt",
+                                    "*.nomatch", "file?????7.py")]
+
+    def glob_cold():
+        for pattern in pattern_list:
+            directory_cache.clear()
+            globbing(pattern)
+
+    def glob_cached():
+        for pattern in pattern_list:
+            globbing(pattern)
+    return [
+        ("lex-pipelines",
+         lambda: [get_token_list(line) for line in pipeline_list],
+         len(pipeline_list)),
+        ("lex-quotes",
+         lambda: [get_token_list(line) for line in quote_list],
+         len(quote_list)),
+        ("lex-parameters",
+         lambda: [get_token_list(line) for line in parameter_line_list],
+         len(parameter_line_list)),
+        ("split",
+         lambda: [get_command_list(token_list)
+                  for token_list in token_list_list],
+         len(token_list_list)),
+        ("expand-plans",
+         lambda: [plan.expand(shell) for plan in plan_list],
+         len(plan_list)),
+        ("parameters",
+         lambda: [expand_parameter(name, operator, value, variable_dict)
+                  for name, operator, value in expansion_list],
+         len(expansion_list)),
+        ("glob-cold", glob_cold, len(pattern_list)),
+        ("glob-cached", glob_cached, len(pattern_list))
+    ]
+
+
+def compare_with_baseline(result_dict, baseline_dict, tolerance):
+    """
+    Print the results of the suite next to the baseline
+
+    Input:
+        - result_dict: the results of each stage
+        - baseline_dict: the results of each stage in the baseline, empty
+        if there is none
+        - tolerance: the fraction of the baseline a result can be worse by
+
+    Output:
+        - regression_list: the names of the stages that have regressed
+    """
+    regression_list = []
+    print("%-16s %14s %9s %12s %9s" % ("stage", "ops/s", "change",
+                                       "peak MB", "change"))
+    for name, result in result_dict.items():
+        baseline = baseline_dict.get(name)
+        speed_change = memory_change = ""
+        is_regression = False
+        if baseline:
+            speed_ratio = (result["ops_per_second"] /
+                           baseline["ops_per_second"])
+            memory_ratio = (result["peak_bytes"] /
+                            max(baseline["peak_bytes"], 1))
+            speed_change = "%+.1f%%" % (100 * (speed_ratio - 1))
+            memory_change = "%+.1f%%" % (100 * (memory_ratio - 1))
+            is_regression = (speed_ratio < 1 - tolerance or
+                             memory_ratio > 1 + tolerance)
+        print("%-16s %14.1f %9s %12.2f %9s%s" % (
+            name, result["ops_per_second"], speed_change,
+            result["peak_bytes"] / 1e6, memory_change,
+            "  REGRESSION" if is_regression else ""
+        ))
+        if is_regression:
+            regression_list.append(name)
+    return regression_list
+
+
+def run_suite(scale, repeat, seed, baseline_path, save_baseline, tolerance):
+    """
+    Run every stage of the suite and compare the results with the baseline
+
+    Input:
+        - scale: the factor applied to the size of every corpus
+        - repeat: the number of timed runs of each stage
+        - seed: the seed of the random generator
+        - baseline_path: the path of the baseline file
+        - save_baseline: a boolean value that determines whether the
+        results replace the baseline
+        - tolerance: the fraction of the baseline a result can be worse by
+
+    Output:
+        - The number of stages that have regressed
+    """
+    with TemporaryDirectory() as directory:
+        stage_list = get_suite_stages(Random(seed), scale, directory)
+        result_dict = {name: measure_stage(function, operation_count,
+                                           repeat)
+                       for name, function, operation_count in stage_list}
+    baseline_dict = {}
+    if isfile(baseline_path):
+        with open(baseline_path) as baseline_file:
+            baseline = load(baseline_file)
+        # Results of another corpus size cannot be compared
+        if baseline.get("scale") == scale:
+            baseline_dict = baseline["stages"]
+        else:
+            print("The baseline was recorded with --scale %s" %
+                  baseline.get("scale"))
+    regression_list = compare_with_baseline(result_dict, baseline_dict,
+                                            tolerance)
+    if save_baseline:
+        with open(baseline_path, "w") as baseline_file:
+            dump({"scale": scale, "stages": result_dict}, baseline_file,
+                 indent=2, sort_keys=True)
+            baseline_file.write("\n")
+        print("Baseline saved to %s" % baseline_path)
+        return 0
+    if not baseline_dict:
+        print("No baseline to compare with, run with --save-baseline")
+    elif regression_list:
+        print("%d stages are more than %d%% worse than the baseline: %s" % (
+            len(regression_list), tolerance * 100, ", ".join(regression_list)
+        ))
+    return len(regression_list)
+
+
+#################################
+#            Replay             #
+#################################
+
+
+# Environment of the shell the history lines are expanded in, so that the
+# results don't depend on the machine
+REPLAY_VARIABLES = {
+    "HOME": "/home/user",
+    "PATH": "/usr/local/bin:/usr/bin:/bin",
+    "PWD": "/home/user",
+    "USER": "user",
+    "SHELL": "/bin/intek-sh",
+    "LANG": "C.UTF-8"
+}
+
+
+def reject_more_input():
+    """
+    Continuation reader of the replay, a history line never continues on
+    the next one
+    """
+    raise EOFError
+
+
+class Replay_Shell(Shell):
+    """
+    Sandboxed shell of the replay, whose command substitutions are parsed
+    and expanded but never executed
+    """
+
+    def substitute_command(self, token):
+        parse_subshell_token(token)
+        for command in token.command_list:
+            expand_command_tree(command, self)
+        return ""
+
+
+def expand_command_tree(command, shell):
+    """
+    Expand every single command of a command, including the commands
+    inside its subshells, without executing them
+
+    Input:
+        - command: a Command or Binary_Command type object
+        - shell: the sandboxed shell
+    """
+    if not isinstance(command, Command):
+        expand_command_tree(command.left_command, shell)
+        if command.right_command:
+            expand_command_tree(command.right_command, shell)
+        return
+    plan = Command_Plan(command)
+    plan.expand(shell)
+    plan.expand_assignments(shell)
+    for token in command.token_list:
+        if isinstance(token, Subshell_Token) and token.command_list:
+            for subshell_command in token.command_list:
+                expand_command_tree(subshell_command, shell)
+
+
+def replay_line(input_string, shell):
+    """
+    Lex, parse and expand a line without executing it
+
+    Input:
+        - input_string: the line of the history file
+        - shell: the sandboxed shell
+
+    Output:
+        - The nanoseconds spent in the lex, parse and expand phases
+    """
+    begin_time = perf_counter_ns()
+    token_list = get_token_list(input_string)[0]
+    lex_time = perf_counter_ns()
+    command_list = get_command_list(token_list)
+    parse_time = perf_counter_ns()
+    for command in command_list:
+        expand_command_tree(command, shell)
+    expand_time = perf_counter_ns()
+    return (lex_time - begin_time, parse_time - lex_time,
+            expand_time - parse_time)
+
+
+def read_history_lines(path_list):
+    """
+    Read the lines of history files
+
+    Output:
+        - A list of tuples of the location of each line and the line
+    """
+    line_list = []
+    for path in path_list:
+        try:
+            with open(path, errors="surrogateescape") as history_file:
+                for number, line in enumerate(history_file, 1):
+                    line = line.rstrip("\n")
+                    if line.strip():
+                        line_list.append(("%s:%d" % (path, number), line))
+        except OSError as e:
+            print(get_error_message(path, type(e), "replay"))
+    return line_list
+
+
+def replay_history(path_list, repeat, top_count, max_p99):
+    """
+    Replay the lines of history files through the lexer, the parser and
+    the expansion, in a shell with a fixed environment, and report the
+    latency of the lines, the slowest ones and the exceptions
+
+    Input:
+        - path_list: the paths of the history files
+        - repeat: the number of times each line is replayed, the fastest
+        one is kept
+        - top_count: the number of slowest lines that are printed
+        - max_p99: the p99 of the whole lines in microseconds above which the
+        replay fails, None for no limit
+
+    Output:
+        - The number of failures: the lines that raised an exception that
+        isn't a shell error, and the p99 above the limit
+    """
+    line_list = read_history_lines(path_list)
+    phase_name_list = ("lex", "parse", "expand", "total")
+    time_list_dict = {name: [] for name in phase_name_list}
+    line_time_list = []
+    # Shell errors are expected from the typos of the users, the other
+    # exceptions are bugs
+    shell_error_dict = {}
+    crash_list = []
+    # The lines of the history have already been through history expansion,
+    # and none of them may ask for more input
+    shell_history.expansion_enabled = False
+    previous_reader = set_continuation_reader(reject_more_input)
+    try:
+        # The warnings printed by the lexer and the expansion are dropped
+        with redirect_stdout(StringIO()):
+            for location, input_string in line_list:
+                best_phase_time_list = None
+                try:
+                    for _ in range(repeat):
+                        shell = Replay_Shell(REPLAY_VARIABLES)
+                        phase_time_list = replay_line(input_string, shell)
+                        if (not best_phase_time_list or
+                                sum(phase_time_list) <
+                                sum(best_phase_time_list)):
+                            best_phase_time_list = phase_time_list
+                except (Error, EOFError) as e:
+                    name = type(e).__name__
+                    shell_error_dict[name] = shell_error_dict.get(name, 0) + 1
+                    continue
+                except Exception as e:
+                    frame = extract_tb(e.__traceback__)[-1]
+                    crash_list.append((location, input_string,
+                                       "%s at %s:%d" % (
+                                           repr(e),
+                                           frame.filename.rsplit("/", 1)[-1],
+                                           frame.lineno
+                                       )))
+                    continue
+                for name, phase_time in zip(phase_name_list,
+                                            best_phase_time_list):
+                    time_list_dict[name].append(phase_time)
+                total_time = sum(best_phase_time_list)
+                time_list_dict["total"].append(total_time)
+                line_time_list.append((total_time, location, input_string))
+    finally:
+        set_continuation_reader(previous_reader)
+        shell_history.expansion_enabled = True
+    print("%d lines replayed from %d files, %d shell errors, %d crashes" % (
+        len(line_list), len(path_list), sum(shell_error_dict.values()),
+        len(crash_list)
+    ))
+    if line_time_list:
+        print("%-8s %10s %10s %10s %10s" % ("phase", "p50 (us)", "p90 (us)",
+                                            "p99 (us)", "max (us)"))
+        for name in phase_name_list:
+            time_list = sorted(time_list_dict[name])
+            print("%-8s %10.1f %10.1f %10.1f %10.1f" % (
+                name, get_percentile(time_list, 50) / 1000,
+                get_percentile(time_list, 90) / 1000,
+                get_percentile(time_list, 99) / 1000, time_list[-1] / 1000
+            ))
+        print("slowest lines:")
+        for total_time, location, input_string in sorted(
+                line_time_list, reverse=True)[:top_count]:
+            print("%10.1f us  %s  %s" % (total_time / 1000, location,
+                                         input_string[:60]))
+    for name, count in sorted(shell_error_dict.items()):
+        print("%-24s %d lines" % (name, count))
+    for location, input_string, description in crash_list:
+        print("CRASH %s: %s\n    %s" % (location, input_string[:60],
+                                        description))
+    failure_count = len(crash_list)
+    if max_p99 is not None and time_list_dict["total"]:
+        p99 = get_percentile(sorted(time_list_dict["total"]), 99) / 1000
+        if p99 > max_p99:
+            print("p99 of %.1f us is above the limit of %.1f us" % (p99,
+                                                                   max_p99))
+            failure_count += 1
+    return failure_count
+
+
+#################################
+#           Main Flow           #
+#################################
+
+
+def main():
+    parser = ArgumentParser(description="Benchmarks of intek-sh")
+    subparser_list = parser.add_subparsers(dest="benchmark", required=True)
+    pipeline_parser = subparser_list.add_parser(
+        "pipeline",
+        help="throughput of a pipe command compared with /bin/sh"
+    )
+    pipeline_parser.add_argument("--size", type=int, default=256,
+                                 help="size of the streamed file in MB")
+    pipeline_parser.add_argument("--repeat", type=int, default=3)
+    parser_parser = subparser_list.add_parser(
+        "parser",
+        help="single-pass parser compared with the multi-pass parser"
+    )
+    parser_parser.add_argument("--tokens", type=int, default=10000)
+    parser_parser.add_argument("--repeat", type=int, default=5)
+    check_parser_parser = subparser_list.add_parser(
+        "check-parser",
+        help="differential check of the single-pass parser"
+    )
+    check_parser_parser.add_argument("--count", type=int, default=10000)
+    check_parser_parser.add_argument("--seed", type=int, default=0)
+    script_parser = subparser_list.add_parser(
+        "script",
+        help="lines per second of a script compared with /bin/sh"
+    )
+    script_parser.add_argument("--lines", type=int, default=20000)
+    script_parser.add_argument("--repeat", type=int, default=3)
+    memory_parser = subparser_list.add_parser(
+        "memory",
+        help="memory used by the tokens of a large script"
+    )
+    memory_parser.add_argument("--lines", type=int, default=20000)
+    expansion_parser = subparser_list.add_parser(
+        "expansion",
+        help="expansion of commands by their compiled plans"
+    )
+    expansion_parser.add_argument("--lines", type=int, default=2000)
+    expansion_parser.add_argument("--repeat", type=int, default=20)
+    expansion_parser.add_argument("--seed", type=int, default=0)
+    suite_parser = subparser_list.add_parser(
+        "suite",
+        help="every lexing, parsing, expansion and globbing stage compared"
+             " with the baseline"
+    )
+    suite_parser.add_argument("--scale", type=float, default=1.0,
+                              help="factor applied to the size of the"
+                                   " corpora")
+    suite_parser.add_argument("--repeat", type=int, default=3)
+    suite_parser.add_argument("--seed", type=int, default=0)
+    suite_parser.add_argument("--baseline", default=BASELINE_PATH)
+    suite_parser.add_argument("--save-baseline", action="store_true")
+    suite_parser.add_argument("--tolerance", type=float, default=0.25,
+                              help="fraction of the baseline a stage can be"
+                                   " worse by")
+    replay_parser = subparser_list.add_parser(
+        "replay",
+        help="latency of the lines of history files, lexed, parsed and"
+             " expanded without being executed"
+    )
+    replay_parser.add_argument("history_files", nargs="*",
+                               default=[Shell.history_file])
+    replay_parser.add_argument("--repeat", type=int, default=3)
+    replay_parser.add_argument("--top", type=int, default=10,
+                               help="number of slowest lines printed")
+    replay_parser.add_argument("--max-p99", type=float, default=None,
+                               help="p99 in microseconds above which the"
+                                    " replay fails")
+    arguments = parser.parse_args()
+    if arguments.benchmark == "pipeline":
+        benchmark_pipeline(arguments.size, arguments.repeat)
+    elif arguments.benchmark == "parser":
+        benchmark_parser(arguments.tokens, arguments.repeat)
+    elif arguments.benchmark == "check-parser":
+        sys.exit(1 if check_parser(arguments.count, arguments.seed) else 0)
+    elif arguments.benchmark == "script":
+        benchmark_script(arguments.lines, arguments.repeat)
+    elif arguments.benchmark == "memory":
+        benchmark_memory(arguments.lines)
+    elif arguments.benchmark == "expansion":
+        benchmark_expansion(arguments.lines, arguments.repeat, arguments.seed)
+    elif arguments.benchmark == "replay":
+        sys.exit(1 if replay_history(arguments.history_files,
+                                     arguments.repeat, arguments.top,
+                                     arguments.max_p99) else 0)
+    elif arguments.benchmark == "suite":
+        sys.exit(1 if run_suite(arguments.scale, arguments.repeat,
+                                arguments.seed, arguments.baseline,
+                                arguments.save_baseline,
+                                arguments.tolerance) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+from os import write
+import sys
+
+
+class Builtin_Output:
+    """
+    Buffered output of the builtin commands that run inside the shell
+    process. The strings written by a builtin are joined and written once
+    when it finishes, to the file descriptor of its stdout redirection or to
+    the stdout of the shell if there is none.
+    """
+
+    def __init__(self):
+        # File descriptor of the stdout redirection, None for the stdout of
+        # the shell
+        self.file_descriptor = None
+        self.part_list = []
+        # Lists of the strings kept by the command substitutions that run
+        # inside the shell process, the innermost one last
+        self.capture_stack = []
+
+    def redirect(self, file_descriptor):
+        """
+        Change the file descriptor the next builtin writes to
+
+        Input:
+            - file_descriptor: the file descriptor of the redirection, None
+            for the stdout of the shell
+        """
+        self.file_descriptor = file_descriptor
+
+    def begin_capture(self):
+        """
+        Keep the output of the next builtins instead of writing it
+        """
+        self.capture_stack.append([])
+
+    def end_capture(self):
+        """
+        Stop keeping the output of the builtins
+
+        Output:
+            - The output kept since the matching begin_capture
+        """
+        return "".join(self.capture_stack.pop())
+
+    def write(self, string):
+        self.part_list.append(string)
+
+    def write_line(self, string):
+        self.part_list.append(string)
+        self.part_list.append("\n")
+
+    def flush(self):
+        """
+        Write the buffered strings and reset the redirection
+        """
+        string = "".join(self.part_list)
+        self.part_list.clear()
+        file_descriptor = self.file_descriptor
+        self.file_descriptor = None
+        if not string:
+            return
+        if file_descriptor is None and self.capture_stack:
+            self.capture_stack[-1].append(string)
+            return
+        # The stdout of the shell is shared with print, so the strings go
+        # through the same buffer to keep their order
+        if file_descriptor is None:
+            sys.stdout.write(string)
+            return
+        data = memoryview(string.encode("utf-8", "surrogateescape"))
+        while data:
+            data = data[write(file_descriptor, data):]
@@ -1,66 +1,723 @@
 #!/usr/bin/env python3
-from token_definition import Subshell_Token, Command, Binary_Command,\
-                             Pipe_Command, And_Command, Or_Command
-from token_expansion import expand_token, find_next_element_of_type_in_list
-from subprocess import Popen
+from token_definition import Command, Binary_Command, Pipe_Command,\
+                             And_Command, Or_Command, Background_Command,\
+                             Word_Token, Separator_Token
+from expansion_plan import get_command_plan
+from naive_lexer import get_token_list
+from command_splitting import get_command_list, parse_subshell_token
+from utility import get_error_message
+from here_document import open_here_document, close_writer_fds
+from job_table import get_command_string
+from profiler import profiler
+from os import open as open_file, close, dup, dup2, fork, pipe, waitpid,\
+               waitstatus_to_exitcode, _exit, posix_spawn, POSIX_SPAWN_DUP2,\
+               O_RDONLY, O_WRONLY, O_CREAT, O_TRUNC, O_APPEND, setpgid,\
+               devnull, readv
+from signal import SIGPIPE, SIGXFSZ, SIGTTIN, SIGTTOU, SIGTSTP
+from os.path import expanduser
+from os import fsencode
+from collections import ChainMap
+import sys
 
 
-def execute_single_command(command,
-                           shell,
-                           print=False):
-    if any([isinstance(token, Subshell_Token)
-            for token in command.token_list]):
-        token = find_next_element_of_type_in_list(command.token_list,
-                                                  Subshell_Token)
-        return execute_subshell(token, shell)
+#################################
+#          Redirection          #
+#################################
 
 
-def execute_pipe_command(command,
-                         shell,
-                         print=False):
-    pass
+# Flags used to open the target file of each redirection operator
+REDIRECTION_FLAGS = {
+    "<": O_RDONLY,
+    ">": O_WRONLY | O_CREAT | O_TRUNC,
+    ">>": O_WRONLY | O_CREAT | O_APPEND
+}
 
 
-def execute_and_command(command,
-                        shell,
-                        print=False):
-    pass
+def open_redirection(redirection):
+    """
+    Open the target file of a redirection
 
+    Input:
+        - redirection: a list of the redirection operator and its target,
+        or None
 
-def execute_or_command(command,
-                       shell,
-                       print=False):
-    pass
+    Output:
+        - The file descriptor of the target, None if there is no redirection
+    """
+    if redirection and redirection[0] == "<<":
+        return open_here_document(redirection[1])
+    if not redirection or redirection[0] not in REDIRECTION_FLAGS:
+        return None
+    return open_file(expanduser(redirection[1]),
+                     REDIRECTION_FLAGS[redirection[0]],
+                     0o666)
+
+
+def close_file_descriptors(*file_descriptor_list):
+    """
+    Close every file descriptor that isn't None
+    """
+    for file_descriptor in file_descriptor_list:
+        if file_descriptor is not None:
+            close(file_descriptor)
+
+
+#################################
+#            Process            #
+#################################
+
+
+# Signals ignored by the Python interpreter or by the interactive shell
+# that are restored to their default action in the external commands
+DEFAULT_SIGNALS = (SIGPIPE, SIGXFSZ, SIGTTIN, SIGTTOU, SIGTSTP)
+
+
+def set_process_group(process_id, process_group):
+    """
+    Put a child process into a process group. It is done by both the shell
+    and the child, so that the group exists whichever of them runs first.
+
+    Input:
+        - process_id: the id of the child, 0 for the calling process
+        - process_group: the id of the group, 0 to start a new group
+    """
+    try:
+        setpgid(process_id, process_group)
+    except OSError:
+        # The child has already called exec or exited
+        pass
+
+
+def start_child_process(function, stdin_fd=None, stdout_fd=None,
+                        process_group=None):
+    """
+    Fork the shell and run a function in the child process
+
+    Input:
+        - function: the function that will be called in the child process,
+        it returns the exit code of the child
+        - stdin_fd: the file descriptor used as the child's stdin
+        - stdout_fd: the file descriptor used as the child's stdout
+        - process_group: the process group of the child, 0 to start a new
+        one, None to stay in the group of the shell
+
+    Output:
+        - The process id of the child
+    """
+    # Flush the buffered output so that it isn't written twice
+    sys.stdout.flush()
+    sys.stderr.flush()
+    process_id = fork()
+    if process_id:
+        if process_group is not None:
+            set_process_group(process_id, process_group)
+        return process_id
+    exit_code = 1
+    try:
+        if process_group is not None:
+            set_process_group(0, process_group)
+        close_writer_fds()
+        if stdin_fd is not None:
+            dup2(stdin_fd, 0)
+        if stdout_fd is not None:
+            dup2(stdout_fd, 1)
+        exit_code = function()
+    except SystemExit as e:
+        exit_code = e.code if isinstance(e.code, int) else 1
+    except KeyboardInterrupt:
+        exit_code = 130
+    except BrokenPipeError:
+        exit_code = 128 + SIGPIPE
+    finally:
+        try:
+            sys.stdout.flush()
+        finally:
+            _exit(exit_code)
+
+
+def start_external_command(argument_list, shell, stdin_fd, stdout_fd,
+                           assignment_list=None, process_group=None):
+    """
+    Start an external command. The file descriptors are duplicated onto the
+    command's stdin and stdout by posix_spawn, so the data never goes
+    through the shell process.
+
+    Input:
+        - argument_list: the arguments of the command
+        - shell: the current shell instance
+        - stdin_fd: the file descriptor used as the command's stdin
+        - stdout_fd: the file descriptor used as the command's stdout
+        - assignment_list: the variables assigned before the command, which
+        are only added to its environment
+        - process_group: the process group of the command, 0 to start a new
+        one, None to stay in the group of the shell
+
+    Output:
+        - A (process id,) tuple of the command, or the exit code if the
+        command cannot be started
+    """
+    command_path = shell.find_command(argument_list[0])
+    if not command_path:
+        print("intek-sh: %s: command not found" % argument_list[0])
+        return 127
+    file_actions = []
+    if stdin_fd is not None:
+        file_actions.append((POSIX_SPAWN_DUP2, stdin_fd, 0))
+    if stdout_fd is not None:
+        file_actions.append((POSIX_SPAWN_DUP2, stdout_fd, 1))
+    environment = shell.get_envp()
+    # The assignments are laid over the shared environment without copying it
+    if assignment_list:
+        environment = ChainMap({fsencode(name): fsencode(value)
+                                for name, value in assignment_list},
+                               environment)
+    # posix_spawn doesn't accept None for the process group
+    options = {} if process_group is None else {"setpgroup": process_group}
+    sys.stdout.flush()
+    try:
+        return (posix_spawn(command_path,
+                            argument_list,
+                            environment,
+                            file_actions=file_actions,
+                            setsigdef=DEFAULT_SIGNALS,
+                            **options),)
+    except OSError as e:
+        print(get_error_message(argument_list[0], type(e)))
+        return 126
+
+
+def wait_for_process(process):
+    """
+    Wait for a process to finish
+
+    Input:
+        - process: a (process id,) tuple of a child of the shell or an exit
+        code if the process has never started
+
+    Output:
+        - The exit code of the process, 128 plus the signal number for
+        killed processes
+    """
+    if isinstance(process, tuple):
+        exit_code = waitstatus_to_exitcode(waitpid(process[0], 0)[1])
+        return exit_code if exit_code >= 0 else 128 - exit_code
+    return process
+
+
+#################################
+#           Builtins            #
+#################################
+
+
+def run_builtin_command(argument_list, shell, stdout_fd=None,
+                        assignment_list=None, stdin_fd=None):
+    """
+    Run a builtin command inside the shell process
+
+    Input:
+        - argument_list: the arguments of the command
+        - shell: the current shell instance
+        - stdout_fd: the file descriptor the output is redirected to
+        - assignment_list: the variables assigned before the command, which
+        are only set while it runs
+        - stdin_fd: the file descriptor the input is redirected from
+
+    Output:
+        - The exit code of the command
+    """
+    if assignment_list:
+        # Only the assigned variables are put back after the builtin, the
+        # other changes it makes are kept
+        saved_list = [(name, shell.variables.lookup(name))
+                      for name, _ in assignment_list]
+        for name, value in assignment_list:
+            shell.variables.set(name, value, True)
+        try:
+            return run_builtin_command(argument_list, shell, stdout_fd,
+                                       stdin_fd=stdin_fd)
+        finally:
+            for name, entry in reversed(saved_list):
+                shell.variables.restore(name, entry)
+    # The builtins that read an input get it from the shell
+    if stdin_fd is not None:
+        shell.stdin_fd = stdin_fd
+        try:
+            return run_builtin_command(argument_list, shell, stdout_fd)
+        finally:
+            shell.stdin_fd = None
+    # The buffered builtins write to the redirection directly
+    if argument_list[0] in shell.buffered_builtins:
+        shell.output.redirect(stdout_fd)
+        try:
+            return shell.run_builtin_command(argument_list, argument_list[0])
+        finally:
+            shell.output.flush()
+    if stdout_fd is None:
+        return shell.run_builtin_command(argument_list, argument_list[0])
+    # Point the stdout of the shell to the redirection while the builtin runs
+    sys.stdout.flush()
+    saved_stdout_fd = dup(1)
+    dup2(stdout_fd, 1)
+    try:
+        return shell.run_builtin_command(argument_list, argument_list[0])
+    finally:
+        sys.stdout.flush()
+        dup2(saved_stdout_fd, 1)
+        close(saved_stdout_fd)
+
+
+#################################
+#        Single Command         #
+#################################
+
+
+def start_single_command(command, shell, stdin_fd=None, stdout_fd=None,
+                         in_pipe=False, process_group=None):
+    """
+    Start a single command without waiting for it
+
+    Input:
+        - command: a Command object
+        - shell: the current shell instance
+        - stdin_fd: the file descriptor of the pipe the command reads from
+        - stdout_fd: the file descriptor of the pipe the command writes to
+        - in_pipe: a boolean value that determines whether builtin commands
+        run in a child process
+        - process_group: the process group of the started process, 0 to
+        start a new one, None to stay in the group of the shell
+
+    Output:
+        - A (process id,) tuple of the started process or the exit code if
+        the command has already finished
+    """
+    plan = get_command_plan(command)
+    argument_list, stdin, stdout = profiler.call("expand", plan.expand, shell)
+    assignment_list = (plan.expand_assignments(shell)
+                       if plan.assignment_list else None)
+    redirection_stdin_fd = redirection_stdout_fd = None
+    try:
+        # The redirections override the pipes
+        redirection_stdin_fd = open_redirection(stdin)
+        redirection_stdout_fd = open_redirection(stdout)
+        if redirection_stdin_fd is not None:
+            stdin_fd = redirection_stdin_fd
+        if redirection_stdout_fd is not None:
+            stdout_fd = redirection_stdout_fd
+        subshell_token = plan.subshell_token
+        if subshell_token:
+            return (start_child_process(
+                lambda: execute_subshell(subshell_token, shell),
+                stdin_fd,
+                stdout_fd,
+                process_group
+            ),)
+        # Assignments without a command change the variables of the shell
+        if not argument_list:
+            for name, value in assignment_list or ():
+                shell.variables[name] = value
+            return 0
+        if argument_list[0] in shell.builtin_commands:
+            if in_pipe:
+                return (start_child_process(
+                    lambda: run_builtin_command(argument_list, shell, None,
+                                                assignment_list),
+                    stdin_fd,
+                    stdout_fd,
+                    process_group
+                ),)
+            return run_builtin_command(argument_list, shell, stdout_fd,
+                                       assignment_list, stdin_fd)
+        return start_external_command(argument_list, shell,
+                                      stdin_fd, stdout_fd, assignment_list,
+                                      process_group)
+    except OSError as e:
+        print(get_error_message(e.filename, type(e)))
+        return 1
+    finally:
+        close_file_descriptors(redirection_stdin_fd, redirection_stdout_fd)
+
+
+def execute_single_command(command, shell):
+    """
+    Execute a single command and wait for it
+
+    Input:
+        - command: a Command object
+        - shell: the current shell instance
+
+    Output:
+        - The exit code of the command
+    """
+    return wait_for_process(start_single_command(command, shell))
+
+
+#################################
+#        Binary Commands        #
+#################################
+
+
+def get_pipe_stage_list(command):
+    """
+    Get the commands of a pipe command from left to right
+
+    Input:
+        - command: a Pipe_Command object
+
+    Output:
+        - stage_list: the list of Command objects
+    """
+    stage_list = []
+    while isinstance(command, Pipe_Command):
+        stage_list.append(command.right_command)
+        command = command.left_command
+    stage_list.append(command)
+    return stage_list[::-1]
+
+
+def start_pipe_command(command, shell, stdin_fd=None, process_group=None):
+    """
+    Start every command of a pipe command at the same time, connecting
+    each command's stdout to the next command's stdin with a pipe
+
+    Input:
+        - command: a Pipe_Command object
+        - shell: the current shell instance
+        - stdin_fd: the file descriptor the first command reads from
+        - process_group: the process group of the commands, 0 to put them
+        in a new group led by the first command, None to stay in the group
+        of the shell
+
+    Output:
+        - process_list: the started processes, as returned by
+        start_single_command
+    """
+    stage_list = get_pipe_stage_list(command)
+    process_list = []
+    read_fd = None
+    try:
+        for index, stage in enumerate(stage_list):
+            # Create the pipe to the next command
+            next_read_fd = write_fd = None
+            if index < len(stage_list) - 1:
+                next_read_fd, write_fd = pipe()
+            try:
+                process = start_single_command(
+                    stage, shell, stdin_fd if index == 0 else read_fd,
+                    write_fd, True, process_group
+                )
+                process_list.append(process)
+                # The other commands join the group of the first one
+                if process_group == 0 and isinstance(process, tuple):
+                    process_group = process[0]
+            finally:
+                # The children have their own copies of the pipe ends
+                close_file_descriptors(read_fd, write_fd)
+                read_fd = next_read_fd
+    finally:
+        close_file_descriptors(read_fd)
+    return process_list
+
+
+def execute_pipe_command(command, shell):
+    """
+    Execute every command of a pipe command and wait for all of them
+
+    Input:
+        - command: a Pipe_Command object
+        - shell: the current shell instance
+
+    Output:
+        - The exit code of the last command
+    """
+    exit_code = 0
+    for process in start_pipe_command(command, shell):
+        exit_code = wait_for_process(process)
+    return exit_code
+
+
+def execute_and_command(command, shell):
+    """
+    Execute the right command only if the left command succeeds
+
+    Input:
+        - command: an And_Command object
+        - shell: the current shell instance
+
+    Output:
+        - The exit code of the last executed command
+    """
+    execute_command(command.left_command, shell)
+    if shell.exit_code == 0:
+        execute_command(command.right_command, shell)
+    return shell.exit_code
+
+
+def execute_or_command(command, shell):
+    """
+    Execute the right command only if the left command fails
+
+    Input:
+        - command: an Or_Command object
+        - shell: the current shell instance
+
+    Output:
+        - The exit code of the last executed command
+    """
+    execute_command(command.left_command, shell)
+    if shell.exit_code != 0:
+        execute_command(command.right_command, shell)
+    return shell.exit_code
+
+
+#################################
+#          Background           #
+#################################
+
+
+def run_in_child(command, shell):
+    """
+    Execute a command in a forked child process of the shell
+
+    Output:
+        - The exit code of the command
+    """
+    execute_command(command, shell)
+    return shell.exit_code
+
+
+def start_background_command(command, shell):
+    """
+    Start a command without waiting for it and add it to the job table. Its
+    processes are put into a new process group, so that it can be moved to
+    the foreground later.
+
+    Input:
+        - command: a Background_Command object
+        - shell: the current shell instance
+
+    Output:
+        - The exit code, which is always 0
+    """
+    command = command.left_command
+    stdin_fd = None
+    try:
+        # Without job control, the background commands don't read from the
+        # input of the shell
+        if not shell.is_interactive:
+            stdin_fd = open_file(devnull, O_RDONLY)
+        if isinstance(command, Command):
+            process_list = [start_single_command(command, shell, stdin_fd,
+                                                 None, True, 0)]
+        elif isinstance(command, Pipe_Command):
+            process_list = start_pipe_command(command, shell, stdin_fd, 0)
+        else:
+            process_list = [(start_child_process(
+                lambda: run_in_child(command, shell), stdin_fd, None, 0
+            ),)]
+    finally:
+        close_file_descriptors(stdin_fd)
+    process_id_list = [process[0] for process in process_list
+                       if isinstance(process, tuple)]
+    if process_id_list:
+        job = shell.jobs.add(process_id_list, get_command_string(command))
+        if shell.is_interactive:
+            print("[%d] %d" % (job.number, process_id_list[-1]))
+    return 0
+
+
+#################################
+#           Subshell            #
+#################################
 
 
 def execute_subshell(token, shell):
-    pass
+    """
+    Execute the commands inside a subshell token. This function is called in
+    a forked child process of the shell, which has its own copy of the
+    variables and of the command list parsed with the outer command line.
+
+    Input:
+        - token: a Subshell_Token object
+        - shell: the shell instance of the child process
+
+    Output:
+        - The exit code of the last command
+    """
+    # The child is a subshell that doesn't control the jobs
+    shell.is_interactive = False
+    command_list = token.command_list
+    # Tokens that haven't been through the parser are parsed here
+    if command_list is None:
+        token_list = get_token_list(token.content[1:-1])[0]
+        command_list = get_command_list(token_list)
+    execute_command_list(command_list, shell)
+    return shell.exit_code
 
 
-def execute_command(command,
-                    shell,
-                    print=False):
+#################################
+#      Command Substitution     #
+#################################
+
+
+# Size of the buffer the output of a command substitution is first read
+# into, it is doubled whenever it is full
+CAPTURE_BUFFER_SIZE = 65536
+
+
+def read_output(file_descriptor):
+    """
+    Read everything written to a pipe into a growing bytearray
+
+    Input:
+        - file_descriptor: the read end of the pipe
+
+    Output:
+        - A bytearray of the data, without its trailing newlines
+    """
+    buffer = bytearray(CAPTURE_BUFFER_SIZE)
+    length = 0
+    while True:
+        if length == len(buffer):
+            buffer.extend(bytes(length))
+        # The data is read straight into the free end of the buffer
+        view = memoryview(buffer)[length:]
+        try:
+            count = readv(file_descriptor, [view])
+        finally:
+            view.release()
+        if not count:
+            break
+        length += count
+    # The trailing newlines are removed in place, with the unused space
+    while length and buffer[length - 1] == 10:
+        length -= 1
+    del buffer[length:]
+    return buffer
+
+
+def is_builtin_substitution(token, shell):
+    """
+    Check if a command substitution can run inside the shell process. Every
+    command must be a buffered builtin without redirections.
+
+    Input:
+        - token: a parsed Command_Substitution_Token object
+        - shell: the current shell instance
+    """
+    for command in token.command_list:
+        if (not isinstance(command, Command) or command.stdin or
+                command.stdout):
+            return False
+        word_token_list = [child_token for child_token in command.token_list
+                           if not isinstance(child_token, Separator_Token)]
+        first_token = word_token_list[0] if word_token_list else None
+        if (not isinstance(first_token, Word_Token) or
+                first_token.content not in shell.buffered_builtins):
+            return False
+        # The name of the command must be a whole word
+        index = command.token_list.index(first_token)
+        if (index + 1 < len(command.token_list) and
+                not isinstance(command.token_list[index + 1],
+                               Separator_Token)):
+            return False
+    return True
+
+
+def run_substitution_child(command_list, shell):
+    """
+    Execute the commands of a command substitution in a forked child
+    process, whose stdout is the pipe read by the shell
+
+    Output:
+        - The exit code of the last command
+    """
+    # The child is a subshell that doesn't control the jobs, and the
+    # outputs kept by the shell aren't its own
+    shell.is_interactive = False
+    shell.output.capture_stack.clear()
+    execute_command_list(command_list, shell)
+    return shell.exit_code
+
+
+def run_command_substitution(token, shell):
+    """
+    Run the commands of a command substitution and get their output. The
+    exit code of the commands becomes the exit code of the shell.
+
+    Input:
+        - token: a Command_Substitution_Token object
+        - shell: the current shell instance
+
+    Output:
+        - The output of the commands, without its trailing newlines
+    """
+    parse_subshell_token(token)
+    command_list = token.command_list
+    # The output of the builtins is kept without forking the shell. As in a
+    # child process, the variables they assign are dropped afterwards
+    if is_builtin_substitution(token, shell):
+        shell.output.begin_capture()
+        shell.variables.push_scope()
+        try:
+            execute_command_list(command_list, shell)
+        finally:
+            shell.variables.pop_scope()
+            output = shell.output.end_capture()
+        return output.rstrip("\n")
+    read_fd, write_fd = pipe()
+    process_id = None
+    try:
+        process_id = start_child_process(
+            lambda: run_substitution_child(command_list, shell),
+            None,
+            write_fd
+        )
+        # Only the child keeps the write end, so the reading ends with it
+        close(write_fd)
+        write_fd = None
+        data = read_output(read_fd)
+    finally:
+        close_file_descriptors(read_fd, write_fd)
+        if process_id:
+            shell.exit_code = wait_for_process((process_id,))
+    return data.decode("utf-8", "surrogateescape")
+
+
+#################################
+#           Main Flow           #
+#################################
+
+
+def execute_command(command, shell):
+    """
+    Execute a command and keep its exit code in the shell
+
+    Input:
+        - command: a Command or Binary_Command type object
+        - shell: the current shell instance
+    """
     if isinstance(command, Command):
-        execute_single_command(command,
-                               shell)
+        shell.exit_code = execute_single_command(command, shell)
     elif isinstance(command, Pipe_Command):
-        execute_pipe_command(command,
-                             shell)
+        shell.exit_code = execute_pipe_command(command, shell)
     elif isinstance(command, And_Command):
-        execute_and_command(command,
-                            shell)
+        shell.exit_code = execute_and_command(command, shell)
     elif isinstance(command, Or_Command):
-        execute_or_command(command,
-                           shell)
+        shell.exit_code = execute_or_command(command, shell)
+    elif isinstance(command, Background_Command):
+        shell.exit_code = start_background_command(command, shell)
     else:
         print("command parameter for execute_command function",
               "requires a Command type or Binary type object")
 
 
-def execute_command_list(command_list,
-                         shell):
+def execute_command_list(command_list, shell):
+    """
+    Execute the commands of a command list one by one
+
+    Input:
+        - command_list: a list of Command or Binary_Command type objects
+        - shell: the current shell instance
+    """
     for command in command_list:
-        execute_command(
-            command,
-            shell
-        )
+        execute_command(command, shell)
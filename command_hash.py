@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+from os import stat, access, X_OK
+from os.path import isfile, isabs, join
+from time import monotonic
+
+
+class Command_Hash:
+    """
+    Hash table that remembers the full path of the commands found in the
+    PATH environment variable. The table is emptied when PATH changes or when
+    the modification time of one of its directories changes.
+    """
+    # Minimum number of seconds between two checks of the directories
+    check_interval = 1.0
+
+    def __init__(self):
+        self.path_string = None
+        self.directory_list = []
+        self.directory_mtime_list = []
+        # Dictionary maps a command name to a list of its full path and the
+        # number of times it has been looked up
+        self.command_dict = {}
+        self.last_check_time = 0.0
+
+    def clear(self):
+        """
+        Forget all remembered commands
+        """
+        self.command_dict.clear()
+
+    def get_directory_mtime_list(self):
+        """
+        Get the modification time of each directory in PATH
+
+        Output:
+            - A list of modification times, None for the directories that
+            cannot be accessed
+        """
+        mtime_list = []
+        for directory in self.directory_list:
+            try:
+                mtime_list.append(stat(directory).st_mtime_ns)
+            except OSError:
+                mtime_list.append(None)
+        return mtime_list
+
+    def set_path(self, path_string):
+        """
+        Update the directories that will be searched, the table is emptied if
+        they are different from the current ones
+
+        Input:
+            - path_string: the value of the PATH environment variable
+        """
+        if path_string == self.path_string:
+            return
+        self.path_string = path_string
+        # An empty directory in PATH means the current directory
+        self.directory_list = ([directory or "." for directory in
+                                path_string.split(":")]
+                               if path_string else [])
+        self.directory_mtime_list = self.get_directory_mtime_list()
+        self.last_check_time = monotonic()
+        self.clear()
+
+    def check_directories(self):
+        """
+        Empty the table if any directory in PATH has been modified since the
+        last check
+        """
+        current_time = monotonic()
+        if current_time - self.last_check_time < self.check_interval:
+            return
+        self.last_check_time = current_time
+        mtime_list = self.get_directory_mtime_list()
+        if mtime_list != self.directory_mtime_list:
+            self.directory_mtime_list = mtime_list
+            self.clear()
+
+    def search_path(self, command_name):
+        """
+        Search for a command in the directories of PATH, stopping at the
+        first match
+
+        Input:
+            - command_name: the name of the command
+
+        Output:
+            - The full path of the command, None if it isn't found
+        """
+        for directory in self.directory_list:
+            command_path = join(directory, command_name)
+            if isfile(command_path) and access(command_path, X_OK):
+                return command_path
+        return None
+
+    def find(self, command_name, path_string):
+        """
+        Get the full path of a command, from the table if it has been found
+        before
+
+        Input:
+            - command_name: the name of the command
+            - path_string: the current value of the PATH environment variable
+
+        Output:
+            - The full path of the command, None if it isn't found
+        """
+        self.set_path(path_string)
+        self.check_directories()
+        try:
+            entry = self.command_dict[command_name]
+            entry[1] += 1
+            return entry[0]
+        except KeyError:
+            pass
+        command_path = self.search_path(command_name)
+        # Commands found in a relative directory depend on the current
+        # directory, so they are not remembered
+        if command_path and isabs(command_path):
+            self.command_dict[command_name] = [command_path, 1]
+        return command_path
+
+    def add(self, command_name, path_string):
+        """
+        Search for a command and remember it without counting a hit
+
+        Input:
+            - command_name: the name of the command
+            - path_string: the current value of the PATH environment variable
+
+        Output:
+            - The full path of the command, None if it isn't found
+        """
+        self.set_path(path_string)
+        self.command_dict.pop(command_name, None)
+        command_path = self.search_path(command_name)
+        if command_path and isabs(command_path):
+            self.command_dict[command_name] = [command_path, 0]
+        return command_path
+
+    def get_table(self):
+        """
+        Get the remembered commands as a list of (hits, full path) tuples
+        sorted by command name
+        """
+        return [(self.command_dict[command_name][1],
+                 self.command_dict[command_name][0])
+                for command_name in sorted(self.command_dict)]
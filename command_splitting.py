@@ -2,9 +2,13 @@
 from token_definition import Operator_Token, Word_Token, Param_Expand_Token,\
                              Double_Quote_Token, Single_Quote_Token, Subshell_Token,\
                              Command, Or_Command, And_Command, Pipe_Command,\
-                             Binary_Command, Token, Separator_Token
+                             Background_Command, Binary_Command, Token,\
+                             Separator_Token, Variable_Token, Token_Stream,\
+                             Here_Document_Token, Command_Substitution_Token,\
+                             Arithmetic_Token
 from exception import UnexpectedTokenError
 from naive_lexer import get_token_list
+from utility import read_continuation_line, set_continuation_reader
 
 
 ##############################
@@ -31,7 +35,7 @@ def process_special_operator(token,
     """
     # If the operator is a logical operator, return the result after processing
     # logical operator
-    if token.content != ";":
+    if token.content not in (";", "&"):
         return process_logical_operator(token,
                                         token_list,
                                         binary_command)
@@ -95,10 +99,11 @@ def process_semicolon_operator(token,
                                command_list):
     """
     Complete an unfinished binary command or add a new command into
-    command list when a semicolon appear
+    command list when a semicolon or an ampersand appear. The command before
+    an ampersand is run in the background.
 
     Input:
-        - token: the semicolon token that has been captured
+        - token: the semicolon or ampersand token that has been captured
         - token_list: the current tokens that have been captured
         - binary_command: the current unfinished binary command
 
@@ -115,11 +120,12 @@ def process_semicolon_operator(token,
     if binary_command:
         # Finish it with the new command as its right command
         binary_command.right_command = new_command
-        # Add it into the command list
-        command_list.append(binary_command)
-    # Else add the new command into command list
-    else:
-        command_list.append(new_command)
+        new_command = binary_command
+    # Run the whole command in the background after an ampersand
+    if token.content == "&":
+        new_command = Background_Command(new_command)
+    # Add the command into command list
+    command_list.append(new_command)
     # Since there will be no unfinished binary command no matter after
     # this function, return None
     return None
@@ -154,7 +160,7 @@ def split_by_logical_operators_and_semicolon(initial_token_list):
             # If current token is not a logical operator or a semicolon
             # Add it to the token list
             if (isinstance(token, Operator_Token) and
-                    token.content in ["||", "&&", ";"]):
+                    token.content in ["||", "&&", ";", "&"]):
                 binary_command = process_special_operator(
                     token,
                     token_list,
@@ -170,9 +176,12 @@ def split_by_logical_operators_and_semicolon(initial_token_list):
             index += 1
         # At the end of the token list, if a binary command isn't finished but
         # the token list is empty, ask the user to input more
-        if binary_command and not token_list:
-            additional_input = get_token_list(input(">"))
-            token_list += additional_input
+        if binary_command and Command(token_list).is_empty():
+            initial_token_list = (initial_token_list +
+                                  get_token_list(read_continuation_line())[0])
+        # Stop if there is no command left after the last semicolon
+        elif Command(token_list).is_empty():
+            break
         # Else, the user input is correct,
         # process as if the token list ends with a semicolon
         else:
@@ -223,8 +232,8 @@ def split_command_list_by_pipe(command_list):
               "its parameter")
         return
     # Loop through each command and split them
-    for command in command_list:
-        command = split_command_by_pipe(command)
+    for index, command in enumerate(command_list):
+        command_list[index] = split_command_by_pipe(command)
 
 
 def split_command_by_pipe(command):
@@ -244,13 +253,15 @@ def split_command_by_pipe(command):
         return
     # If the command isn't a Command type object
     if not isinstance(command, Command):
-        # Perform split on its left and right commands
+        # Perform split on its left and right commands, a background
+        # command has no right command
         command.left_command = split_command_by_pipe(
             command.left_command
         )
-        command.right_command = split_command_by_pipe(
-            command.right_command
-        )
+        if command.right_command:
+            command.right_command = split_command_by_pipe(
+                command.right_command
+            )
     # Else if the Command has any pipe token in its token list, perform
     # split for single command on it
     elif any([is_token_a_pipe(token)
@@ -281,6 +292,9 @@ def split_single_command_by_pipe(command):
     pipe_command = None
     # Loop through the token list of the command
     for token in command.token_list:
+        # A pipe cannot start or follow an empty command
+        if is_token_a_pipe(token) and Command(token_list).is_empty():
+            raise UnexpectedTokenError(token.original_string)
         # If the token is a pipe and pipe command isn't empty
         if is_token_a_pipe(token) and pipe_command:
             # Complete the pipe command with a command created by the
@@ -303,7 +317,9 @@ def split_single_command_by_pipe(command):
             # Add the token to the token list`
             token_list.append(token)
     # Finish the incomplete pipe command with the new command created
-    # by the remaining token list
+    # by the remaining token list, which cannot be empty either
+    if Command(token_list).is_empty():
+        raise UnexpectedTokenError("|")
     pipe_command.right_command = Command(token_list)
     # Return the final pipe command
     return pipe_command
@@ -314,6 +330,13 @@ def split_single_command_by_pipe(command):
 ##############################
 
 
+# Types of the tokens that can be the target of a redirection
+REDIRECTION_TARGET_TYPES = (Word_Token, Param_Expand_Token, Double_Quote_Token,
+                            Single_Quote_Token, Variable_Token,
+                            Here_Document_Token, Command_Substitution_Token,
+                            Arithmetic_Token)
+
+
 def is_token_a_redirection(token):
     """
     Check if a token is a redirection operator
@@ -355,13 +378,7 @@ def process_redirection_operator(token_list, standard_stream, index):
         while isinstance(token_list[index], Separator_Token):
             token_list.pop(index)
         # If the type of next token isn't one of the below, raise error
-        if (type(token_list[index]) not in
-                [
-                    Word_Token,
-                    Param_Expand_Token,
-                    Double_Quote_Token,
-                    Single_Quote_Token
-        ]):
+        if not isinstance(token_list[index], REDIRECTION_TARGET_TYPES):
             raise UnexpectedTokenError(token_list[index].original_string)
         # Append the next token into the stream token list
         standard_stream.append(token_list.pop(index))
@@ -401,7 +418,9 @@ def process_redirection_for_single_command(command):
             # Skip it and move to the next token
             index += 1
             continue
-        # Process redirection operators
+        # Process redirection operators. The operator and its target are
+        # popped out of the token list, so the index already points to the
+        # next token
         if current_token.content in ["<", "<<"]:
             command.stdin = process_redirection_operator(
                 command.token_list,
@@ -414,7 +433,6 @@ def process_redirection_for_single_command(command):
                 command.stdout,
                 index
             )
-        index += 1
     return command
 
 
@@ -434,9 +452,10 @@ def process_redirection_for_command(command):
         command.left_command = process_redirection_for_command(
             command.left_command
         )
-        command.right_command = process_redirection_for_command(
-            command.right_command
-        )
+        if command.right_command:
+            command.right_command = process_redirection_for_command(
+                command.right_command
+            )
     # Elif the command is a Command type object
     elif isinstance(command, Command):
         command = process_redirection_for_single_command(
@@ -462,8 +481,8 @@ def process_redirection_for_command_list(command_list):
         print("process_redirection requires a list object as its parameter")
         return
     # Process the direction token for each command in command list
-    for command in command_list:
-        command = process_redirection_for_command(command)
+    for index, command in enumerate(command_list):
+        command_list[index] = process_redirection_for_command(command)
 
 
 ##############################
@@ -487,7 +506,8 @@ def check_subshell_syntax_for_single_command(command):
               "requires a Command object as its parameter")
         return None
     for token in command.token_list:
-        if not isinstance(token, (Subshell_Token, Operator_Token)):
+        if not isinstance(token, (Subshell_Token, Operator_Token,
+                                  Separator_Token)):
             return token
     return None
 
@@ -507,9 +527,9 @@ def check_subshell_syntax_for_command(command):
     # If the command is a Binary_Command, check syntax for its left and right
     # commands
     if isinstance(command, Binary_Command):
-        print(command)
         check_subshell_syntax_for_command(command.left_command)
-        check_subshell_syntax_for_command(command.right_command)
+        if command.right_command:
+            check_subshell_syntax_for_command(command.right_command)
     # Else check syntax for the single command only if there is a subshell
     # token in its token list
     else:
@@ -537,14 +557,210 @@ def check_subshell_syntax(command_list):
     return command_list
 
 
+##############################
+#     Single-pass Parser     #
+##############################
+
+
+def create_single_command(token_list, stdin, stdout, invalid_token,
+                          redirection_token):
+    """
+    Create a single command at the end of a pipe segment and check its syntax
+
+    Input:
+        - token_list: the tokens of the command without its redirections
+        - stdin: the stdin redirection operator and target tokens
+        - stdout: the stdout redirection operator and target tokens
+        - invalid_token: the first token that cannot be next to a subshell,
+        None if there is no subshell token or every token is valid
+        - redirection_token: the redirection operator that is still waiting
+        for its target
+
+    Output:
+        - command: the new Command object
+    """
+    # A redirection cannot end a command
+    if redirection_token:
+        raise UnexpectedTokenError("<newline>")
+    # A subshell can only be surrounded by separators
+    if invalid_token:
+        raise UnexpectedTokenError(invalid_token.original_string)
+    return Command(token_list, stdin, stdout)
+
+
+def reject_continuation_line():
+    """
+    Continuation reader used inside a subshell, whose closing parenthesis
+    ends the command
+    """
+    raise UnexpectedTokenError(")")
+
+
+def parse_subshell_token(token):
+    """
+    Parse the commands inside a subshell token and keep them in the token,
+    so that the child process doesn't need to lex them again. The tokens
+    kept by the lexer are used, so a nested subshell is only lexed and
+    parsed once. A command substitution is parsed the same way when it is
+    first expanded.
+
+    Input:
+        - token: a Subshell_Token or Command_Substitution_Token object
+    """
+    if token.command_list is not None:
+        return
+    token_list = token.token_list
+    if token_list is None:
+        token_list = get_token_list(token.content[1:-1])[0]
+    # An incomplete command inside the parentheses is a syntax error
+    previous_reader = set_continuation_reader(reject_continuation_line)
+    try:
+        token.command_list = get_command_list_single_pass(token_list)
+    finally:
+        set_continuation_reader(previous_reader)
+
+
+def get_command_list_single_pass(initial_token_list):
+    """
+    Build the command list with a single scan of the token list, splitting
+    by logical operators, semicolons and pipes, processing redirections and
+    checking the subshell syntax at the same time
+
+    Input:
+        - initial_token_list: a list of Token-type objects or a Token_Stream
+
+    Output:
+        - command_list: a list of Command type or Binary_Command type objects
+    """
+    type_of_binary_command = {
+        "||": Or_Command,
+        "&&": And_Command
+    }
+    command_list = []
+    # The last unfinished binary command and pipe command
+    binary_command = None
+    pipe_command = None
+    # Number of tokens other than separators in the current pipe segment
+    segment_length = 0
+    # State of the single command that is being built
+    token_list = []
+    stdin = stdout = None
+    redirection_token = None
+    has_subshell = False
+    invalid_token = None
+    # A Token_Stream creates its tokens while it is iterated, the operators
+    # and the separators are shared
+    token_iterator = iter(initial_token_list)
+    while True:
+        for token in token_iterator:
+            # If a redirection is waiting for its target
+            if redirection_token and not (isinstance(token, Operator_Token)
+                                          and token.content in SPLIT_OPERATORS):
+                # Skip the separators before the target
+                if isinstance(token, Separator_Token):
+                    continue
+                segment_length += 1
+                if not isinstance(token, REDIRECTION_TARGET_TYPES):
+                    raise UnexpectedTokenError(token.original_string)
+                if redirection_token.content in ("<", "<<"):
+                    stdin = [redirection_token, token]
+                else:
+                    stdout = [redirection_token, token]
+                redirection_token = None
+                continue
+            # If the token isn't an operator, add it to the current command
+            if not isinstance(token, Operator_Token):
+                token_list.append(token)
+                if isinstance(token, Separator_Token):
+                    continue
+                segment_length += 1
+                if isinstance(token, Subshell_Token):
+                    has_subshell = True
+                    parse_subshell_token(token)
+                elif not invalid_token:
+                    invalid_token = token
+                continue
+            # If the token is a redirection operator, wait for its target
+            if token.content in REDIRECTION_OPERATORS:
+                segment_length += 1
+                redirection_token = token
+                continue
+            # Else the token ends the current command, which cannot be empty
+            if not segment_length:
+                raise UnexpectedTokenError(token.original_string)
+            command = create_single_command(
+                token_list, stdin, stdout,
+                invalid_token if has_subshell else None,
+                redirection_token
+            )
+            token_list = []
+            stdin = stdout = None
+            has_subshell = False
+            invalid_token = None
+            segment_length = 0
+            # Complete the pipe command
+            if pipe_command:
+                pipe_command.right_command = command
+                command = pipe_command
+                pipe_command = None
+            # A pipe starts or continues a pipe command
+            if token.content == "|":
+                pipe_command = Pipe_Command(command, None)
+            # A logical operator starts or continues a binary command
+            elif token.content in type_of_binary_command:
+                if binary_command:
+                    binary_command.right_command = command
+                    command = binary_command
+                binary_command = type_of_binary_command[token.content](
+                    command, None
+                )
+            # A semicolon or an ampersand ends the binary command, the
+            # command before an ampersand is run in the background
+            else:
+                if binary_command:
+                    binary_command.right_command = command
+                    command = binary_command
+                    binary_command = None
+                if token.content == "&":
+                    command = Background_Command(command)
+                command_list.append(command)
+        # Ask the user for more input if a binary command or a pipe command
+        # is unfinished
+        if (binary_command or pipe_command) and not segment_length:
+            token_iterator = iter(get_token_list(read_continuation_line())[0])
+            continue
+        # Process the remaining tokens as if they end with a semicolon
+        if segment_length:
+            command = create_single_command(
+                token_list, stdin, stdout,
+                invalid_token if has_subshell else None,
+                redirection_token
+            )
+            if pipe_command:
+                pipe_command.right_command = command
+                command = pipe_command
+            if binary_command:
+                binary_command.right_command = command
+                command = binary_command
+            command_list.append(command)
+        return command_list
+
+
 ##############################
 #          MAIN FLOW         #
 ##############################
 
 
-def get_command_list(token_list):
+# Operators that split the token list into commands
+SPLIT_OPERATORS = ("||", "&&", ";", "&", "|")
+# Operators that redirect the standard streams of a command
+REDIRECTION_OPERATORS = (">", "<", "<<", ">>")
+
+
+def get_command_list_multi_pass(token_list):
     """
-    From the token string, filter and split the tokens into commands
+    From the token string, filter and split the tokens into commands, with a
+    separate pass over the tokens for each step
 
     Input:
         - token_list: a list of Token-type objects
@@ -553,10 +769,6 @@ def get_command_list(token_list):
         - command_list: a list of Command type or Binary_Command type objects
         that are derived from the token_list
     """
-    # Check if the input is correct
-    if not isinstance(token_list, list):
-        print("get_command_list requires a list object as its parameter")
-        return []
     # Start by splitting command by logical operators and semicolon
     command_list = split_by_logical_operators_and_semicolon(token_list)
     # Split the command list using the pipe operator as delimiter
@@ -566,3 +778,21 @@ def get_command_list(token_list):
     # Check syntax for subshell in the command list
     check_subshell_syntax(command_list)
     return command_list
+
+
+def get_command_list(token_list):
+    """
+    From the token string, filter and split the tokens into commands
+
+    Input:
+        - token_list: a list of Token-type objects or a Token_Stream
+
+    Output:
+        - command_list: a list of Command type or Binary_Command type objects
+        that are derived from the token_list
+    """
+    # Check if the input is correct
+    if not isinstance(token_list, (list, Token_Stream)):
+        print("get_command_list requires a list object as its parameter")
+        return []
+    return get_command_list_single_pass(token_list)
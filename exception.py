@@ -20,4 +20,14 @@ class CommandNotFoundError(Error):
 
 class EventNotFoundError(Error):
     def __init__(self, argument):
-        self.argument = argument
\ No newline at end of file
+        self.argument = argument
+
+
+class AmbiguousRedirectError(Error):
+    def __init__(self, argument):
+        self.argument = argument
+
+
+class ArithmeticExpressionError(Error):
+    def __init__(self, argument):
+        self.argument = argument
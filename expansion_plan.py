@@ -0,0 +1,555 @@
+#!/usr/bin/env python3
+from token_definition import Double_Quote_Token, Single_Quote_Token,\
+                             Param_Expand_Token, Param_Value_Token,\
+                             Variable_Token, Operator_Token, Word_Token,\
+                             Subshell_Token, Separator_Token,\
+                             Here_Document_Token, Command_Substitution_Token,\
+                             Arithmetic_Token
+from exception import UnexpectedTokenError, BadSubstitutionError,\
+                      AmbiguousRedirectError
+from param_expansion import expand_parameter
+from arithmetic import evaluate_expression
+from globbing import globbing
+from here_document import needs_expansion, get_here_document_data
+from naive_lexer import get_here_document_content
+from re import compile
+
+
+#################################
+#             Parts             #
+#################################
+
+
+# A part is either a string that doesn't depend on the shell or a function
+# that takes the shell and returns the string of the part
+
+
+def compile_variable(token):
+    """
+    Compile a variable token into a function that gets its value
+
+    Input:
+        - token: a Variable_Token object
+    """
+    name = token.content
+
+    def get_variable(shell):
+        return str(shell.variables.get(name, ""))
+    return get_variable
+
+
+def compile_command_substitution(token):
+    """
+    Compile a command substitution token into a function that runs its
+    commands and gets their output
+
+    Input:
+        - token: a Command_Substitution_Token object
+    """
+    def substitute_command(shell):
+        return shell.substitute_command(token)
+    return substitute_command
+
+
+def compile_arithmetic(token):
+    """
+    Compile an arithmetic expansion token into a function that evaluates
+    it. The compiled expression is cached by its text, so it is only parsed
+    again if its parameters change it.
+
+    Input:
+        - token: an Arithmetic_Token object
+    """
+    expression_part = compile_double_quote(token)
+
+    def evaluate_arithmetic(shell):
+        expression = (expression_part if isinstance(expression_part, str)
+                      else expression_part(shell))
+        return str(evaluate_expression(expression, shell.variables))
+    return evaluate_arithmetic
+
+
+def compile_string_part_list(part_list):
+    """
+    Compile a list of parts into a single part that joins them
+
+    Input:
+        - part_list: a list of strings and functions
+
+    Output:
+        - A string if every part is a string, else a function
+    """
+    # Join the consecutive strings
+    template = []
+    for part in part_list:
+        if isinstance(part, str) and template and\
+                isinstance(template[-1], str):
+            template[-1] += part
+        elif part != "":
+            template.append(part)
+    if all(isinstance(part, str) for part in template):
+        return "".join(template)
+    if len(template) == 1:
+        return template[0]
+    # Only the functions are called, their results are put in a copy of
+    # the template
+    function_list = [(index, part) for index, part in enumerate(template)
+                     if not isinstance(part, str)]
+
+    def join_parts(shell):
+        string_list = template[:]
+        for index, function in function_list:
+            string_list[index] = function(shell)
+        return "".join(string_list)
+    return join_parts
+
+
+def compile_double_quote(token):
+    """
+    Compile a double quote token into a part
+
+    Input:
+        - token: a Double_Quote_Token or Arithmetic_Token object
+    """
+    if None in token.content:
+        return ""
+    part_list = []
+    for child_token in token.content:
+        if isinstance(child_token, (Operator_Token, Word_Token,
+                                    Separator_Token)):
+            part_list.append(child_token.content)
+        elif isinstance(child_token, Param_Expand_Token):
+            part_list.append(compile_parameter(child_token))
+        elif isinstance(child_token, Variable_Token):
+            part_list.append(compile_variable(child_token))
+        elif isinstance(child_token, Command_Substitution_Token):
+            part_list.append(compile_command_substitution(child_token))
+        elif isinstance(child_token, Arithmetic_Token):
+            part_list.append(compile_arithmetic(child_token))
+        else:
+            raise UnexpectedTokenError(token.original_string)
+    return compile_string_part_list(part_list)
+
+
+def compile_here_document(token):
+    """
+    Compile the body of a here-document into a part. The body is lexed as
+    the content of a double quote when its command is first run.
+
+    Input:
+        - token: a Here_Document_Token object
+
+    Output:
+        - The part of the body, None if it is written as it is
+    """
+    if not needs_expansion(token):
+        return None
+    body = "".join(token.content)
+    return compile_double_quote(
+        Double_Quote_Token(get_here_document_content(body), body)
+    )
+
+
+def compile_parameter_value(token):
+    """
+    Compile the substitute value of a parameter expansion into a part
+
+    Input:
+        - token: a Param_Value_Token object or None
+    """
+    if not isinstance(token, Param_Value_Token) or None in token.content:
+        return ""
+    return compile_string_part_list([compile_token(child_token)
+                                     for child_token in token.content])
+
+
+def compile_parameter(token):
+    """
+    Compile a parameter expansion token into a function
+
+    Input:
+        - token: a Param_Expand_Token object
+    """
+    variable_token = operator_token = value_token = None
+    for child_token in token.content:
+        if isinstance(child_token, Variable_Token) and not variable_token:
+            variable_token = child_token
+        elif isinstance(child_token, Operator_Token) and not operator_token:
+            operator_token = child_token
+        elif isinstance(child_token, Param_Value_Token) and not value_token:
+            value_token = child_token
+    if not variable_token:
+        raise BadSubstitutionError(token.original_string)
+    name = variable_token.content
+    operator_string = operator_token.content if operator_token else ""
+    value_part = compile_parameter_value(value_token)
+
+    def get_parameter(shell):
+        value_string = (value_part if isinstance(value_part, str)
+                        else value_part(shell))
+        return expand_parameter(name, operator_string, value_string,
+                                shell.variables) or ""
+    return get_parameter
+
+
+def compile_token(token):
+    """
+    Compile a token into a part, without globbing
+
+    Input:
+        - token: a Token object
+
+    Output:
+        - The part of the token
+    """
+    if isinstance(token, (Operator_Token, Separator_Token, Subshell_Token,
+                          Word_Token)):
+        return token.content
+    if isinstance(token, Param_Expand_Token):
+        return compile_parameter(token)
+    if isinstance(token, Variable_Token):
+        return compile_variable(token)
+    if isinstance(token, Double_Quote_Token):
+        return compile_double_quote(token)
+    if isinstance(token, Single_Quote_Token):
+        return token.content.strip("'")
+    if isinstance(token, Command_Substitution_Token):
+        return compile_command_substitution(token)
+    if isinstance(token, Arithmetic_Token):
+        return compile_arithmetic(token)
+    return ""
+
+
+#################################
+#             Words             #
+#################################
+
+
+def split_fields(value, field, field_list):
+    """
+    Split the result of an unquoted command substitution into fields at
+    its whitespace
+
+    Input:
+        - value: the result of the substitution
+        - field: the field the result starts in, None if there is none
+        - field_list: the list the finished fields are added to
+
+    Output:
+        - The field the result ends in, None if it ends with whitespace
+    """
+    piece_list = value.split()
+    if not piece_list:
+        # A result made of whitespace only ends the current field
+        if value and field is not None:
+            field_list.append(field)
+            field = None
+        return field
+    if value[0].isspace() and field is not None:
+        field_list.append(field)
+        field = None
+    field = (field or "") + piece_list[0]
+    for piece in piece_list[1:]:
+        field_list.append(field)
+        field = piece
+    if value[-1].isspace():
+        field_list.append(field)
+        field = None
+    return field
+
+
+def compile_split_word(token_list, token_part_list, apply_globbing):
+    """
+    Compile the tokens of a word with an unquoted command substitution,
+    whose result can make several arguments
+
+    Input:
+        - token_list: the tokens between two separators
+        - token_part_list: the part of each token
+        - apply_globbing: whether the arguments are globbed
+
+    Output:
+        - A function that takes the shell and the argument list
+    """
+    part_list = [(part,
+                  isinstance(token, Command_Substitution_Token),
+                  isinstance(token, (Double_Quote_Token, Single_Quote_Token)))
+                 for token, part in zip(token_list, token_part_list)]
+
+    def add_split_word(shell, argument_list):
+        field_list = []
+        field = None
+        for part, is_split, is_quoted in part_list:
+            value = part if isinstance(part, str) else part(shell)
+            if is_split:
+                field = split_fields(value, field, field_list)
+            # An empty expansion doesn't start a field unless it is quoted
+            elif value or is_quoted:
+                field = (field or "") + value
+        if field is not None:
+            field_list.append(field)
+        if not apply_globbing:
+            argument_list.extend(field_list)
+            return
+        for field in field_list:
+            argument_list.extend(globbing(field))
+    return add_split_word
+
+
+def compile_word(token_list):
+    """
+    Compile the tokens of a single word into a step that adds its arguments
+    to an argument list
+
+    Input:
+        - token_list: the tokens between two separators
+
+    Output:
+        - A function that takes the shell and the argument list, None if the
+        word never creates an argument
+    """
+    part_list = []
+    is_quoted = False
+    apply_globbing = False
+    for token in token_list:
+        # Words are globbed after all parts of the argument are joined
+        if isinstance(token, Word_Token):
+            apply_globbing = (apply_globbing or
+                              any(char in token.content for char in "*?["))
+        elif isinstance(token, (Double_Quote_Token, Single_Quote_Token)):
+            is_quoted = True
+        part_list.append(compile_token(token))
+    # The result of an unquoted command substitution is split into fields
+    if any(isinstance(token, Command_Substitution_Token)
+           for token in token_list):
+        return compile_split_word(token_list, part_list, apply_globbing)
+    part = compile_string_part_list(part_list)
+    if isinstance(part, str):
+        if apply_globbing:
+            return lambda shell, argument_list: argument_list.extend(
+                globbing(part)
+            )
+        if part or is_quoted:
+            return lambda shell, argument_list: argument_list.append(part)
+        return None
+    if apply_globbing:
+        return lambda shell, argument_list: argument_list.extend(
+            globbing(part(shell))
+        )
+    if is_quoted:
+        return lambda shell, argument_list: argument_list.append(part(shell))
+
+    def add_unquoted_word(shell, argument_list):
+        # An unquoted word whose expansions are empty is removed
+        word = part(shell)
+        if word:
+            argument_list.append(word)
+    return add_unquoted_word
+
+
+def split_word_list(token_list):
+    """
+    Split a token list into the token lists of its words
+
+    Input:
+        - token_list: a token list whose words are separated by separator
+        tokens
+
+    Output:
+        - word_list: a list of the token lists of the words
+    """
+    word_list = []
+    word_token_list = []
+    for token in token_list:
+        # A separator ends the current word
+        if isinstance(token, Separator_Token):
+            if word_token_list:
+                word_list.append(word_token_list)
+                word_token_list = []
+        else:
+            word_token_list.append(token)
+    if word_token_list:
+        word_list.append(word_token_list)
+    return word_list
+
+
+def compile_argument_list(token_list):
+    """
+    Compile a token list into the list of the steps of its words
+
+    Input:
+        - token_list: a token list whose words are separated by separator
+        tokens
+
+    Output:
+        - step_list: the steps of the words that can create an argument
+    """
+    return compile_word_list(split_word_list(token_list))
+
+
+def compile_word_list(word_list):
+    """
+    Compile the token lists of several words into their steps
+    """
+    step_list = []
+    for word_token_list in word_list:
+        step = compile_word(word_token_list)
+        if step:
+            step_list.append(step)
+    return step_list
+
+
+# The beginning of a word that assigns a variable
+ASSIGNMENT_PATTERN = compile(r"[A-Za-z_][A-Za-z0-9_]*=")
+
+
+def compile_assignment(token_list):
+    """
+    Compile a word that assigns a value to a variable, such as FOO=bar. The
+    value isn't split or globbed.
+
+    Input:
+        - token_list: the tokens of the word
+
+    Output:
+        - A tuple of the name of the variable and the part of its value, None
+        if the word isn't an assignment
+    """
+    first_token = token_list[0]
+    if not isinstance(first_token, Word_Token):
+        return None
+    match = ASSIGNMENT_PATTERN.match(first_token.content)
+    if not match:
+        return None
+    return (match.group()[:-1], compile_string_part_list(
+        [first_token.content[match.end():]] +
+        [compile_token(token) for token in token_list[1:]]
+    ))
+
+
+#################################
+#              Plan             #
+#################################
+
+
+class Redirection_Plan:
+    """
+    Compiled form of the redirection of a standard stream
+    """
+    __slots__ = ("operator", "step_list", "error_string",
+                 "here_document_token", "here_document_part")
+
+    def __init__(self, stream_token_list):
+        self.operator = stream_token_list[0].content
+        self.step_list = compile_argument_list(stream_token_list[1:])
+        self.error_string = stream_token_list[-1].original_string
+        self.here_document_token = (
+            stream_token_list[-1]
+            if isinstance(stream_token_list[-1], Here_Document_Token)
+            else None
+        )
+        self.here_document_part = (
+            compile_here_document(self.here_document_token)
+            if self.here_document_token else None
+        )
+
+    def expand(self, shell):
+        """
+        Get the redirection operator and its target
+
+        Output:
+            - A list of the operator and the target, which is the list of
+            the encoded lines of the body for a here-document
+        """
+        if self.here_document_part is not None:
+            body = (self.here_document_part
+                    if isinstance(self.here_document_part, str)
+                    else self.here_document_part(shell))
+            return [self.operator,
+                    [body.encode("utf-8", "surrogateescape")]]
+        if self.here_document_token:
+            return [self.operator,
+                    get_here_document_data(self.here_document_token)]
+        target_list = []
+        for step in self.step_list:
+            step(shell, target_list)
+        # The target of a redirection must be a single word
+        if len(target_list) != 1:
+            raise AmbiguousRedirectError(self.error_string)
+        return [self.operator, target_list[0]]
+
+
+class Command_Plan:
+    """
+    Compiled form of the expansions of a single command. The token list is
+    compiled once into a flat list of steps, one for each word, that can be
+    run many times against the current state of the shell.
+    """
+    __slots__ = ("assignment_list", "step_list", "stdin", "stdout",
+                 "subshell_token")
+
+    def __init__(self, command):
+        word_list = split_word_list(command.token_list)
+        # The assignments before the first argument of the command
+        self.assignment_list = []
+        while word_list:
+            assignment = compile_assignment(word_list[0])
+            if not assignment:
+                break
+            self.assignment_list.append(assignment)
+            word_list.pop(0)
+        self.step_list = compile_word_list(word_list)
+        self.stdin = (Redirection_Plan(command.stdin) if command.stdin
+                      else None)
+        self.stdout = (Redirection_Plan(command.stdout) if command.stdout
+                       else None)
+        self.subshell_token = next((token for token in command.token_list
+                                    if isinstance(token, Subshell_Token)),
+                                   None)
+
+    def expand(self, shell):
+        """
+        Expand the command with the current state of the shell
+
+        Input:
+            - shell: a Shell object whose variables are used in the
+            expansion
+
+        Output:
+            - argument_list: the list of arguments of the command
+            - stdin: the stdin redirection operator and its target, or None
+            - stdout: the stdout redirection operator and its target, or None
+        """
+        argument_list = []
+        for step in self.step_list:
+            step(shell, argument_list)
+        return (argument_list,
+                self.stdin.expand(shell) if self.stdin else None,
+                self.stdout.expand(shell) if self.stdout else None)
+
+    def expand_assignments(self, shell):
+        """
+        Expand the values of the assignments before the command
+
+        Output:
+            - A list of tuples of the name of each variable and its value
+        """
+        return [(name, part if isinstance(part, str) else part(shell))
+                for name, part in self.assignment_list]
+
+
+def get_command_plan(command):
+    """
+    Get the plan of a command, compiling it the first time
+
+    Input:
+        - command: a Command object
+
+    Output:
+        - The Command_Plan of the command, kept in the command so that it
+        is cached with the command list of the line
+    """
+    plan = command.plan
+    if plan is None:
+        plan = command.plan = Command_Plan(command)
+    return plan
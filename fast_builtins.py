@@ -0,0 +1,456 @@
+#!/usr/bin/env python3
+from os import stat, lstat, access, R_OK, W_OK, X_OK, getuid, getgid, isatty
+from stat import S_ISREG, S_ISDIR, S_ISLNK, S_ISBLK, S_ISCHR, S_ISFIFO,\
+                 S_ISSOCK, S_ISUID, S_ISGID, S_ISVTX
+from re import compile
+
+
+#################################
+#        Escape Sequences       #
+#################################
+
+
+# Characters of the simple backslash escapes of echo -e and printf
+ESCAPE_CHARACTERS = {
+    "a": "\a", "b": "\b", "e": "\x1b", "E": "\x1b", "f": "\f", "n": "\n",
+    "r": "\r", "t": "\t", "v": "\v", "\\": "\\"
+}
+# A backslash escape of the %b format of printf: a simple one, \c, an octal
+# number with an optional leading zero or a hexadecimal number
+ESCAPE_PATTERN = compile(r"\\(?:([abeEfnrtv\\c])|0?([0-7]{1,3})|"
+                         r"x([0-9a-fA-F]{1,2}))")
+# The octal numbers of echo -e always start with a zero
+ECHO_ESCAPE_PATTERN = compile(r"\\(?:([abeEfnrtv\\c])|0([0-7]{0,3})|"
+                              r"x([0-9a-fA-F]{1,2}))")
+# The format string of printf has no \c, and its octal numbers have up to
+# three digits including the leading zero
+FORMAT_ESCAPE_PATTERN = compile(r"\\(?:([abeEfnrtv\\])|([0-7]{1,3})|"
+                                r"x([0-9a-fA-F]{1,2}))")
+
+
+def interpret_escapes(string, pattern=ESCAPE_PATTERN):
+    """
+    Replace the backslash escapes of a string, as echo -e and printf do
+
+    Input:
+        - string: the string that contains the escapes
+        - pattern: the escapes that are recognized, those of the %b format
+        of printf by default
+
+    Output:
+        - The string after the replacement
+        - A boolean value that tells whether a \\c has been found, the output
+        stops there
+    """
+    if "\\" not in string:
+        return string, False
+    part_list = []
+    begin_index = 0
+    for match in pattern.finditer(string):
+        part_list.append(string[begin_index:match.start()])
+        begin_index = match.end()
+        simple_char, octal_number, hexadecimal_number = match.groups()
+        if simple_char == "c":
+            return "".join(part_list), True
+        if simple_char:
+            part_list.append(ESCAPE_CHARACTERS[simple_char])
+        elif octal_number is not None:
+            part_list.append(chr(int(octal_number or "0", 8) & 0xff))
+        else:
+            part_list.append(chr(int(hexadecimal_number, 16)))
+    part_list.append(string[begin_index:])
+    return "".join(part_list), False
+
+
+#################################
+#             Printf            #
+#################################
+
+
+# A conversion specification of printf: flags, width, precision and the
+# conversion character
+FORMAT_SPECIFICATION_PATTERN = compile(
+    r"%([-+ #0]*)(\d+|\*)?(?:\.(\d*|\*))?([diouxXcsbfFeEgG%])"
+)
+# The longest number at the start of an argument, as strtol and strtod read
+# it: leading blanks are skipped and the rest of the argument is invalid
+INTEGER_PATTERN = compile(r"\s*[+-]?(?:0[xX][0-9a-fA-F]+|0[0-7]*|[1-9]\d*)")
+FLOAT_PATTERN = compile(r"(?i)\s*[+-]?(?:(?:\d+\.?\d*|\.\d+)(?:e[+-]?\d+)?|"
+                        r"inf(?:inity)?|nan)")
+# The conversions of an unsigned number wrap the negative ones around
+UNSIGNED_CONVERSIONS = frozenset("ouxX")
+
+
+def get_printf_number(argument, is_float):
+    """
+    Convert an argument of printf into a number the way the shell does
+
+    Input:
+        - argument: the argument string
+        - is_float: a boolean value that determines whether a float is
+        expected
+
+    Output:
+        - The number, 0 for an empty argument. The number at the start of an
+        invalid argument is still used.
+        - An error message if the argument isn't a valid number, else None
+    """
+    if not argument:
+        return 0, None
+    # A leading quote gives the code of the next character
+    if argument[0] in "'\"":
+        return (ord(argument[1]) if len(argument) > 1 else 0), None
+    match = (FLOAT_PATTERN if is_float else INTEGER_PATTERN).match(argument)
+    number = 0
+    if match:
+        number_string = match.group().strip()
+        if is_float:
+            number = float(number_string)
+        else:
+            digit_string = number_string.lstrip("+-")
+            # Numbers starting with 0x are hexadecimal, and the other ones
+            # starting with a zero are octal
+            number = int(number_string, 16 if digit_string[:2].lower() == "0x"
+                         else 8 if digit_string[:1] == "0" else 10)
+        if match.end() == len(argument):
+            return number, None
+    if argument[:1] == "0" and argument[1:2].isdigit():
+        return number, "intek-sh: printf: %s: invalid octal number" % argument
+    if argument[:2].lower() == "0x":
+        return number, "intek-sh: printf: %s: invalid hex number" % argument
+    return number, "intek-sh: printf: %s: invalid number" % argument
+
+
+def format_alternate_octal(flags, width, precision, number):
+    """
+    Format a number with the %#o conversion of C, which starts the number
+    with a single zero instead of the 0o prefix of Python
+
+    Input:
+        - flags, width, precision: the parts of the conversion specification
+        - number: the number that will be formatted
+
+    Output:
+        - The formatted number
+    """
+    digit_string = ("%." + (precision or "1") + "o") % number
+    if not digit_string.startswith("0"):
+        digit_string = "0" + digit_string
+    width = int(width or 0)
+    if "-" in flags:
+        return digit_string.ljust(width)
+    if "0" in flags and precision is None:
+        return digit_string.rjust(width, "0")
+    return digit_string.rjust(width)
+
+
+def format_printf(format_string, argument_list):
+    """
+    Format the arguments of printf. The format is reused until every
+    argument has been consumed.
+
+    Input:
+        - format_string: the format string after the escapes have been
+        interpreted
+        - argument_list: the arguments after the format
+
+    Output:
+        - The formatted string
+        - The list of error messages
+    """
+    part_list = []
+    error_list = []
+    argument_index = 0
+
+    def next_argument():
+        nonlocal argument_index
+        if argument_index < len(argument_list):
+            argument_index += 1
+            return argument_list[argument_index - 1]
+        return None
+
+    while True:
+        begin_index = 0
+        used_argument = False
+        for match in FORMAT_SPECIFICATION_PATTERN.finditer(format_string):
+            part_list.append(format_string[begin_index:match.start()])
+            begin_index = match.end()
+            flags, width, precision, conversion = match.groups()
+            if conversion == "%":
+                part_list.append("%")
+                continue
+            # A star takes the width or the precision from the arguments
+            if width == "*":
+                used_argument = True
+                width = str(get_printf_number(next_argument() or "", False)[0])
+            if precision == "*":
+                used_argument = True
+                precision = str(get_printf_number(next_argument() or "",
+                                                  False)[0])
+            argument = next_argument()
+            used_argument = used_argument or argument is not None
+            argument = argument if argument is not None else ""
+            specification = "%" + flags + (width or "") + (
+                "." + precision if precision is not None else ""
+            )
+            if conversion in "diouxX":
+                number, error = get_printf_number(argument, False)
+                if error:
+                    error_list.append(error)
+                if conversion in UNSIGNED_CONVERSIONS and number < 0:
+                    number &= 0xffffffffffffffff
+                if conversion == "o" and "#" in flags:
+                    part_list.append(format_alternate_octal(flags, width,
+                                                            precision, number))
+                else:
+                    part_list.append((specification +
+                                      conversion.replace("u", "d")
+                                      .replace("i", "d")) % number)
+            elif conversion in "fFeEgG":
+                number, error = get_printf_number(argument, True)
+                if error:
+                    error_list.append(error)
+                part_list.append((specification + conversion) % number)
+            elif conversion == "c":
+                part_list.append((specification + "s") % argument[:1])
+            elif conversion == "b":
+                argument, is_stopped = interpret_escapes(argument)
+                part_list.append((specification + "s") % argument)
+                if is_stopped:
+                    return "".join(part_list), error_list
+            else:
+                part_list.append((specification + "s") % argument)
+        part_list.append(format_string[begin_index:])
+        # Stop when every argument has been consumed, or when the format
+        # doesn't consume any argument
+        if argument_index >= len(argument_list) or not used_argument:
+            return "".join(part_list), error_list
+
+
+#################################
+#          Conditional          #
+#################################
+
+
+# File predicates that are answered with the stat result of the file
+STAT_PREDICATES = {
+    "-e": lambda result: True,
+    "-f": lambda result: S_ISREG(result.st_mode),
+    "-d": lambda result: S_ISDIR(result.st_mode),
+    "-b": lambda result: S_ISBLK(result.st_mode),
+    "-c": lambda result: S_ISCHR(result.st_mode),
+    "-p": lambda result: S_ISFIFO(result.st_mode),
+    "-S": lambda result: S_ISSOCK(result.st_mode),
+    "-s": lambda result: result.st_size > 0,
+    "-u": lambda result: bool(result.st_mode & S_ISUID),
+    "-g": lambda result: bool(result.st_mode & S_ISGID),
+    "-k": lambda result: bool(result.st_mode & S_ISVTX),
+    "-O": lambda result: result.st_uid == getuid(),
+    "-G": lambda result: result.st_gid == getgid()
+}
+# File predicates that are answered by the access system call
+ACCESS_PREDICATES = {"-r": R_OK, "-w": W_OK, "-x": X_OK}
+UNARY_OPERATORS = frozenset(list(STAT_PREDICATES) + list(ACCESS_PREDICATES) +
+                            ["-L", "-h", "-t", "-z", "-n"])
+INTEGER_OPERATORS = {
+    "-eq": lambda left, right: left == right,
+    "-ne": lambda left, right: left != right,
+    "-lt": lambda left, right: left < right,
+    "-le": lambda left, right: left <= right,
+    "-gt": lambda left, right: left > right,
+    "-ge": lambda left, right: left >= right
+}
+BINARY_OPERATORS = frozenset(list(INTEGER_OPERATORS) +
+                             ["=", "==", "!=", "<", ">", "-nt", "-ot", "-ef"])
+
+
+class Test_Error(Exception):
+    def __init__(self, message):
+        self.message = message
+
+
+class Test_Expression:
+    """
+    Evaluator of the expression of the test and [ builtins. The stat result
+    of each file is kept for the whole expression, so several predicates on
+    the same file only need a single system call.
+    """
+
+    def __init__(self, argument_list):
+        self.argument_list = argument_list
+        self.index = 0
+        # Dictionaries map a path to its stat or lstat result, None if the
+        # file doesn't exist
+        self.stat_dict = {}
+        self.lstat_dict = {}
+
+    def get_stat(self, path, follow_symlinks=True):
+        stat_dict = self.stat_dict if follow_symlinks else self.lstat_dict
+        try:
+            return stat_dict[path]
+        except KeyError:
+            pass
+        try:
+            result = stat(path) if follow_symlinks else lstat(path)
+        except (OSError, ValueError):
+            result = None
+        stat_dict[path] = result
+        return result
+
+    def evaluate_unary(self, operator, operand):
+        if operator == "-z":
+            return not operand
+        if operator == "-n":
+            return bool(operand)
+        if operator in ("-L", "-h"):
+            result = self.get_stat(operand, False)
+            return result is not None and S_ISLNK(result.st_mode)
+        if operator == "-t":
+            try:
+                return isatty(int(operand))
+            except (ValueError, OSError):
+                return False
+        result = self.get_stat(operand)
+        if result is None:
+            return False
+        if operator in ACCESS_PREDICATES:
+            return access(operand, ACCESS_PREDICATES[operator])
+        return STAT_PREDICATES[operator](result)
+
+    def get_integer(self, operand):
+        try:
+            return int(operand.strip())
+        except ValueError:
+            raise Test_Error("%s: integer expression expected" % operand)
+
+    def evaluate_binary(self, left, operator, right):
+        if operator in ("=", "=="):
+            return left == right
+        if operator == "!=":
+            return left != right
+        if operator == "<":
+            return left < right
+        if operator == ">":
+            return left > right
+        if operator in INTEGER_OPERATORS:
+            return INTEGER_OPERATORS[operator](self.get_integer(left),
+                                               self.get_integer(right))
+        if operator == "-ef":
+            left_result = self.get_stat(left)
+            right_result = self.get_stat(right)
+            return (left_result is not None and right_result is not None and
+                    (left_result.st_dev, left_result.st_ino) ==
+                    (right_result.st_dev, right_result.st_ino))
+        # A file that doesn't exist is older than every other file
+        left_result = self.get_stat(left)
+        right_result = self.get_stat(right)
+        if operator == "-ot":
+            left_result, right_result = right_result, left_result
+        if left_result is None:
+            return False
+        return (right_result is None or
+                left_result.st_mtime_ns > right_result.st_mtime_ns)
+
+    def evaluate_argument_count(self, begin_index, count):
+        """
+        Evaluate an expression of up to four arguments with the rules of
+        POSIX, which decide by the number of arguments
+
+        Output:
+            - The result, None if the rules don't apply
+        """
+        argument_list = self.argument_list[begin_index:begin_index + count]
+        if count == 0:
+            return False
+        if count == 1:
+            return bool(argument_list[0])
+        if count == 2:
+            if argument_list[0] == "!":
+                return not argument_list[1]
+            if argument_list[0] in UNARY_OPERATORS:
+                return self.evaluate_unary(*argument_list)
+            raise Test_Error("%s: unary operator expected" % argument_list[0])
+        if count == 3:
+            if argument_list[1] in BINARY_OPERATORS:
+                return self.evaluate_binary(*argument_list)
+            if argument_list[0] == "!":
+                return not self.evaluate_argument_count(begin_index + 1, 2)
+            if argument_list[0] == "(" and argument_list[2] == ")":
+                return bool(argument_list[1])
+            if argument_list[1] not in ("-a", "-o"):
+                raise Test_Error("%s: binary operator expected"
+                                 % argument_list[1])
+        if count == 4:
+            if argument_list[0] == "!":
+                return not self.evaluate_argument_count(begin_index + 1, 3)
+            if argument_list[0] == "(" and argument_list[3] == ")":
+                return self.evaluate_argument_count(begin_index + 1, 2)
+        return None
+
+    def peek(self, offset=0):
+        index = self.index + offset
+        return (self.argument_list[index]
+                if index < len(self.argument_list) else None)
+
+    def parse_or(self):
+        result = self.parse_and()
+        while self.peek() == "-o":
+            self.index += 1
+            result = self.parse_and() or result
+        return result
+
+    def parse_and(self):
+        result = self.parse_not()
+        while self.peek() == "-a":
+            self.index += 1
+            result = self.parse_not() and result
+        return result
+
+    def parse_not(self):
+        if self.peek() == "!" and self.peek(1) is not None:
+            self.index += 1
+            return not self.parse_not()
+        return self.parse_primary()
+
+    def parse_primary(self):
+        argument = self.peek()
+        if argument is None:
+            raise Test_Error("argument expected")
+        # A binary expression
+        if self.peek(1) in BINARY_OPERATORS and self.peek(2) is not None:
+            self.index += 3
+            return self.evaluate_binary(argument, self.peek(-2),
+                                        self.peek(-1))
+        # A unary expression
+        if argument in UNARY_OPERATORS and self.peek(1) is not None:
+            self.index += 2
+            return self.evaluate_unary(argument, self.peek(-1))
+        # A parenthesized expression
+        if argument == "(":
+            self.index += 1
+            result = self.parse_or()
+            if self.peek() != ")":
+                raise Test_Error("`)' expected")
+            self.index += 1
+            return result
+        self.index += 1
+        return bool(argument)
+
+    def evaluate(self):
+        """
+        Evaluate the expression
+
+        Output:
+            - The boolean result of the expression
+
+        Raise:
+            - Test_Error if the expression isn't valid
+        """
+        if len(self.argument_list) <= 4:
+            result = self.evaluate_argument_count(0, len(self.argument_list))
+            if result is not None:
+                return result
+        result = self.parse_or()
+        if self.index < len(self.argument_list):
+            raise Test_Error("too many arguments")
+        return result
@@ -1,38 +1,162 @@
 #!/usr/bin/env python3
-from re import match
-from glob import glob
-from itertools import product
+from re import compile
+from os import scandir, stat
+from os.path import lexists
+from fnmatch import translate
+from functools import lru_cache
 
 
-def find_spec_char(a_string):
+# Directory listings that have been read, with the device, inode and
+# modification time of the directory at that moment. The paths are relative
+# to the current directory, so the same path may name another directory.
+directory_cache = {}
+# Number of directory listings kept in the cache
+DIRECTORY_CACHE_SIZE = 64
+
+
+def has_magic_char(a_string):
     '''
-    find special characters in a string
+    find the characters that have a meaning in a glob pattern
     @param: considered string
-    return: True if any special character in the string
-            False if no any special character in the string
+    return: True if the string is a glob pattern
+    '''
+    return "*" in a_string or "?" in a_string or "[" in a_string
+
+
+@lru_cache(maxsize=256)
+def compile_component(component):
+    '''
+    compile a component of a glob pattern into a regular expression
+    @param: a glob pattern without any slash
+    return: the compiled regular expression
+    '''
+    return compile(translate(component))
+
+
+def list_directory(directory):
     '''
-    return False if match("^[a-zA-Z0-9_.,~/]*$", a_string) else True
+    list the entries of a directory, reusing the cached listing if the
+    directory hasn't been modified since it was read
+    @param: the path of the directory, "" for the current directory
+    return: a tuple of the visible names, the hidden names and the set of
+            names that are directories, empty if it cannot be read
+    '''
+    path = directory or "."
+    try:
+        stat_result = stat(path)
+    except OSError:
+        return [], [], set()
+    identity = (stat_result.st_dev, stat_result.st_ino,
+                stat_result.st_mtime_ns)
+    cached_listing = directory_cache.get(path)
+    if cached_listing and cached_listing[0] == identity:
+        return cached_listing[1]
+    visible_name_list = []
+    hidden_name_list = []
+    directory_name_set = set()
+    try:
+        with scandir(path) as iterator:
+            for entry in iterator:
+                name = entry.name
+                if name.startswith("."):
+                    hidden_name_list.append(name)
+                else:
+                    visible_name_list.append(name)
+                try:
+                    if entry.is_dir():
+                        directory_name_set.add(name)
+                except OSError:
+                    pass
+    except OSError:
+        return [], [], set()
+    listing = (visible_name_list, hidden_name_list, directory_name_set)
+    # Drop the oldest listing when the cache is full
+    directory_cache.pop(path, None)
+    if len(directory_cache) >= DIRECTORY_CACHE_SIZE:
+        directory_cache.pop(next(iter(directory_cache)))
+    directory_cache[path] = (identity, listing)
+    return listing
+
+
+def match_component(directory, component, only_directory):
+    '''
+    find the entries of a directory that match a component of a pattern
+    @param: the directory path ending with a slash ("" for the current one),
+            the glob pattern of the component and whether only directories
+            are wanted
+    return: the list of matching paths
+    '''
+    regex = compile_component(component)
+    visible_name_list, hidden_name_list, directory_name_set = list_directory(
+        directory
+    )
+    name_list = list(filter(regex.match, visible_name_list))
+    # Hidden entries, "." and ".." only match a pattern starting with a dot
+    if component.startswith("."):
+        name_list.extend(filter(regex.match,
+                                [".", ".."] + hidden_name_list))
+        directory_name_set = directory_name_set | {".", ".."}
+    if only_directory:
+        name_list = [name for name in name_list
+                     if name in directory_name_set]
+    return [directory + name for name in name_list] if directory else\
+        name_list
 
 
-def expand_dot(a_string):
-    dot_expand_list = []
-    for part in a_string.split('/'):
-        if part == '.*':
-            dot_expand_list.append(['.', '..', '.*'])
-        elif part == '..*':
-            dot_expand_list.append(['..', '..*'])
+def iterate_globbing(a_string):
+    '''
+    expand a glob pattern, one matching path at a time
+    @param: considered string
+    return: a generator of the matching paths, in no particular order
+    '''
+    component_list = a_string.split("/")
+    # An absolute pattern starts from the root directory
+    if a_string.startswith("/"):
+        path_list = ["/"]
+        component_list = component_list[1:]
+    else:
+        path_list = [""]
+    # A trailing slash only matches directories
+    only_directory = component_list[-1] == ""
+    if only_directory:
+        component_list.pop()
+    last_index = len(component_list) - 1
+    # Paths built from a component without magic characters may not exist
+    needs_check = False
+    for index, component in enumerate(component_list):
+        is_last = index == last_index
+        needs_check = not has_magic_char(component)
+        # The matches of the last component are yielded one directory at a
+        # time, so that they can be used before every directory is read
+        if is_last and not needs_check:
+            for directory in path_list:
+                for path in match_component(directory, component,
+                                            only_directory):
+                    yield path + "/" if only_directory else path
+            return
+        if not needs_check:
+            # Every directory is read with a single scan, only directories
+            # can contain the next component
+            path_list = [path
+                         for directory in path_list
+                         for path in match_component(directory, component,
+                                                     True)]
         else:
-            dot_expand_list.append([part])
-    return dot_expand_list
+            path_list = [directory + component for directory in path_list]
+        if not is_last:
+            path_list = [path + "/" for path in path_list]
+        if not path_list:
+            return
+    for path in path_list:
+        if only_directory:
+            path += "/"
+        if not needs_check or lexists(path):
+            yield path
 
 
 def globbing(a_string):
-    if find_spec_char(a_string):
-        dot_expand_list = list(product(*expand_dot(a_string)))
-        path_expand_list = ['/'.join(item) for item in dot_expand_list]
-        glob_expand_list = []
-        for item in sorted(path_expand_list):
-            glob_expand_list.extend(glob(item))
-        return sorted(glob_expand_list) if glob_expand_list else [a_string]
+    if has_magic_char(a_string):
+        glob_expand_list = sorted(iterate_globbing(a_string))
+        return glob_expand_list if glob_expand_list else [a_string]
     else:
         return [a_string]
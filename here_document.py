@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+from token_definition import Word_Token, Single_Quote_Token,\
+                             Double_Quote_Token, Separator_Token,\
+                             Operator_Token, Here_Document_Token, Token_Stream
+from utility import read_continuation_line
+from os import pipe, write, writev, close, lseek, SEEK_SET
+from threading import Thread
+import os
+
+
+# Bodies up to this size fit in the buffer of a pipe, so they are written
+# before the command starts
+PIPE_BUFFER_SIZE = 65536
+# Maximum number of lines written by a single writev call
+WRITEV_LINE_COUNT = 1024
+# Write ends of the pipes that are still fed by a writer thread
+writer_fd_set = set()
+
+
+#################################
+#            Lexing             #
+#################################
+
+
+def get_delimiter(token_list):
+    """
+    Get the delimiter of a here-document from the tokens of its word
+
+    Input:
+        - token_list: the tokens of the word after the << operator
+
+    Output:
+        - The delimiter
+        - A boolean value that tells whether a part of it is quoted
+    """
+    part_list = []
+    is_quoted = False
+    for token in token_list:
+        if isinstance(token, Word_Token):
+            part_list.append(token.content)
+        elif isinstance(token, Single_Quote_Token):
+            part_list.append(token.content)
+            is_quoted = True
+        elif isinstance(token, Double_Quote_Token):
+            part_list.append(token.original_string[1:-1])
+            is_quoted = True
+        else:
+            part_list.append(token.original_string)
+    return "".join(part_list), is_quoted
+
+
+def read_here_document_body(delimiter, strip_tabs):
+    """
+    Read the lines of a here-document until its delimiter
+
+    Input:
+        - delimiter: the line that ends the body
+        - strip_tabs: a boolean value that determines whether the leading
+        tabs of each line are removed, for the <<- operator
+
+    Output:
+        - line_list: the lines of the body with their newline character
+    """
+    line_list = []
+    while True:
+        try:
+            line = read_continuation_line()
+        except EOFError:
+            print("intek-sh: warning: here-document delimited by end-of-file"
+                  " (wanted `%s')" % delimiter)
+            return line_list
+        if strip_tabs:
+            line = line.lstrip("\t")
+        if line == delimiter:
+            return line_list
+        line_list.append(line + "\n")
+
+
+def get_word_range(token_list, index):
+    """
+    Find the word that starts at an index of a token list, after the
+    separators
+
+    Output:
+        - The index of the first token of the word
+        - The index after its last token, the same as the first one if there
+        is no word
+    """
+    while (index < len(token_list) and
+           isinstance(token_list[index], Separator_Token)):
+        index += 1
+    end_index = index
+    while (end_index < len(token_list) and
+           not isinstance(token_list[end_index], (Separator_Token,
+                                                  Operator_Token))):
+        end_index += 1
+    return index, end_index
+
+
+def is_here_document_operator(token_list, index):
+    """
+    Check if the token at an index is the << operator, without creating the
+    tokens of a Token_Stream
+    """
+    if isinstance(token_list, Token_Stream):
+        return (token_list.get_kind(index) == Token_Stream.OPERATOR and
+                token_list.get_text(index) == "<<")
+    token = token_list[index]
+    return isinstance(token, Operator_Token) and token.content == "<<"
+
+
+def read_here_documents(token_list):
+    """
+    Read the body of every here-document of a command line, after the line
+    itself has been lexed. The word after each << operator is replaced by a
+    Here_Document_Token.
+
+    Input:
+        - token_list: a list of tokens or a Token_Stream
+    """
+    index = 0
+    while index < len(token_list):
+        index += 1
+        if not is_here_document_operator(token_list, index - 1):
+            continue
+        # <<- is lexed as the << operator followed by a word starting with
+        # a dash
+        begin_index, end_index = get_word_range(token_list, index)
+        # The parser reports the missing delimiter, and the body of a
+        # here-document inside an unclosed subshell has already been read
+        if (begin_index == end_index or
+                isinstance(token_list[begin_index], Here_Document_Token)):
+            continue
+        delimiter, is_quoted = get_delimiter(token_list[begin_index:end_index])
+        strip_tabs = begin_index == index and delimiter.startswith("-")
+        if strip_tabs:
+            delimiter = delimiter[1:]
+        # A dash alone is the end of the <<- operator, the delimiter is the
+        # next word
+        if strip_tabs and not delimiter and not is_quoted:
+            word_begin_index, end_index = get_word_range(token_list,
+                                                         end_index)
+            if word_begin_index == end_index:
+                continue
+            delimiter, is_quoted = get_delimiter(
+                token_list[word_begin_index:end_index]
+            )
+        here_document_token = Here_Document_Token(
+            read_here_document_body(delimiter, strip_tabs),
+            delimiter,
+            not is_quoted
+        )
+        if isinstance(token_list, Token_Stream):
+            token_list.replace(begin_index, here_document_token)
+            token_list.delete(begin_index + 1, end_index)
+        else:
+            token_list[begin_index:end_index] = [here_document_token]
+        index = begin_index + 1
+
+
+#################################
+#           Expansion           #
+#################################
+
+
+def needs_expansion(token):
+    """
+    Tell whether the body of a here-document must be expanded, which is when
+    its delimiter isn't quoted and it has a dollar sign, a backquote or a
+    backslash
+    """
+    return token.is_expanded and any(
+        "$" in line or "`" in line or "\\" in line for line in token.content
+    )
+
+
+def get_here_document_data(token):
+    """
+    Get the encoded lines of the body of a here-document that isn't
+    expanded. They are encoded once and kept in the token.
+
+    Input:
+        - token: a Here_Document_Token object
+
+    Output:
+        - A list of bytes objects, one for each line
+    """
+    if token.data_list is None:
+        token.data_list = [line.encode("utf-8", "surrogateescape")
+                           for line in token.content]
+    return token.data_list
+
+
+#################################
+#           Delivery            #
+#################################
+
+
+def write_data_list(file_descriptor, data_list):
+    """
+    Write a list of bytes objects to a file descriptor, a batch of lines at
+    a time, without joining them
+    """
+    index = 0
+    while index < len(data_list):
+        batch = data_list[index:index + WRITEV_LINE_COUNT]
+        written_size = writev(file_descriptor, batch)
+        for data in batch:
+            if written_size >= len(data):
+                written_size -= len(data)
+                index += 1
+                continue
+            # Finish the line that has been partly written
+            view = memoryview(data)[written_size:]
+            while view:
+                view = view[write(file_descriptor, view):]
+            index += 1
+            break
+
+
+def feed_pipe(write_fd, data_list):
+    """
+    Write the body into a pipe from a writer thread, then close the pipe
+    """
+    try:
+        write_data_list(write_fd, data_list)
+    except OSError:
+        # The command has stopped reading
+        pass
+    finally:
+        writer_fd_set.discard(write_fd)
+        close(write_fd)
+
+
+def open_here_document(data_list):
+    """
+    Open a file descriptor that the body of a here-document can be read
+    from. A small body is written into a pipe at once. A large body is
+    written into an anonymous memory file, or into a pipe by a writer thread
+    if there is no memory file.
+
+    Input:
+        - data_list: the encoded lines of the body
+
+    Output:
+        - The file descriptor the command reads the body from
+    """
+    size = sum(len(data) for data in data_list)
+    if size > PIPE_BUFFER_SIZE and hasattr(os, "memfd_create"):
+        file_descriptor = os.memfd_create("here-document", os.MFD_CLOEXEC)
+        try:
+            write_data_list(file_descriptor, data_list)
+            lseek(file_descriptor, 0, SEEK_SET)
+        except OSError:
+            close(file_descriptor)
+            raise
+        return file_descriptor
+    read_fd, write_fd = pipe()
+    if size <= PIPE_BUFFER_SIZE:
+        write_data_list(write_fd, data_list)
+        close(write_fd)
+        return read_fd
+    writer_fd_set.add(write_fd)
+    Thread(target=feed_pipe, args=(write_fd, data_list), daemon=True).start()
+    return read_fd
+
+
+def close_writer_fds():
+    """
+    Close the write ends of the pipes fed by writer threads, in a forked
+    child that doesn't run the threads. Otherwise a command reading the
+    pipe in that child would never see its end.
+    """
+    for write_fd in list(writer_fd_set):
+        try:
+            close(write_fd)
+        except OSError:
+            pass
+    writer_fd_set.clear()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+from os.path import expanduser
+
+
+class History_Store:
+    """
+    History log of the shell kept in memory. The commands are stored in an
+    array for numbered lookups and in a prefix tree for searching the latest
+    command that starts with a string. New commands are appended to the
+    history file one line at a time.
+    """
+    # Length of the longest prefix that is indexed in the prefix tree
+    max_prefix_length = 64
+    # History expansion is turned off when the shell runs a script
+    expansion_enabled = True
+
+    def __init__(self, history_file=None, max_length=2000):
+        self.history_file = history_file
+        self.max_length = max_length
+        # Every command that has been added, the oldest ones are dropped by
+        # moving the first index forward
+        self.command_list = []
+        self.first_index = 0
+        # Each node of the prefix tree is a list of its children dictionary
+        # and the index of the latest command that passes through it
+        self.prefix_tree = [{}, -1]
+
+    def __len__(self):
+        return len(self.command_list) - self.first_index
+
+    def __getitem__(self, number):
+        """
+        Get a command from the history log
+
+        Input:
+            - number: the position of the command in the history log, negative
+            numbers count from the latest command
+
+        Output:
+            - The command at that position
+        """
+        length = len(self)
+        if number < 0:
+            number += length
+        if not 0 <= number < length:
+            raise IndexError("history index out of range")
+        return self.command_list[self.first_index + number]
+
+    def __iter__(self):
+        for index in range(self.first_index, len(self.command_list)):
+            yield self.command_list[index]
+
+    def get_log(self):
+        """
+        Get the history log as a list of commands, from the earliest to the
+        latest one
+        """
+        return self.command_list[self.first_index:]
+
+    def index_command(self, command, index):
+        """
+        Add a command to the prefix tree
+
+        Input:
+            - command: the command that will be indexed
+            - index: the index of the command in the command list
+        """
+        node = self.prefix_tree
+        node[1] = index
+        for char in command[:self.max_prefix_length]:
+            children = node[0]
+            # Create the child node if it doesn't exist yet
+            if char not in children:
+                children[char] = [{}, index]
+            node = children[char]
+            node[1] = index
+
+    def add_command(self, command):
+        """
+        Add a command to the history log in memory without writing it
+        to the history file
+
+        Input:
+            - command: the command that will be added
+        """
+        self.command_list.append(command)
+        self.index_command(command, len(self.command_list) - 1)
+        # Drop the oldest command if the history log is full
+        if len(self) > self.max_length:
+            self.first_index += 1
+            # Rebuild the storage once too many commands have been dropped
+            if self.first_index > self.max_length:
+                self.rebuild()
+
+    def rebuild(self):
+        """
+        Drop the commands that are no longer in the history log from the
+        command list and the prefix tree
+        """
+        command_list = self.get_log()
+        self.command_list = []
+        self.first_index = 0
+        self.prefix_tree = [{}, -1]
+        for command in command_list:
+            self.command_list.append(command)
+            self.index_command(command, len(self.command_list) - 1)
+
+    def append(self, command):
+        """
+        Add a command to the history log and append it to the history file
+
+        Input:
+            - command: the command that will be added
+        """
+        self.add_command(command)
+        if not self.history_file:
+            return
+        try:
+            with open(self.history_file, "a") as history_file:
+                history_file.write(command + "\n")
+        except OSError:
+            pass
+
+    def load(self):
+        """
+        Read the history file into the history log. The file is rewritten
+        if it has grown far beyond the maximum length of the history log.
+        """
+        try:
+            with open(self.history_file, "r") as history_file:
+                line_list = history_file.read().splitlines()
+        except FileNotFoundError:
+            open(self.history_file, "w+").close()
+            return
+        except (OSError, TypeError):
+            return
+        for line in line_list[-self.max_length:]:
+            self.add_command(line)
+        # Truncate the history file so that it doesn't grow forever with the
+        # incremental appends
+        if len(line_list) > 2 * self.max_length:
+            try:
+                with open(self.history_file, "w") as history_file:
+                    history_file.write("".join(command + "\n"
+                                               for command in self))
+            except OSError:
+                pass
+
+    def search(self, search_string):
+        """
+        Search for the latest command that starts with a string
+
+        Input:
+            - search_string: the string that we are looking for at the start
+            of the command
+
+        Output:
+            - command: the command matched the condition. None if nothing is
+            found.
+        """
+        node = self.prefix_tree
+        for char in search_string[:self.max_prefix_length]:
+            try:
+                node = node[0][char]
+            except KeyError:
+                return None
+        index = node[1]
+        # Check the commands one by one if the search string is longer than
+        # the indexed prefixes
+        if len(search_string) > self.max_prefix_length:
+            while index >= self.first_index:
+                if self.command_list[index].startswith(search_string):
+                    return self.command_list[index]
+                index -= 1
+            return None
+        return self.command_list[index] if index >= self.first_index else None
+
+
+# History log shared by the lexer and the shell
+shell_history = History_Store(expanduser("~/.intek-shhistory.txt"))
@@ -1,16 +1,19 @@
 #!/usr/bin/env python3
-from naive_lexer import get_token_list
-from command_splitting import get_command_list
-from token_expansion import expand_token_for_command_list
-from readline import get_history_item, get_current_history_length,\
-                     add_history, set_history_length, read_history_file,\
+from command_execution import execute_command_list
+from readline import get_current_history_length, get_history_item,\
+                     add_history,\
+                     set_history_length, read_history_file,\
                      remove_history_item
-from os.path import isfile, join, expanduser
 from shell import Shell
 from exception import BadSubstitutionError, UnexpectedTokenError,\
-                      CommandNotFoundError, EventNotFoundError
-from utility import get_error_message, get_history_log
-from sys import argv
+                      CommandNotFoundError, EventNotFoundError,\
+                      AmbiguousRedirectError, ArithmeticExpressionError
+from utility import get_error_message, set_continuation_reader
+from history_store import shell_history
+from script_reader import Script_Reader
+from profiler import profiler
+from sys import argv, stdin, exit as system_exit
+from signal import signal, SIGTTOU, SIG_IGN
 
 
 #################################
@@ -18,32 +21,37 @@ from sys import argv
 #################################
 
 
-def is_command_exist(self, argument_list):
+# Messages printed for the errors raised while a line is parsed or executed
+SHELL_ERROR_MESSAGES = {
+    BadSubstitutionError: "intek-sh: %s: bad substitution",
+    UnexpectedTokenError: "intek-sh: Unexpected token after %s",
+    CommandNotFoundError: "intek-sh: %s: command not found",
+    EventNotFoundError: "intek-sh: %s: event not found",
+    AmbiguousRedirectError: "intek-sh: %s: ambiguous redirect",
+    ArithmeticExpressionError: "intek-sh: %s"
+}
+SHELL_ERRORS = tuple(SHELL_ERROR_MESSAGES)
+
+
+def print_shell_error(error):
     """
-    Check if the command exist
+    Print the message of an error raised while a line is parsed or executed
 
     Input:
-        - argument_list: Arguments interepred from user input,
-        its first element is the command
+        - error: one of the SHELL_ERRORS
+    """
+    print(SHELL_ERROR_MESSAGES[type(error)] % error.argument)
 
-    Output:
-        - True if the command exists in PATH (or current directory if the
-        command contains ./)
-        - False otherwise
+
+def report_done_jobs(shell):
     """
-    # If the command called is a script, check it in the current file
-    if (argument_list[0].startswith(".") or
-            argument_list[0].startswith("..") or
-            argument_list[0].startswith("~")):
-        return isfile(argument_list[0])
-    # Else, check it in each directory in the PATH environment
-    else:
-        try:
-            return any([isfile(join(bin_dir, argument_list[0]))
-                        for bin_dir in self.environ_dict["PATH"].split(":")
-                        ])
-        except KeyError:
-            return False
+    Print the background commands that have finished since the last prompt
+
+    Input:
+        - shell: the shell whose job table is checked
+    """
+    for job in shell.jobs.reap():
+        print("[%d]+  %s" % (job.number, job))
 
 
 #################################
@@ -73,55 +81,124 @@ def run(shell):
     Input:
         - shell: a shell object that will be run
     """
+    shell.is_interactive = True
+    # The shell takes the terminal back from the jobs moved to the
+    # foreground, which would stop it if SIGTTOU weren't ignored
+    signal(SIGTTOU, SIG_IGN)
     set_history_length(2000)
+    # Load the history log used by the history expansion
+    shell_history.load()
+    # Load the history file for line editing
     try:
         read_history_file(Shell.history_file)
-    except FileNotFoundError:
-        open(Shell.history_file, "w+").close()
-    except PermissionError:
+    except (FileNotFoundError, PermissionError):
         pass
     while not shell.exit:
         try:
+            report_done_jobs(shell)
             # Read user input
             user_input = read_user_input()
-            if user_input:
-                remove_history_item(get_current_history_length() - 1)
-            else:
+            if not user_input:
                 continue
-            token_list, list_of_char = get_token_list(user_input)
+            profiler.begin_line(user_input)
+            # Remove the line added by readline, the input is added again
+            # after the history expansion
+            history_length = get_current_history_length()
+            if (history_length and
+                    get_history_item(history_length) == user_input):
+                remove_history_item(history_length - 1)
+            command_list, input_string = shell.parse_cache.parse(user_input)
             # Add final input string after get_history_item
-            input_string = "".join(list_of_char)
-            if (get_history_item(get_current_history_length()) != input_string
-                    and input_string):
+            if (input_string and
+                    (not shell_history or shell_history[-1] != input_string)):
                 add_history(input_string)
-            print(" ".join([str(item) for item in token_list]))
-            # print("\n".join([str(item) for item in token_list]))
-            # print("".join([item.original_string for item in token_list]))
-            command_list = get_command_list(token_list)
+                shell_history.append(input_string)
             if not command_list:
                 continue
-            expand_token_for_command_list(command_list, shell)
-            # print(command_list)
-            # print([item.argument_list for item in command_list])
+            profiler.call("execute", execute_command_list, command_list,
+                          shell)
         except EOFError:
             return
-        except BadSubstitutionError as e:
-            print("intek-sh: %s: bad substitution" % e.argument)
-        except UnexpectedTokenError as e:
-            print("intek-sh: Unexpected token after %s" % e.argument)
-        except CommandNotFoundError as e:
-            print("intek-sh: %s: command not found" % e.argument)
-        except EventNotFoundError as e:
-            print("intek-sh: %s: event not found" % e.argument)
+        except KeyboardInterrupt:
+            print()
+            shell.exit_code = 130
+        except SHELL_ERRORS as e:
+            print_shell_error(e)
+        finally:
+            profiler.end_line()
+
+
+def run_script(shell, reader):
+    """
+    Run every statement of a script without prompts, line editing or
+    history. A syntax error stops the script.
+
+    Input:
+        - shell: a shell object that will run the script
+        - reader: a Script_Reader object of the script
+
+    Output:
+        - The exit code of the last command
+    """
+    # Scripts don't have a history, so the exclamation mark is an ordinary
+    # character
+    shell_history.expansion_enabled = False
+    # The lines of an incomplete statement are read from the script
+    set_continuation_reader(reader.read_line)
+    try:
+        for input_string in reader:
+            try:
+                # Reap the finished background commands
+                shell.jobs.reap()
+                profiler.begin_line(input_string)
+                command_list = shell.parse_cache.parse(input_string)[0]
+                profiler.call("execute", execute_command_list, command_list,
+                              shell)
+            except EOFError:
+                print("intek-sh: line %d: syntax error: unexpected end of file"
+                      % reader.line_number)
+                shell.exit_code = 2
+                break
+            except UnexpectedTokenError as e:
+                print_shell_error(e)
+                shell.exit_code = 2
+                break
+            except SHELL_ERRORS as e:
+                print_shell_error(e)
+                shell.exit_code = 1
+            finally:
+                profiler.end_line()
+    except KeyboardInterrupt:
+        shell.exit_code = 130
+    finally:
+        set_continuation_reader(None)
+        reader.close()
+    return shell.exit_code
 
 
 def main():
+    shell = Shell()
+    shell.jobs.install_signal_handler()
+    profiler.enable_from_environment()
+    # intek-sh.py -c 'commands'
+    if len(argv) > 1 and argv[1] == "-c":
+        if len(argv) < 3:
+            print("intek-sh: -c: option requires an argument")
+            system_exit(2)
+        system_exit(run_script(shell, Script_Reader.from_string(argv[2])))
+    # intek-sh.py script.sh
+    if len(argv) > 1:
+        try:
+            reader = Script_Reader.from_file(argv[1])
+        except OSError as e:
+            print(get_error_message(argv[1], type(e)))
+            system_exit(127)
+        system_exit(run_script(shell, reader))
+    # Commands piped into the shell are run as a script
+    if not stdin.isatty():
+        system_exit(run_script(shell, Script_Reader(stdin)))
     try:
-        shell = Shell()
-        if "-sub" in argv:
-            run_subshell(shell, argv)
-        else:
-            run(shell)
+        run(shell)
     except TypeError:
         return
 
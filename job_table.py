@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+from token_definition import Command, Pipe_Command, And_Command, Or_Command,\
+                             Background_Command, Variable_Token
+from os import waitpid, waitstatus_to_exitcode, kill, WNOHANG, WUNTRACED,\
+               WIFSTOPPED, WSTOPSIG
+from signal import signal, SIGCONT, SIGCHLD
+
+
+#################################
+#            Utility            #
+#################################
+
+
+def get_command_string(command):
+    """
+    Get the text of a command as it is shown in the job table
+
+    Input:
+        - command: a Command or Binary_Command type object
+
+    Output:
+        - The text of the command
+    """
+    if isinstance(command, Command):
+        part_list = ["$" + token.content if isinstance(token, Variable_Token)
+                     else token.original_string
+                     for token in command.token_list]
+        for stream in (command.stdin, command.stdout):
+            if stream:
+                part_list.append(" %s %s" % (stream[0].content,
+                                             stream[-1].original_string))
+        return "".join(part_list).strip()
+    if isinstance(command, Background_Command):
+        return get_command_string(command.left_command)
+    operator = {Pipe_Command: " | ", And_Command: " && ",
+                Or_Command: " || "}.get(type(command), " ; ")
+    return (get_command_string(command.left_command) + operator +
+            get_command_string(command.right_command))
+
+
+def get_exit_code(status):
+    exit_code = waitstatus_to_exitcode(status)
+    return exit_code if exit_code >= 0 else 128 - exit_code
+
+
+#################################
+#              Job              #
+#################################
+
+
+class Job:
+    """
+    A command started in the background. Its processes are in a process
+    group of their own, whose id is the id of the first process.
+    """
+    RUNNING = "Running"
+    STOPPED = "Stopped"
+    DONE = "Done"
+
+    def __init__(self, number, process_id_list, command_string):
+        self.number = number
+        self.process_id_list = process_id_list
+        self.process_group = process_id_list[0]
+        self.command_string = command_string
+        # Process ids of the processes that haven't finished
+        self.running_set = set(process_id_list)
+        self.state = self.RUNNING
+        self.exit_code = 0
+
+    def update(self, process_id, status):
+        """
+        Change the state of the job after one of its processes has changed
+
+        Input:
+            - process_id: the id of the process
+            - status: the wait status of the process
+        """
+        if WIFSTOPPED(status):
+            self.state = self.STOPPED
+            self.exit_code = 128 + WSTOPSIG(status)
+            return
+        self.running_set.discard(process_id)
+        # The exit code of a job is the one of its last process
+        if process_id == self.process_id_list[-1]:
+            self.exit_code = get_exit_code(status)
+        if not self.running_set:
+            self.state = self.DONE
+
+    def poll(self):
+        """
+        Update the state of the job without waiting
+        """
+        for process_id in list(self.running_set):
+            try:
+                waited_id, status = waitpid(process_id, WNOHANG | WUNTRACED)
+            except ChildProcessError:
+                self.running_set.discard(process_id)
+                continue
+            if waited_id:
+                self.update(process_id, status)
+        if not self.running_set:
+            self.state = self.DONE
+
+    def wait(self, until_stopped=False):
+        """
+        Wait for the job to finish
+
+        Input:
+            - until_stopped: a boolean value that determines whether waiting
+            also stops when the job is stopped
+
+        Output:
+            - The exit code of the job
+        """
+        while self.running_set:
+            process_id = next(iter(self.running_set))
+            try:
+                status = waitpid(process_id,
+                                 WUNTRACED if until_stopped else 0)[1]
+            except ChildProcessError:
+                self.running_set.discard(process_id)
+                continue
+            self.update(process_id, status)
+            if self.state == self.STOPPED:
+                return self.exit_code
+        self.state = self.DONE
+        return self.exit_code
+
+    def resume(self):
+        """
+        Continue a stopped job
+        """
+        try:
+            kill(-self.process_group, SIGCONT)
+        except ProcessLookupError:
+            pass
+        self.state = self.RUNNING
+
+    def __str__(self):
+        state = self.state
+        if state == self.DONE and self.exit_code:
+            state = "Exit %d" % self.exit_code
+        return "%-24s%s%s" % (state, self.command_string,
+                              " &" if self.state == self.RUNNING else "")
+
+
+#################################
+#           Job Table           #
+#################################
+
+
+class Job_Table:
+    """
+    Table of the jobs started in the background. The finished processes are
+    reaped without blocking, only after a SIGCHLD has been received if the
+    signal handler has been installed.
+    """
+
+    def __init__(self):
+        self.job_list = []
+        self.is_signal_driven = False
+        self.child_signal_received = False
+
+    def __len__(self):
+        return len(self.job_list)
+
+    def __iter__(self):
+        return iter(self.job_list)
+
+    def handle_child_signal(self, signal_number, frame):
+        self.child_signal_received = True
+
+    def install_signal_handler(self):
+        """
+        Only poll the jobs after a child process has changed
+        """
+        signal(SIGCHLD, self.handle_child_signal)
+        self.is_signal_driven = True
+
+    def add(self, process_id_list, command_string):
+        """
+        Add a job to the table
+
+        Input:
+            - process_id_list: the ids of the processes of the job
+            - command_string: the text of the command
+
+        Output:
+            - The new Job object
+        """
+        number = self.job_list[-1].number + 1 if self.job_list else 1
+        job = Job(number, process_id_list, command_string)
+        self.job_list.append(job)
+        return job
+
+    def remove(self, job):
+        if job in self.job_list:
+            self.job_list.remove(job)
+
+    def update_process(self, process_id, status):
+        """
+        Update the job of a process that has been waited for by another
+        part of the shell
+
+        Input:
+            - process_id: the id of the process
+            - status: the wait status of the process
+        """
+        for job in self.job_list:
+            if process_id in job.running_set:
+                job.update(process_id, status)
+                return
+
+    def reap(self):
+        """
+        Update the state of every job without waiting, and remove the jobs
+        that have finished
+
+        Output:
+            - The list of the jobs that have finished
+        """
+        if self.is_signal_driven:
+            if not self.child_signal_received:
+                return []
+            # Reset the flag first so that a signal received while polling
+            # isn't lost
+            self.child_signal_received = False
+        for job in self.job_list:
+            if job.state != Job.DONE:
+                job.poll()
+        done_job_list = [job for job in self.job_list
+                         if job.state == Job.DONE]
+        for job in done_job_list:
+            self.job_list.remove(job)
+        return done_job_list
+
+    def get_marker(self, job):
+        """
+        Get the marker of a job: + for the current job, - for the previous
+        one
+        """
+        if self.job_list and job is self.job_list[-1]:
+            return "+"
+        if len(self.job_list) > 1 and job is self.job_list[-2]:
+            return "-"
+        return " "
+
+    def find(self, job_spec=None):
+        """
+        Find a job
+
+        Input:
+            - job_spec: %n, %+, %- or %string, a process id, or None for the
+            current job
+
+        Output:
+            - The Job object, None if there is no such job
+        """
+        if not self.job_list:
+            return None
+        if job_spec in (None, "%", "%%", "%+"):
+            return self.job_list[-1]
+        # The previous job is the current one if there is a single job
+        if job_spec == "%-":
+            return self.job_list[-2 if len(self.job_list) > 1 else -1]
+        if job_spec.startswith("%"):
+            for job in self.job_list:
+                if job_spec[1:] == str(job.number):
+                    return job
+            for job in reversed(self.job_list):
+                if job.command_string.startswith(job_spec[1:]):
+                    return job
+            return None
+        for job in self.job_list:
+            if job_spec in (str(process_id)
+                            for process_id in job.process_id_list):
+                return job
+        return None
@@ -1,12 +1,14 @@
 #!/usr/bin/env python3
+from re import compile
 from token_definition import Double_Quote_Token, Single_Quote_Token,\
                              Param_Expand_Token, Param_Value_Token,\
-                             Variable_Token, Operator_Token, Word_Token,\
-                             Subshell_Token, Separator_Token
-from readline import get_current_history_length, get_history_item
-from utility import get_history_log
+                             Variable_Token, Word_Token,\
+                             Subshell_Token, Command_Substitution_Token,\
+                             Arithmetic_Token, Token_Stream, create_text_token
+from history_store import shell_history
+from utility import read_continuation_line
 from exception import EventNotFoundError
-from shell import Shell
+from here_document import read_here_documents
 
 
 #################################
@@ -42,7 +44,7 @@ def insert_token_to_list(content,
         if token_type == "Word":
             new_token = Word_Token(content, content)
         elif token_type == "Operator":
-            new_token = Operator_Token(content, content)
+            new_token = create_text_token(Token_Stream.OPERATOR, content)
         elif token_type == "Single_Quote":
             new_token = Single_Quote_Token(content, original_string)
         elif token_type == "Double_Quote":
@@ -51,12 +53,16 @@ def insert_token_to_list(content,
             new_token = Param_Expand_Token(content, original_string)
         elif token_type == "Subshell":
             new_token = Subshell_Token(content, content)
+        elif token_type == "Command_Substitution":
+            new_token = Command_Substitution_Token(content, content)
+        elif token_type == "Arithmetic":
+            new_token = Arithmetic_Token(content, original_string)
         elif token_type == "Variable":
             new_token = Variable_Token(content, original_string)
         elif token_type == "Param_Value":
             new_token = Param_Value_Token(content, original_string)
         elif token_type == "Separator":
-            new_token = Separator_Token(content, content)
+            new_token = create_text_token(Token_Stream.SEPARATOR, content)
         # If the token type matches none of the above, there
         # will be no token added into the list
         else:
@@ -90,17 +96,14 @@ def search_history_log_with_string(history_log, search_string):
     started with certain string
 
     Input:
-        - history_log: the history log of the shell
+        - history_log: the History_Store object of the shell
         - search_string: the string that we are looking for at the start
         of the command
 
     Output:
         - command: the command matched the condition. None if nothing is found.
     """
-    for command in history_log[::-1]:
-        if command.startswith(search_string):
-            return command
-    return None
+    return history_log.search(search_string)
 
 
 def get_search_string_for_history_event(list_of_char, index):
@@ -286,11 +289,15 @@ def expand_history_event(list_of_char, index, token_string):
         - token_string: the current token string
         - shell: the current shell instance
     """
+    # The exclamation mark is an ordinary character if the history expansion
+    # is turned off
+    if not shell_history.expansion_enabled:
+        return index + 1, token_string + "!"
     try:
         # Keep the beginning index
         begin_index = index
         # Get history log of the shell
-        history_log = get_history_log()
+        history_log = shell_history
         # Check the next character and process accordingly
         next_char = list_of_char[index + 1]
         # Search for latest command that starts with certain string
@@ -341,7 +348,7 @@ def get_escaped_character(list_of_char, index, token_string):
     try:
         next_char = list_of_char[index + 1]
     except IndexError:
-        list_of_char.extend([char for char in input(">")])
+        list_of_char.extend([char for char in read_continuation_line()])
         try:
             next_char = list_of_char[index + 1]
         except IndexError:
@@ -394,10 +401,12 @@ def get_double_quote_token(list_of_char, index, token_list):
                 )
             # Else if the current character is an exclamation mark, start
             # history expansion
-            elif current_char is "!":
+            elif current_char == "!" and shell_history.expansion_enabled:
                 index, token_string = expand_history_event(
                     list_of_char, index, token_string
                 )
+                # The index is increased again at the start of the loop
+                index -= 1
                 continue
             # If current character is an unquoted/unescaped double quote,
             # add a double quote token to the token list, return the current
@@ -424,6 +433,16 @@ def get_double_quote_token(list_of_char, index, token_list):
                     token_string,
                     content_list
                 )
+            # If current character is a backquote, get the command
+            # substitution
+            elif current_char == "`":
+                insert_token_to_list(token_string, content_list)
+                token_string = ""
+                index = get_backquote_token(
+                    list_of_char,
+                    index,
+                    content_list
+                )
             # If current character is a <space>, insert the token string to
             # content list and reset it.
             elif current_char is " ":
@@ -441,7 +460,7 @@ def get_double_quote_token(list_of_char, index, token_list):
             else:
                 token_string += current_char
         # Ask user for more input if the quoted string is not closed
-        list_of_char.extend([char for char in "\n" + input(">")])
+        list_of_char.extend([char for char in "\n" + read_continuation_line()])
     return index
 
 
@@ -490,7 +509,7 @@ def get_single_quote_token(list_of_char, index, token_list):
             else:
                 token_string += current_char
         # Ask user for more input if the quoted string is not closed
-        list_of_char.extend([char for char in "\n" + input(">")])
+        list_of_char.extend([char for char in "\n" + read_continuation_line()])
     return index
 
 
@@ -570,7 +589,7 @@ def get_param_expansion(list_of_char, index, token_list):
                 return index
         except IndexError:
             pass
-        list_of_char.extend([char for char in (" " + input(">"))])
+        list_of_char.extend([char for char in (" " + read_continuation_line())])
     return index
 
 
@@ -604,8 +623,8 @@ def get_param_name(list_of_char, index, token_list, current_value):
         # add it to the variable name
         if current_char.isalnum() or current_char is "_":
             token_string += current_char
-        # Else add the variable name to the token list
-        # return the index if current character is the closing brace, otherwise index + 1
+        # Else add the variable name to the token list and return the index
+        # of the current character, which starts the operator
         else:
             insert_token_to_list(
                 token_string,
@@ -617,7 +636,7 @@ def get_param_name(list_of_char, index, token_list, current_value):
                     index
                 )
             )
-            return index + 1 if current_char != "}" else index, token_string
+            return index, token_string
         index += 1
     return index, token_string
 
@@ -636,7 +655,7 @@ def get_param_operator(list_of_char, index, token_list, current_value):
         - index: The end index of the parameter operator
     """
     # Create a list of valid operators
-    operators = ["##", "%%", "%", "#", ":", ":?", ":-",
+    operators = ["##", "%%", "%", "#", "-", "=", "?", "+", ":", ":?", ":-",
                  ":=", ":+"]
     # Set token string to the current value
     token_string = current_value
@@ -772,6 +791,20 @@ def get_param_value(list_of_char,
                 token_string,
                 content_list
             )
+        # Else if current character is a backquote, get the command
+        # substitution
+        elif current_char == "`":
+            insert_token_to_list(
+                token_string,
+                content_list,
+                token_type="Word"
+            )
+            token_string = ""
+            index = get_backquote_token(
+                list_of_char,
+                index,
+                content_list
+            )
         # Else just add it to the token string
         else:
             token_string += current_char
@@ -851,6 +884,23 @@ def get_dollar_sign_expand(list_of_char, index, token_list):
                 index,
                 token_list
             )
+        # If the next character is a left parenthesis, it's a command
+        # substitution, or an arithmetic expansion if there are two of them.
+        # Return the index of its last right parenthesis
+        elif next_character == "(":
+            if list_of_char[index + 2:index + 3] == ["("]:
+                end_index = get_arithmetic_expansion(
+                    list_of_char,
+                    index,
+                    token_list
+                )
+                if end_index is not None:
+                    return end_index
+            return get_command_substitution(
+                list_of_char,
+                index,
+                token_list
+            )
         # If next character is a letter or an underscored, it's a
         # variable. Return the end index of that variable token
         elif next_character.isalpha() or next_character is "_":
@@ -915,49 +965,540 @@ def process_dollar_sign(list_of_char,
 
 
 def get_subshell_token(list_of_char, index, token_list):
+    """
+    Get the subshell token started by a left parenthesis. The characters
+    inside the parentheses are lexed once, and their tokens are kept in the
+    subshell token so that the parser doesn't lex them again.
+
+    Input:
+        - list_of_char: a list of characters from the user's input
+        - index: the index of the left parenthesis
+        - token_list: the list the subshell token will be added to
+
+    Output:
+        - index: the index of the right parenthesis
+    """
+    # Two parentheses start an arithmetic command, run by the (( builtin,
+    # unless they start a subshell inside a subshell
+    if list_of_char[index + 1:index + 2] == ["("]:
+        end_index = find_arithmetic_end(list_of_char, index + 2)
+        if end_index is not None:
+            insert_token_to_list("((", token_list)
+            insert_token_to_list(" ", token_list, token_type="Separator")
+            insert_token_to_list(
+                get_arithmetic_content(list_of_char, index + 2, end_index),
+                token_list,
+                token_type="Double_Quote",
+                original_string=get_string_from_list(list_of_char,
+                                                     index + 2,
+                                                     end_index + 1)
+            )
+            return end_index + 1
     begin_index = index
-    current_char = None
-    previous_char = None
-    index += 1
+    inner_token_list = []
+    index = scan_tokens(list_of_char, index + 1, inner_token_list,
+                        in_subshell=True)[0]
+    content = get_string_from_list(list_of_char, begin_index, index)
+    # The bodies of the here-documents inside the parentheses come first
+    if "<<" in content:
+        read_here_documents(inner_token_list)
+    token = insert_token_to_list(content, token_list, token_type="Subshell")
+    token.token_list = inner_token_list
+    return index
+
+
+#################################
+#      Command Substitution     #
+#################################
+
+
+def get_command_substitution(list_of_char, index, token_list):
+    """
+    Get the command substitution token started by a dollar sign and a left
+    parenthesis. The commands inside are lexed once, as in a subshell.
+
+    Input:
+        - list_of_char: a list of characters from the user's input
+        - index: the index of the dollar sign
+        - token_list: the list the command substitution token will be added
+        to
+
+    Output:
+        - index: the index of the right parenthesis
+    """
+    begin_index = index
+    inner_token_list = []
+    index = scan_tokens(list_of_char, index + 2, inner_token_list,
+                        in_subshell=True)[0]
+    content = get_string_from_list(list_of_char, begin_index, index)
+    # The bodies of the here-documents inside the parentheses come first
+    if "<<" in content:
+        read_here_documents(inner_token_list)
+    token = insert_token_to_list(content, token_list,
+                                 token_type="Command_Substitution")
+    token.token_list = inner_token_list
+    return index
+
+
+def get_backquote_token(list_of_char, index, token_list):
+    """
+    Get the command substitution token marked by the backquotes. A backslash
+    only escapes a backquote, a dollar sign or another backslash, so the
+    commands inside are lexed from the unescaped string.
+
+    Input:
+        - list_of_char: a list of characters from the user's input
+        - index: the index of the opening backquote
+        - token_list: the list the command substitution token will be added
+        to
+
+    Output:
+        - index: the index of the closing backquote
+    """
+    begin_index = index
+    command_string = ""
+    # Loop until an unescaped backquote is found
     while True:
         while index < len(list_of_char):
+            index += 1
+            if index == len(list_of_char):
+                break
             current_char = list_of_char[index]
-            if previous_char is "\\":
-                pass
-            elif current_char in ["'", "$", '"', "("]:
-                special_character_function = {
-                    "'": get_single_quote_token,
-                    "$": get_dollar_sign_expand,
-                    '"': get_double_quote_token,
-                    "(": get_subshell_token
-                }
-                index = special_character_function[current_char](
-                    list_of_char,
-                    index,
-                    []
-                )
-            elif current_char is ")":
-                insert_token_to_list(
-                    get_string_from_list(
-                        list_of_char,
-                        begin_index,
-                        index
-                    ),
+            if (current_char == "\\" and index + 1 < len(list_of_char) and
+                    list_of_char[index + 1] in "`$\\"):
+                index += 1
+                command_string += list_of_char[index]
+            elif current_char == "`":
+                token = insert_token_to_list(
+                    get_string_from_list(list_of_char, begin_index, index),
                     token_list,
-                    token_type="Subshell"
+                    token_type="Command_Substitution"
                 )
+                token.token_list = get_token_list(command_string)[0]
                 return index
-            index += 1
-        list_of_char.extend([char for char in ";" + input(">")])
+            else:
+                command_string += current_char
+        # Ask user for more input if the substitution is not closed
+        list_of_char.extend([char for char in "\n" + read_continuation_line()])
     return index
 
 
+#################################
+#           Arithmetic          #
+#################################
+
+
+def find_arithmetic_end(list_of_char, index):
+    """
+    Find the end of an arithmetic expression, whose parentheses are balanced
+    before the two right parentheses that close it
+
+    Input:
+        - list_of_char: a list of characters from the user's input
+        - index: the index of the first character of the expression
+
+    Output:
+        - The index of the first closing parenthesis, None if the
+        characters aren't an arithmetic expression
+    """
+    depth = 0
+    while True:
+        while index < len(list_of_char):
+            current_char = list_of_char[index]
+            if current_char == "(":
+                depth += 1
+            elif current_char == ")" and depth:
+                depth -= 1
+            # A single right parenthesis closes a subshell instead
+            elif current_char == ")":
+                if index + 1 == len(list_of_char):
+                    break
+                return index if list_of_char[index + 1] == ")" else None
+            index += 1
+        # Ask user for more input if the expression is not closed
+        list_of_char.extend([char for char in "\n" + read_continuation_line()])
+
+
+def get_arithmetic_content(list_of_char, begin, end):
+    """
+    Lex an arithmetic expression as the content of a double quote, so that
+    its parameters and command substitutions are expanded. The double
+    quotes inside the expression are removed.
+
+    Input:
+        - list_of_char: a list of characters from the user's input
+        - begin: the index of the first character of the expression
+        - end: the index after its last character
+
+    Output:
+        - The content of the expression token
+    """
+    expression_token_list = []
+    get_double_quote_token(
+        ["\""] + [char for char in list_of_char[begin:end]
+                  if char != "\""] + ["\""],
+        0,
+        expression_token_list
+    )
+    return expression_token_list[0].content
+
+
+def get_arithmetic_expansion(list_of_char, index, token_list):
+    """
+    Get the arithmetic expansion token started by a dollar sign and two left
+    parentheses
+
+    Input:
+        - list_of_char: a list of characters from the user's input
+        - index: the index of the dollar sign
+        - token_list: the list the arithmetic token will be added to
+
+    Output:
+        - index: the index of the last right parenthesis, None if the
+        characters are a command substitution
+    """
+    end_index = find_arithmetic_end(list_of_char, index + 3)
+    if end_index is None:
+        return None
+    insert_token_to_list(
+        get_arithmetic_content(list_of_char, index + 3, end_index),
+        token_list,
+        token_type="Arithmetic",
+        original_string=get_string_from_list(list_of_char, index,
+                                             end_index + 1)
+    )
+    return end_index + 1
+
+
+#################################
+#         Here-Document         #
+#################################
+
+
+def get_here_document_content(body):
+    """
+    Lex the body of a here-document as the content of a double quote, so
+    that its parameters, command substitutions and arithmetic expansions
+    are expanded. A backslash only escapes a dollar sign, a backquote,
+    another backslash or a newline, and the double quotes are kept.
+
+    Input:
+        - body: the lines of the body joined together
+
+    Output:
+        - The content of the body token
+    """
+    list_of_char = list(body)
+    content_list = []
+    token_string = ""
+    index = 0
+    while index < len(list_of_char):
+        current_char = list_of_char[index]
+        if (current_char == "\\" and index + 1 < len(list_of_char) and
+                list_of_char[index + 1] in "$`\\\n"):
+            index += 1
+            # An escaped newline joins the line to the next one
+            if list_of_char[index] != "\n":
+                token_string += list_of_char[index]
+        elif current_char == "$":
+            index, token_string = process_dollar_sign(
+                list_of_char,
+                index,
+                token_string,
+                content_list
+            )
+        elif current_char == "`":
+            insert_token_to_list(token_string, content_list)
+            token_string = ""
+            index = get_backquote_token(list_of_char, index, content_list)
+        else:
+            token_string += current_char
+        index += 1
+    insert_token_to_list(token_string, content_list)
+    return content_list
+
+
 #################################
 #           Main Lexer          #
 #################################
 
 
-def get_token_list(input_string):
+# Name of the lexer engine used by get_token_list when none is specified
+LEXER_ENGINE = "table"
+# Lookup tables shared by every call of the table lexer
+OPERATORS = frozenset(['||', '|', '>', '<', '<<', '>>', '&&', ';', '&'])
+QUOTES_AND_BRACES = frozenset(["'", '"', "(", "`"])
+SEPARATORS = frozenset([" ", "\n"])
+# Kind code of the tokens stored as offsets in a Token_Stream
+TEXT_TOKEN_KINDS = {
+    "Word": Token_Stream.WORD,
+    "Operator": Token_Stream.OPERATOR,
+    "Separator": Token_Stream.SEPARATOR
+}
+# Characters after which a number sign starts a comment, since they end
+# the previous word
+COMMENT_PREVIOUS_CHARS = frozenset(["", " ", "\n", ";", "&", "|", "<", ">"])
+# A run of characters that have no special meaning for the main lexer
+PLAIN_RUN_PATTERN = compile(r"[^|><&;!\\$'\"(` \n]+")
+# A run of characters that have no special meaning inside a subshell
+SUBSHELL_PLAIN_RUN_PATTERN = compile(r"[^|><&;!\\$'\"()` \n]+")
+
+
+def get_token_list_table(input_string, compact=False):
+    """
+    Convert the user input into a token list by scanning the string directly
+    with precomputed character tables. It produces the same tokens as
+    get_token_list_naive.
+
+    Input:
+        - input_string: The string that the user has input
+        - compact: a boolean value that determines whether the tokens are
+        stored in a Token_Stream instead of a list
+
+    Output:
+        - token_list: the list of tokens after conversion
+        - list_of_char: the list of characters after history expansion and
+        line continuation
+    """
+    # The helper functions of the lexer work on a mutable list of characters
+    list_of_char = list(input_string)
+    # Initialize the token list
+    token_list = Token_Stream(input_string) if compact else []
+    source = scan_tokens(list_of_char, 0, token_list, compact)[1]
+    # The offsets of the stream point into the final source string
+    if compact:
+        token_list.source = source
+    # The bodies of the here-documents start after the command line
+    if "<<" in source:
+        read_here_documents(token_list)
+    return token_list, list_of_char
+
+
+def scan_tokens(list_of_char, index, token_list, compact=False,
+                in_subshell=False):
+    """
+    Add the tokens of the characters from an index to a token list, with
+    the table lexer
+
+    Input:
+        - list_of_char: the list of characters from the user's input
+        - index: the index of the first character
+        - token_list: the list or the Token_Stream the tokens are added to
+        - compact: a boolean value that determines whether the token list is
+        a Token_Stream
+        - in_subshell: a boolean value that determines whether the scan
+        stops at the right parenthesis that closes a subshell, asking for
+        more input if there is none
+
+    Output:
+        - index: the index of the closing parenthesis in a subshell, the
+        length of the list of characters otherwise
+        - source: the final string of the list of characters
+    """
+    # Keep a string copy of the list so that runs of ordinary characters
+    # can be matched at once
+    source = "".join(list_of_char)
+    plain_run_pattern = (SUBSHELL_PLAIN_RUN_PATTERN if in_subshell
+                         else PLAIN_RUN_PATTERN)
+    token_string = ""
+    # The helper functions add their tokens into a scratch list when the
+    # tokens are stored in a stream
+    helper_list = [] if compact else token_list
+    previous_char = ""
+
+    def add_token(content, token_type, begin):
+        """
+        Add a word, an operator or a separator that starts at the begin
+        index of the source string
+        """
+        if not compact:
+            insert_token_to_list(content, token_list, token_type=token_type)
+        # Only store the offsets if the content is a slice of the source
+        elif content and source.startswith(content, begin):
+            token_list.append_text(TEXT_TOKEN_KINDS[token_type],
+                                   begin, begin + len(content))
+        elif content:
+            token_list.append_object(
+                insert_token_to_list(content, [], token_type=token_type)
+            )
+
+    def move_helper_tokens():
+        """
+        Move the tokens added by a helper function into the stream
+        """
+        if compact:
+            for token in helper_list:
+                token_list.append_object(token)
+            helper_list.clear()
+
+    # Loop through the input string
+    while True:
+        if index >= len(list_of_char):
+            if not in_subshell:
+                break
+            # The bodies of the here-documents of the line come before the
+            # next line of a subshell that isn't closed
+            if "<<" in source:
+                add_token(token_string,
+                          "Operator" if token_string in OPERATORS else "Word",
+                          index - len(token_string))
+                token_string = ""
+                read_here_documents(token_list)
+            list_of_char.extend(";" + read_continuation_line())
+            source = "".join(list_of_char)
+            continue
+        # Consume a whole run of ordinary characters in a single step
+        plain_run = plain_run_pattern.match(source, index)
+        # A word starting with a number sign is a comment until the end of
+        # the line
+        if (plain_run and source[index] == "#" and
+                previous_char in COMMENT_PREVIOUS_CHARS and
+                (not token_string or token_string in OPERATORS)):
+            add_token(token_string, "Operator", index - len(token_string))
+            token_string = ""
+            end_index = source.find("\n", index)
+            index = len(list_of_char) if end_index == -1 else end_index
+            continue
+        if plain_run:
+            # An operator cannot continue with an ordinary character
+            if token_string in OPERATORS:
+                add_token(token_string, "Operator", index - len(token_string))
+                token_string = ""
+            token_string += plain_run.group()
+            index = plain_run.end()
+            previous_char = source[index - 1]
+            continue
+        # Get current character at current index
+        current_char = source[index]
+        # Keep the index so that the source string can be resynchronized
+        # with the list of characters after it has been modified
+        begin_index = index
+        # If previous character and current character can be combined
+        # to create an operator
+        if previous_char + current_char in OPERATORS:
+            token_string = previous_char + current_char
+        # Else if current character can be an operator
+        elif current_char in OPERATORS:
+            add_token(token_string, "Word", index - len(token_string))
+            token_string = current_char
+        # Else if the token string is an operator
+        elif token_string in OPERATORS:
+            add_token(token_string, "Operator", index - len(token_string))
+            token_string = ""
+            continue
+        # Else if the current character closes the subshell
+        elif current_char == ")" and in_subshell:
+            break
+        # Else if the current character is an exclamation mark
+        elif current_char == "!":
+            index, token_string = expand_history_event(list_of_char, index,
+                                                       token_string)
+            source = "".join(list_of_char)
+            continue
+        # Else if current character is a <backslash>
+        elif current_char == "\\":
+            list_of_char, index, token_string = get_escaped_character(
+                list_of_char,
+                index,
+                token_string
+            )
+        # Else if current character is a $
+        elif current_char == "$":
+            index, token_string = process_dollar_sign(
+                list_of_char,
+                index,
+                token_string,
+                helper_list
+            )
+            move_helper_tokens()
+        # Else if current character is a quote or a left parentheses
+        elif current_char in QUOTES_AND_BRACES:
+            add_token(token_string, "Word", index - len(token_string))
+            token_string = ""
+            index = GET_TOKEN_FUNCTIONS[current_char](
+                list_of_char,
+                index,
+                helper_list
+            )
+            move_helper_tokens()
+        # Else if current character is a separator
+        elif current_char in SEPARATORS:
+            add_token(token_string, "Word", index - len(token_string))
+            token_string = ""
+            add_token(current_char, "Separator", index)
+        # Else add current character to token string
+        else:
+            token_string += current_char
+        # Resynchronize the source string if the list of characters has been
+        # extended or modified by a history expansion
+        if (len(list_of_char) != len(source) or
+                source.find("!", begin_index, index + 1) != -1):
+            source = "".join(list_of_char)
+        # Move to the next character
+        index += 1
+        previous_char = current_char
+    # Add the current token string into the token list
+    add_token(token_string,
+              "Operator" if token_string in OPERATORS else "Word",
+              index - len(token_string))
+    return index, source
+
+
+def get_token_stream(input_string):
+    """
+    Convert the user input into a compact token stream, which stores the
+    words, operators and separators as offsets into the input string instead
+    of token objects
+
+    Input:
+        - input_string: The string that the user has input
+
+    Output:
+        - token_stream: the Token_Stream after conversion
+        - list_of_char: the list of characters after history expansion and
+        line continuation
+    """
+    return get_token_list_table(input_string, compact=True)
+
+
+def check_lexer_engines(input_string):
+    """
+    Check if the table lexer and the naive lexer produce the same tokens
+
+    Input:
+        - input_string: The string that will be lexed by both engines
+
+    Output:
+        - True if both token lists are the same, False otherwise
+    """
+    def describe(token_list):
+        return [(type(token), str(token), token.original_string)
+                for token in token_list]
+    return (describe(get_token_list_table(input_string)[0]) ==
+            describe(get_token_list_naive(input_string)[0]))
+
+
+def get_token_list(input_string, engine=None):
+    """
+    Convert the user input into a token list
+
+    Input:
+        - input_string: The string that the user has input
+        - engine: the name of the lexer engine ("table" or "naive"),
+        LEXER_ENGINE is used if it is not specified
+
+    Output:
+        - token_list: the list of tokens after conversion
+        - None if the input is incorrect
+    """
+    # If the input is incorrect, return None
+    if not isinstance(input_string, str):
+        print("input_string parameter must be a str type object")
+        return None
+    return LEXER_ENGINES[engine or LEXER_ENGINE](input_string)
+
+
+def get_token_list_naive(input_string):
     """
     Convert the user input into a token list
 
@@ -973,8 +1514,8 @@ def get_token_list(input_string):
     if not isinstance(input_string, str):
         print("input_string parameter must be a str type object")
         return None
-    operators = ['||', '|', '>', '<', '<<', '>>', '&&', ';']
-    quotes_and_braces = ["'", '"', "("]
+    operators = ['||', '|', '>', '<', '<<', '>>', '&&', ';', '&']
+    quotes_and_braces = ["'", '"', "(", "`"]
     separators = [" ", "\n"]
     # Convert the string into list so it becomes mutable
     list_of_char = [char for char in input_string]
@@ -1013,6 +1554,13 @@ def get_token_list(input_string):
         elif current_char is "!":
             index, token_string = expand_history_event(list_of_char, index, token_string)
             continue
+        # Else if a word starts with a number sign, skip the comment until
+        # the end of the line
+        elif (current_char == "#" and not token_string and
+              previous_char in COMMENT_PREVIOUS_CHARS):
+            while index < len(list_of_char) and list_of_char[index] != "\n":
+                index += 1
+            continue
         # Else if current character is a <backslash>
         elif current_char is "\\":
             list_of_char, index, token_string = get_escaped_character(
@@ -1041,13 +1589,14 @@ def get_token_list(input_string):
             # New token string will be empty
             token_string = ""
             # If current character is not a <space>
-            if current_char in ["\"", "'", "("]:
+            if current_char in ["\"", "'", "(", "`"]:
                 # Initialize the dictionary that contains the name of
                 # the functions that will get the token
                 get_token_functions = {
                     "\"": get_double_quote_token,
                     "'": get_single_quote_token,
-                    "(": get_subshell_token
+                    "(": get_subshell_token,
+                    "`": get_backquote_token
                 }
                 # Run the get token function base on the current character
                 # and return the index
@@ -1081,4 +1630,21 @@ def get_token_list(input_string):
             token_string,
             token_list
         )
+    # Read the bodies of the here-documents
+    if "<<" in "".join(list_of_char):
+        read_here_documents(token_list)
     return token_list, list_of_char
+
+
+# Functions that get the token started by a quote or a left parentheses
+GET_TOKEN_FUNCTIONS = {
+    "\"": get_double_quote_token,
+    "'": get_single_quote_token,
+    "(": get_subshell_token,
+    "`": get_backquote_token
+}
+# Lexer engines that can be selected by get_token_list
+LEXER_ENGINES = {
+    "table": get_token_list_table,
+    "naive": get_token_list_naive
+}
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+from command_execution import start_external_command, start_child_process,\
+                              run_builtin_command, close_file_descriptors
+from globbing import iterate_globbing, has_magic_char
+from job_table import get_exit_code
+from os import open as open_file, read, write, waitpid, kill, cpu_count,\
+               devnull, O_RDONLY
+from os.path import basename, splitext
+from signal import SIGTERM
+from tempfile import TemporaryFile
+import sys
+
+
+PARALLEL_USAGE = ("usage: parallel [-j jobs] [-k] [-g] command [arg ...] "
+                  "[::: input ...]")
+# Separator between the command and its inputs
+INPUT_SEPARATOR = ":::"
+# Strings replaced by a part of the input in the arguments of the command
+REPLACEMENT_FUNCTIONS = {
+    "{}": lambda input_string: input_string,
+    "{.}": lambda input_string: splitext(input_string)[0],
+    "{/}": basename
+}
+# Size of the chunks the output of a job is copied by
+COPY_BUFFER_SIZE = 65536
+# The exit code counts the failed jobs up to this number
+MAX_FAILED_COUNT = 101
+
+
+#################################
+#            Options            #
+#################################
+
+
+def parse_parallel_arguments(argument_list):
+    """
+    Parse the arguments of the parallel builtin
+
+    Input:
+        - argument_list: the arguments of the builtin
+
+    Output:
+        - job_count: the maximum number of jobs run at the same time
+        - keep_order: whether the outputs are written in input order
+        - use_glob: whether the inputs are glob patterns
+        - template: the command and its arguments
+        - input_list: the inputs after the separator, None to read them
+        from the standard input
+
+    Raise ValueError with the error message if an argument is invalid.
+    """
+    job_count = cpu_count() or 1
+    keep_order = use_glob = False
+    index = 1
+    while index < len(argument_list):
+        argument = argument_list[index]
+        if argument in ("-k", "--keep-order"):
+            keep_order = True
+        elif argument in ("-g", "--glob"):
+            use_glob = True
+        elif argument in ("-j", "--jobs") or argument.startswith("-j"):
+            if argument in ("-j", "--jobs"):
+                index += 1
+                if index == len(argument_list):
+                    raise ValueError("%s: option requires an argument"
+                                     % argument)
+                argument = argument_list[index]
+            else:
+                argument = argument[2:]
+            if not argument.isdigit() or not int(argument):
+                raise ValueError("%s: invalid number of jobs" % argument)
+            job_count = int(argument)
+        elif argument == "--":
+            index += 1
+            break
+        elif not argument.startswith("-") or argument == INPUT_SEPARATOR:
+            break
+        else:
+            raise ValueError("%s: invalid option" % argument)
+        index += 1
+    rest_list = argument_list[index:]
+    if INPUT_SEPARATOR in rest_list:
+        separator_index = rest_list.index(INPUT_SEPARATOR)
+        template = rest_list[:separator_index]
+        input_list = rest_list[separator_index + 1:]
+    else:
+        template = rest_list
+        input_list = None
+    if not template:
+        raise ValueError(PARALLEL_USAGE)
+    return job_count, keep_order, use_glob, template, input_list
+
+
+#################################
+#            Inputs             #
+#################################
+
+
+def iterate_inputs(input_list, use_glob, stdin_fd=None):
+    """
+    Get the inputs of the jobs one at a time, so that a job can start
+    before every input is known
+
+    Input:
+        - input_list: the inputs after the separator, None to read them
+        from the lines of the standard input
+        - use_glob: whether each input is a pattern whose matching paths
+        are the inputs
+        - stdin_fd: the file descriptor the standard input is redirected
+        from, None for the stdin of the shell
+
+    Output:
+        - A generator of the inputs
+    """
+    if input_list is None:
+        # The redirection is closed by the shell after the builtin
+        input_file = (sys.stdin if stdin_fd is None else
+                      open(stdin_fd, errors="surrogateescape",
+                           closefd=False))
+        for line in input_file:
+            yield line.rstrip("\n")
+        return
+    for input_string in input_list:
+        if not use_glob or not has_magic_char(input_string):
+            yield input_string
+            continue
+        # The paths are taken from the directory listings as they are
+        # matched, without being sorted
+        yield from iterate_globbing(input_string)
+
+
+def build_argument_list(template, input_string):
+    """
+    Get the arguments of the command of a job
+
+    Input:
+        - template: the command and its arguments
+        - input_string: the input of the job
+
+    Output:
+        - The arguments with the replacement strings replaced, the input is
+        added at the end if there is no replacement string
+    """
+    argument_list = []
+    is_replaced = False
+    for argument in template:
+        for replacement, function in REPLACEMENT_FUNCTIONS.items():
+            if replacement in argument:
+                argument = argument.replace(replacement,
+                                            function(input_string))
+                is_replaced = True
+        argument_list.append(argument)
+    if not is_replaced:
+        argument_list.append(input_string)
+    return argument_list
+
+
+#################################
+#             Pool              #
+#################################
+
+
+def copy_output(output_file):
+    """
+    Write the output of a finished job to the stdout of the shell
+    """
+    output_file.seek(0)
+    file_descriptor = output_file.fileno()
+    while True:
+        data = read(file_descriptor, COPY_BUFFER_SIZE)
+        if not data:
+            break
+        view = memoryview(data)
+        while view:
+            view = view[write(1, view):]
+    output_file.close()
+
+
+class Parallel_Pool:
+    """
+    Pool of the jobs of the parallel builtin. At most job_count commands run
+    at the same time, each of them writes to a temporary file of its own,
+    which is copied to the stdout of the shell when it finishes.
+    """
+
+    def __init__(self, shell, job_count, keep_order):
+        self.shell = shell
+        self.job_count = job_count
+        self.keep_order = keep_order
+        # Dictionary maps the process id of each running job to its index
+        self.running_dict = {}
+        # Dictionary maps the index of each job to its output file, until
+        # the output has been written
+        self.output_dict = {}
+        # Indexes of the jobs that have finished but whose output waits for
+        # an earlier job, in input order mode
+        self.finished_set = set()
+        self.next_output_index = 0
+        self.failed_count = 0
+
+    def start(self, index, argument_list, stdin_fd):
+        """
+        Start the job of an input with its output in a temporary file
+        """
+        output_file = TemporaryFile()
+        self.output_dict[index] = output_file
+        shell = self.shell
+        if argument_list[0] in shell.builtin_commands:
+            process = (start_child_process(
+                lambda: run_builtin_command(argument_list, shell),
+                stdin_fd,
+                output_file.fileno()
+            ),)
+        else:
+            process = start_external_command(argument_list, shell, stdin_fd,
+                                             output_file.fileno())
+        if isinstance(process, tuple):
+            self.running_dict[process[0]] = index
+        else:
+            # The command couldn't be started
+            self.finish(index, process)
+
+    def finish(self, index, exit_code):
+        """
+        Write the output of a finished job, and the outputs that were
+        waiting for it in input order mode
+        """
+        if exit_code:
+            self.failed_count += 1
+        sys.stdout.flush()
+        if not self.keep_order:
+            copy_output(self.output_dict.pop(index))
+            return
+        self.finished_set.add(index)
+        while self.next_output_index in self.finished_set:
+            self.finished_set.discard(self.next_output_index)
+            copy_output(self.output_dict.pop(self.next_output_index))
+            self.next_output_index += 1
+
+    def wait_for_job(self):
+        """
+        Wait until one of the running jobs finishes. The background jobs
+        reaped in the meantime are updated in the job table.
+        """
+        while True:
+            process_id, status = waitpid(-1, 0)
+            index = self.running_dict.pop(process_id, None)
+            if index is not None:
+                self.finish(index, get_exit_code(status))
+                return
+            self.shell.jobs.update_process(process_id, status)
+
+    def stop(self):
+        """
+        Terminate the running jobs after the builtin has been interrupted
+        """
+        for process_id in self.running_dict:
+            try:
+                kill(process_id, SIGTERM)
+            except ProcessLookupError:
+                pass
+        for process_id in self.running_dict:
+            try:
+                waitpid(process_id, 0)
+            except ChildProcessError:
+                pass
+        self.running_dict.clear()
+        for output_file in self.output_dict.values():
+            output_file.close()
+        self.output_dict.clear()
+
+    def run(self, template, input_iterator):
+        """
+        Run a job for each input
+
+        Input:
+            - template: the command and its arguments
+            - input_iterator: an iterable of the inputs
+
+        Output:
+            - The number of failed jobs, at most MAX_FAILED_COUNT
+        """
+        # The jobs don't compete for the input of the shell
+        stdin_fd = open_file(devnull, O_RDONLY)
+        try:
+            for index, input_string in enumerate(input_iterator):
+                if len(self.running_dict) >= self.job_count:
+                    self.wait_for_job()
+                self.start(index, build_argument_list(template, input_string),
+                           stdin_fd)
+            while self.running_dict:
+                self.wait_for_job()
+        finally:
+            close_file_descriptors(stdin_fd)
+            self.stop()
+        return min(self.failed_count, MAX_FAILED_COUNT)
+
+
+def run_parallel(argument_list, shell, stdin_fd=None):
+    """
+    Run a command for each of its inputs, several of them at the same time
+
+    Input:
+        - argument_list: the arguments of the parallel builtin
+        - shell: the current shell instance
+        - stdin_fd: the file descriptor the inputs are read from when there
+        is no input separator, None for the stdin of the shell
+
+    Output:
+        - The number of failed jobs, 2 if the arguments are invalid
+    """
+    try:
+        job_count, keep_order, use_glob, template, input_list =\
+            parse_parallel_arguments(argument_list)
+    except ValueError as e:
+        print("intek-sh: parallel: %s" % e)
+        return 2
+    pool = Parallel_Pool(shell, job_count, keep_order)
+    return pool.run(template, iterate_inputs(input_list, use_glob, stdin_fd))
@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
-from fnmatch import fnmatch
+from functools import lru_cache
+from re import compile, escape, DOTALL
 
 
 def use_default_values(parameter, operator, value, variables_dict):
@@ -32,38 +33,112 @@ def use_alternative_value(parameter, operator, value, variables_dict):
         return value if parameter in variables_dict else ''
 
 
-def find_match_char(a_list, pattern):
-    list_match_idx = []
-    for idx, char in enumerate(a_list):
-        if fnmatch(a_list[:idx + 1], pattern):
-            list_match_idx.append(idx)
-    return list_match_idx
+def get_pattern_atom_list(pattern):
+    """
+    Split a glob pattern into the regular expressions of its atoms
+
+    Input:
+        - pattern: the glob pattern
+
+    Output:
+        - atom_list: a list of regular expressions that each match a single
+        character, None marks a star
+    """
+    atom_list = []
+    index = 0
+    while index < len(pattern):
+        char = pattern[index]
+        index += 1
+        if char == "*":
+            # Consecutive stars match the same strings as a single one
+            if not atom_list or atom_list[-1] is not None:
+                atom_list.append(None)
+        elif char == "?":
+            atom_list.append(".")
+        elif char == "[":
+            # Find the closing bracket the same way fnmatch does
+            end_index = index
+            if end_index < len(pattern) and pattern[end_index] == "!":
+                end_index += 1
+            if end_index < len(pattern) and pattern[end_index] == "]":
+                end_index += 1
+            while end_index < len(pattern) and pattern[end_index] != "]":
+                end_index += 1
+            # An unclosed bracket is a normal character
+            if end_index >= len(pattern):
+                atom_list.append("\\[")
+                continue
+            bracket_content = pattern[index:end_index].replace("\\", "\\\\")
+            index = end_index + 1
+            if bracket_content.startswith("!"):
+                bracket_content = "^" + bracket_content[1:]
+            elif bracket_content.startswith(("^", "[")):
+                bracket_content = "\\" + bracket_content
+            atom_list.append("[%s]" % bracket_content)
+        else:
+            atom_list.append(escape(char))
+    return atom_list
+
+
+@lru_cache(maxsize=256)
+def compile_pattern(pattern, longest, reverse):
+    """
+    Compile a glob pattern into a regular expression that matches the
+    shortest or the longest prefix of a string
+
+    Input:
+        - pattern: the glob pattern
+        - longest: a boolean value that determines whether the longest match
+        is preferred
+        - reverse: a boolean value that determines whether the pattern is
+        reversed, to match the prefix of a reversed string
+
+    Output:
+        - The compiled regular expression
+    """
+    atom_list = get_pattern_atom_list(pattern)
+    if reverse:
+        atom_list.reverse()
+    star = ".*" if longest else ".*?"
+    return compile("".join(star if atom is None else atom
+                           for atom in atom_list), DOTALL)
+
+
+def get_match_length(string, pattern, longest, reverse):
+    """
+    Get the length of the shortest or longest prefix (or suffix) of a
+    string that matches a glob pattern
+
+    Input:
+        - string: the string that will be matched
+        - pattern: the glob pattern
+        - longest: a boolean value that determines whether the longest match
+        is returned
+        - reverse: a boolean value that determines whether a suffix is
+        matched instead of a prefix
+
+    Output:
+        - The length of the match, 0 if there is no match
+    """
+    if not pattern:
+        return 0
+    match = compile_pattern(pattern, longest, reverse).match(
+        string[::-1] if reverse else string
+    )
+    # The shortest match of a pattern made of stars is empty, so nothing is
+    # removed
+    return match.end() if match else 0
 
 
 def remove_suffix(param_value, operator, value):
-    param_value = param_value[::-1]
-    value = value[::-1]
-    if find_match_char(param_value, value):
-        if operator == '%':
-            return param_value[find_match_char(param_value,
-                                               value)[0] + 1:][::-1]
-        elif operator == '%%':
-            return param_value[find_match_char(param_value,
-                                               value)[-1] + 1:][::-1]
-    else:
-        return param_value[::-1]
+    return param_value[:len(param_value) -
+                       get_match_length(param_value, value,
+                                        operator == '%%', True)]
 
 
 def remove_prefix(param_value, operator, value):
-    if find_match_char(param_value, value):
-        if operator == '#':
-            return param_value[find_match_char(param_value,
-                                               value)[0] + 1:]
-        elif operator == '##':
-            return param_value[find_match_char(param_value,
-                                               value)[-1] + 1:]
-    else:
-        return param_value
+    return param_value[get_match_length(param_value, value,
+                                        operator == '##', False):]
 
 
 def exe_remove(parameter, operator, value, variables_dict):
@@ -78,7 +153,9 @@ def exe_remove(parameter, operator, value, variables_dict):
 
 
 def expand_parameter(parameter, operator, value, variables_dict):
-    if '-' in operator:
+    if not operator:
+        return variables_dict.get(parameter, '')
+    elif '-' in operator:
         return use_default_values(parameter, operator,
                                   value, variables_dict)
     elif '+' in operator:
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+from collections import OrderedDict
+from token_definition import Operator_Token, Separator_Token
+from naive_lexer import get_token_list
+from command_splitting import get_command_list
+from history_store import shell_history
+from profiler import profiler
+
+
+def parse_input_string(input_string):
+    """
+    Lex and parse a line of input
+
+    Input:
+        - input_string: the line that the user has input
+
+    Output:
+        - command_list: the list of commands before expansion
+        - input_string: the line after history expansion and line
+        continuation
+        - is_complete: a boolean value that tells whether the line has been
+        parsed without asking the user for more input
+    """
+    token_list, list_of_char = profiler.call("lex", get_token_list,
+                                             input_string)
+    final_input_string = "".join(list_of_char)
+    # The splitter asks for more input if the line ends with a logical
+    # operator, and the body of a here-document is read after the line
+    last_token = next((token for token in reversed(token_list)
+                       if not isinstance(token, Separator_Token)), None)
+    is_complete = (final_input_string == input_string and
+                   "<<" not in input_string and
+                   not (isinstance(last_token, Operator_Token) and
+                        last_token.content in ("&&", "||")))
+    return (profiler.call("parse", get_command_list, token_list),
+            final_input_string, is_complete)
+
+
+class Parse_Cache:
+    """
+    Least recently used cache of the command lists parsed from each line of
+    input. The command lists are stored before expansion, so they can be
+    executed again with the current state of the shell.
+    """
+
+    def __init__(self, max_size=512):
+        self.max_size = max_size
+        self.entry_dict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.bypasses = 0
+
+    def clear(self):
+        """
+        Remove every cached command list and reset the statistics
+        """
+        self.entry_dict.clear()
+        self.hits = self.misses = self.bypasses = 0
+
+    def parse(self, input_string):
+        """
+        Get the command list of a line of input, from the cache if the line
+        has been parsed before
+
+        Input:
+            - input_string: the line that the user has input
+
+        Output:
+            - command_list: the list of commands before expansion
+            - input_string: the line after history expansion and line
+            continuation
+        """
+        # The meaning of a history expansion depends on the history log
+        if "!" in input_string and shell_history.expansion_enabled:
+            self.bypasses += 1
+            return parse_input_string(input_string)[:2]
+        try:
+            command_list = self.entry_dict[input_string]
+            self.entry_dict.move_to_end(input_string)
+            self.hits += 1
+            return command_list, input_string
+        except KeyError:
+            self.misses += 1
+        command_list, final_input_string, is_complete = parse_input_string(
+            input_string
+        )
+        # Lines that needed more input cannot be found by their first line
+        if is_complete:
+            self.entry_dict[input_string] = command_list
+            if len(self.entry_dict) > self.max_size:
+                self.entry_dict.popitem(last=False)
+        return command_list, final_input_string
+
+    def get_statistics(self):
+        """
+        Get the statistics of the cache
+
+        Output:
+            - A dictionary of the number of hits, misses, bypasses and entries
+        """
+        return {"hits": self.hits,
+                "misses": self.misses,
+                "bypasses": self.bypasses,
+                "entries": len(self.entry_dict),
+                "max_size": self.max_size}
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+from os import environ
+from os.path import expanduser
+from time import perf_counter_ns, time
+from json import dumps
+import sys
+
+
+# Environment variable that turns the profiling on when the shell starts,
+# its value is the path of the trace file
+PROFILE_VARIABLE = "INTEK_SH_PROFILE"
+DEFAULT_TRACE_FILE = "~/.intek-sh_profile.jsonl"
+# Phases of a line, in the order they run
+PHASES = ("lex", "parse", "expand", "execute")
+# Helpers whose calls are counted, with the module they are defined in
+COUNTED_FUNCTIONS = (("naive_lexer", "insert_token_to_list"),
+                     ("param_expansion", "get_match_length"),
+                     ("globbing", "globbing"))
+
+
+def get_percentile(sorted_list, percentage):
+    """
+    Get a percentile of a sorted list with the nearest-rank method
+    """
+    index = max(0, -(-len(sorted_list) * percentage // 100) - 1)
+    return sorted_list[index]
+
+
+class Profiler:
+    """
+    Opt-in profiler of the lines run by the shell. The time and the number
+    of allocated memory blocks spent in each phase are recorded for every
+    line, together with the number of calls of a few hot helpers. Each line
+    is appended to a trace file as a JSON object, and the session keeps the
+    timings for the summary of the profile builtin.
+
+    The time of a phase doesn't include the phases it calls, so the expand
+    phase is left out of the execute phase.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.trace_file = None
+        # Dictionary maps each phase to a list of [time, blocks] of the
+        # current line
+        self.phase_dict = {}
+        # Time and blocks spent in the nested phases of each running phase
+        self.nested_stack = []
+        self.call_count_dict = {}
+        self.input_string = None
+        self.line_begin_time = 0
+        # Timings of the session, the lists of the times of each phase and
+        # of the whole lines
+        self.session_dict = {}
+        self.session_call_count_dict = {}
+        # Original functions of the counted helpers while they are replaced
+        self.original_function_list = []
+
+    #################################
+    #            Switch             #
+    #################################
+
+    def enable(self, trace_file=None):
+        """
+        Start recording the lines
+
+        Input:
+            - trace_file: the path of the trace file, the default one if it
+            is None
+        """
+        self.trace_file = expanduser(trace_file or DEFAULT_TRACE_FILE)
+        if self.enabled:
+            return
+        self.enabled = True
+        self.replace_counted_functions()
+
+    def disable(self):
+        """
+        Stop recording the lines, the session timings are kept
+        """
+        if not self.enabled:
+            return
+        self.enabled = False
+        self.restore_counted_functions()
+        self.input_string = None
+
+    def enable_from_environment(self):
+        """
+        Start recording the lines if the profile variable is set
+        """
+        trace_file = environ.get(PROFILE_VARIABLE)
+        if trace_file:
+            self.enable(trace_file)
+
+    def replace_counted_functions(self):
+        """
+        Replace each counted helper with a function that counts its calls,
+        in its own module and in every module that has imported it
+        """
+        for module_name, name in COUNTED_FUNCTIONS:
+            module = sys.modules.get(module_name)
+            if module is None:
+                continue
+            function = getattr(module, name)
+            counted_function = self.count_calls(name, function)
+            for loaded_module in list(sys.modules.values()):
+                if getattr(loaded_module, name, None) is function:
+                    setattr(loaded_module, name, counted_function)
+                    self.original_function_list.append(
+                        (loaded_module, name, function)
+                    )
+
+    def restore_counted_functions(self):
+        for module, name, function in self.original_function_list:
+            setattr(module, name, function)
+        self.original_function_list.clear()
+
+    def count_calls(self, name, function):
+        call_count_dict = self.call_count_dict
+
+        def counted_function(*args, **kwargs):
+            call_count_dict[name] = call_count_dict.get(name, 0) + 1
+            return function(*args, **kwargs)
+        return counted_function
+
+    #################################
+    #           Recording           #
+    #################################
+
+    def begin_line(self, input_string):
+        """
+        Start recording a line
+        """
+        if not self.enabled:
+            return
+        self.input_string = input_string
+        self.phase_dict = {}
+        self.nested_stack = []
+        self.call_count_dict.clear()
+        self.line_begin_time = perf_counter_ns()
+
+    def call(self, phase, function, *args):
+        """
+        Call a function and record its time and allocated blocks as a phase
+        of the current line
+
+        Input:
+            - phase: the name of the phase
+            - function: the function that runs the phase
+            - args: the arguments of the function
+
+        Output:
+            - The result of the function
+        """
+        if self.input_string is None:
+            return function(*args)
+        # Time and blocks of the phases called by this one
+        nested = [0, 0]
+        self.nested_stack.append(nested)
+        begin_blocks = sys.getallocatedblocks()
+        begin_time = perf_counter_ns()
+        try:
+            return function(*args)
+        finally:
+            elapsed_time = perf_counter_ns() - begin_time
+            block_count = sys.getallocatedblocks() - begin_blocks
+            self.nested_stack.pop()
+            if self.nested_stack:
+                self.nested_stack[-1][0] += elapsed_time
+                self.nested_stack[-1][1] += block_count
+            record = self.phase_dict.setdefault(phase, [0, 0])
+            record[0] += elapsed_time - nested[0]
+            record[1] += block_count - nested[1]
+
+    def end_line(self):
+        """
+        Finish recording the current line, append it to the trace file and
+        add its timings to the session
+        """
+        if self.input_string is None:
+            return
+        total_time = perf_counter_ns() - self.line_begin_time
+        for phase, (phase_time, _) in self.phase_dict.items():
+            self.session_dict.setdefault(phase, []).append(phase_time)
+        self.session_dict.setdefault("total", []).append(total_time)
+        for name, count in self.call_count_dict.items():
+            self.session_call_count_dict[name] = (
+                self.session_call_count_dict.get(name, 0) + count
+            )
+        record = {
+            "time": time(),
+            "line": self.input_string,
+            "total_ns": total_time,
+            "phases": {phase: {"ns": phase_time, "blocks": block_count}
+                       for phase, (phase_time, block_count)
+                       in self.phase_dict.items()},
+            "calls": dict(self.call_count_dict)
+        }
+        self.input_string = None
+        try:
+            with open(self.trace_file, "a") as trace_file:
+                trace_file.write(dumps(record) + "\n")
+        except OSError:
+            pass
+
+    #################################
+    #            Summary            #
+    #################################
+
+    def get_summary(self):
+        """
+        Get the summary of the session
+
+        Output:
+            - A list of tuples of each phase, its number of lines, and its
+            p50 and p99 times in nanoseconds
+            - A dictionary maps each counted helper to its number of calls
+        """
+        summary_list = []
+        for phase in PHASES + ("total",):
+            time_list = sorted(self.session_dict.get(phase, ()))
+            if time_list:
+                summary_list.append((phase, len(time_list),
+                                     get_percentile(time_list, 50),
+                                     get_percentile(time_list, 99)))
+        return summary_list, dict(self.session_call_count_dict)
+
+    def reset(self):
+        """
+        Forget the timings of the session
+        """
+        self.session_dict.clear()
+        self.session_call_count_dict.clear()
+
+
+profiler = Profiler()
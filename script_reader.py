@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+from io import StringIO
+
+
+# Size of the buffer used to read a script file
+SCRIPT_BUFFER_SIZE = 65536
+
+
+class Script_Reader:
+    """
+    Streaming reader of the lines of a script. The statements are read one
+    line at a time from a buffered stream, so a script is never loaded into
+    memory at once. The lines of an incomplete statement are read from the
+    same reader by the lexer and the parser.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        # Number of the last line that has been read
+        self.line_number = 0
+
+    @classmethod
+    def from_file(cls, file_name):
+        """
+        Create a reader of a script file
+
+        Input:
+            - file_name: the path of the script
+
+        Output:
+            - A Script_Reader object, the file is closed by close()
+        """
+        return cls(open(file_name, "r", buffering=SCRIPT_BUFFER_SIZE,
+                        errors="surrogateescape"))
+
+    @classmethod
+    def from_string(cls, script_string):
+        """
+        Create a reader of the script given with the -c option
+
+        Input:
+            - script_string: the content of the script
+        """
+        return cls(StringIO(script_string))
+
+    def read_line(self):
+        """
+        Read the next line of the script
+
+        Output:
+            - The line without its newline character
+
+        Raise:
+            - EOFError if the end of the script has been reached
+        """
+        line = self.stream.readline()
+        if not line:
+            raise EOFError
+        self.line_number += 1
+        return line[:-1] if line.endswith("\n") else line
+
+    def __iter__(self):
+        """
+        Iterate over the first line of each statement, skipping the empty
+        lines and the comment lines
+        """
+        while True:
+            try:
+                line = self.read_line()
+            except EOFError:
+                return
+            stripped_line = line.strip()
+            if stripped_line and not stripped_line.startswith("#"):
+                yield line
+
+    def close(self):
+        self.stream.close()
@@ -1,10 +1,25 @@
 #!/usr/bin/env python3
 from os import environ as base_environ
-from os import chdir, getcwd
+from os import chdir, getcwd, fsencode, getpgrp, isatty, tcsetpgrp
+from os.path import realpath
 from os.path import basename, exists, isdir, isfile, abspath, join, expanduser
 from readline import read_history_file, write_history_file, set_history_length,\
                      get_history_length, get_history_item
-from utility import get_error_message, get_history_log
+from utility import get_error_message
+from history_store import shell_history
+from command_hash import Command_Hash
+from parse_cache import Parse_Cache
+from variable_store import Variable_Store
+from builtin_output import Builtin_Output
+from fast_builtins import interpret_escapes, format_printf, Test_Expression,\
+                          Test_Error, ECHO_ESCAPE_PATTERN,\
+                          FORMAT_ESCAPE_PATTERN
+from job_table import Job, Job_Table
+from parallel_command import run_parallel
+from command_execution import run_command_substitution
+from arithmetic import evaluate_expression
+from exception import ArithmeticExpressionError
+from profiler import profiler
 from sys import exit as system_exit
 
 
@@ -13,19 +28,82 @@ class Shell:
     Shell class that contains certain attributes of the shell as well as their
     builtin functions.
     """
-    history_file = expanduser("~/.intek-shhistory.txt")
+    history_file = shell_history.history_file
 
     def __init__(self, environ=None):
         try:
-            self.environ_dict = (base_environ.copy() if not environ
-                                 else environ.copy())
-            self.local_variable = self.environ_dict.copy()
+            # Every variable of the shell, the environment variables are
+            # the exported ones
+            self.variables = Variable_Store(base_environ if not environ
+                                            else environ)
+            # Encoded environment of the child processes, rebuilt when the
+            # exported variables change
+            self.envp = None
+            self.envp_generation = -1
             self.exit = False
             self.wait_for_execute_list = []
             self.exit_code = 0
+            self.command_hash = Command_Hash()
+            self.parse_cache = Parse_Cache()
+            self.output = Builtin_Output()
+            # Commands started in the background
+            self.jobs = Job_Table()
+            # Whether the shell reads its commands from a terminal
+            self.is_interactive = False
+            # File descriptor the running builtin reads its input from, None
+            # for the stdin of the shell
+            self.stdin_fd = None
         except TypeError:
             print("Failed to initialize Shell.")
 
+    #################################
+    #        Command lookup         #
+    #################################
+
+    def find_command(self, command_name):
+        """
+        Get the path of the file that will be executed for a command
+
+        Input:
+            - command_name: the first argument of the command
+
+        Output:
+            - The path of the command, None if it isn't found
+        """
+        # A command containing a slash is a path to the file itself
+        if "/" in command_name:
+            command_path = expanduser(command_name)
+            return command_path if isfile(command_path) else None
+        return self.command_hash.find(command_name,
+                                      self.variables.get("PATH"))
+
+    def get_envp(self):
+        """
+        Get the environment of the child processes
+
+        Output:
+            - A dictionary maps the encoded name of each exported variable
+            to its encoded value
+        """
+        if self.envp_generation != self.variables.export_generation:
+            self.envp = {fsencode(name): fsencode(value)
+                         for name, value in
+                         self.variables.get_exported().items()}
+            self.envp_generation = self.variables.export_generation
+        return self.envp
+
+    def substitute_command(self, token):
+        """
+        Get the output of a command substitution
+
+        Input:
+            - token: a Command_Substitution_Token object
+
+        Output:
+            - The output of its commands, without the trailing newlines
+        """
+        return run_command_substitution(token, self)
+
     #################################
     #       Builtin functions       #
     #################################
@@ -41,15 +119,27 @@ class Shell:
         # If there is no other argument, stdout will be the whole list of
         # set variables.
         if len(argument_list) == 1:
-            sorted_variable_name = list(self.environ_dict.keys())
-            sorted_variable_name.sort()
+            environ_dict = self.variables.get_exported()
             print("\n".join(["declare -x %s=\"%s\""
                              % (environ_variable,
-                                str(self.environ_dict[environ_variable]))
-                             for environ_variable in sorted_variable_name]))
+                                str(environ_dict[environ_variable]))
+                             for environ_variable in sorted(environ_dict)]))
             return 0
-        for argument in argument_list:
-            
+        for argument in argument_list[1:]:
+            # Split the argument into the variable name and its new value
+            name, assignment, value = argument.partition("=")
+            # Skip the argument if it isn't a valid identifier
+            if not name.isidentifier():
+                print("intek-sh: export: `%s': not a valid identifier"
+                      % argument)
+                exit_code = 1
+            # Export the new value if there is one, else the current value
+            # of the variable
+            else:
+                self.variables.export(name, value if assignment else None)
+            # Forget the remembered commands if PATH has been changed
+            if name == "PATH":
+                self.command_hash.clear()
         return exit_code
 
     def print_environment(self, argument_list):
@@ -64,16 +154,14 @@ class Shell:
             new line character
         """
         exit_code = 0
-        for argument in argument_list:
-            if argument in self.environ_dict.keys():
-                print(self.environ_dict)
+        environ_dict = self.variables.get_exported()
         if len(argument_list) == 1:
             print("\n".join(["%s=%s" % (key, value)
-                             for key, value in self.environ_dict.items()]))
+                             for key, value in environ_dict.items()]))
         else:
-            print("\n".join(self.environ_dict[argument]
+            print("\n".join(environ_dict[argument]
                             for argument in argument_list[1:]
-                            if argument in self.environ_dict))
+                            if argument in environ_dict))
         return exit_code
 
     def unset(self, argument_list):
@@ -84,8 +172,10 @@ class Shell:
             - argument_list: The arguments that have been interpreted
         """
         for argument in argument_list[1:]:
-            if argument in self.environ_dict:
-                self.environ_dict.pop(argument)
+            self.variables.unset(argument)
+            # Forget the remembered commands if PATH has been removed
+            if argument == "PATH":
+                self.command_hash.clear()
         return 0
 
     def exit_shell(self, argument_list):
@@ -99,14 +189,15 @@ class Shell:
             - A print message indicate whether the function runs smoothly or
             has any error.
         """
-        print("exit")
+        if self.is_interactive:
+            print("exit")
         try:
             exit_code = int(argument_list[1])
         except ValueError:
             print("intek-sh: exit: numeric argument required")
             system_exit(2)
         except IndexError:
-            system_exit(0)
+            system_exit(self.exit_code)
         if len(argument_list) > 2:
             print("intek-sh: exit: Too many arguments")
         system_exit(exit_code % 256)
@@ -120,28 +211,25 @@ class Shell:
             - argument_list: Arguments interepred from user input
 
         Output:
-            - A print message indicate whether the function runs smoothly or
-            has any error.
+            - The exit code of the command
         """
         # Change the current working directory to the directory whose path is
         # the 1st argument after "cd". If there is none of them, change it to
         # the directory that is recorded as HOME variable in the environ
         try:
             new_dir = (argument_list[1] if len(argument_list) > 1
-                       else self.environ_dict["HOME"])
+                       else self.variables["HOME"])
             chdir(new_dir if not new_dir.startswith("~")
                   else expanduser(new_dir))
-            self.environ_dict["PWD"] = getcwd()
-            return ""
-        except PermissionError:
-            return get_error_message(new_dir, PermissionError, "cd")
-        except FileNotFoundError:
-            return get_error_message(new_dir, FileNotFoundError, "cd")
-        except NotADirectoryError:
-            return get_error_message(new_dir, NotADirectoryError, "cd")
+            self.variables["PWD"] = getcwd()
+            return 0
+        except (PermissionError, FileNotFoundError, NotADirectoryError) as e:
+            print(get_error_message(new_dir, type(e), "cd"))
+            return 1
         # When the HOME environ variable is not set, this error will raise
         except KeyError:
-            return "intek-sh: cd: HOME not set"
+            print("intek-sh: cd: HOME not set")
+            return 1
 
     def execute_history_command(self, argument_list):
         try:
@@ -162,23 +250,425 @@ class Shell:
     def print_history(self, number=1000):
         if number > 1000:
             number = 1000
-        history_log = get_history_log()
-        converted_history_log = [
-            "{0:>5} {1}".format(index, command)
-            for index, command in enumerate(history_log)
-        ]
-        if len(history_log) < number:
-            print("\n".join(converted_history_log))
+        # Only format the commands that will be printed
+        begin_index = max(len(shell_history) - number, 0)
+        print("\n".join("{0:>5} {1}".format(index, shell_history[index])
+                        for index in range(begin_index, len(shell_history))))
+
+
+    def hash_command(self, argument_list):
+        """
+        Show, reset or fill the table of remembered commands
+
+        Input:
+            - argument_list: Arguments interepred from user input
+        """
+        # Print the table if there is no other argument
+        if len(argument_list) == 1:
+            table = self.command_hash.get_table()
+            if not table:
+                print("hash: hash table empty")
+            else:
+                print("hits\tcommand")
+                print("\n".join("%4d\t%s" % (hits, command_path)
+                                for hits, command_path in table))
+            return 0
+        exit_code = 0
+        for argument in argument_list[1:]:
+            # Empty the table
+            if argument == "-r":
+                self.command_hash.clear()
+            # Else search for the command and remember it
+            elif not self.command_hash.add(argument,
+                                           self.variables.get("PATH")):
+                print("intek-sh: hash: %s: not found" % argument)
+                exit_code = 1
+        return exit_code
+
+    def parse_cache_command(self, argument_list):
+        """
+        Show or reset the statistics of the parse cache
+
+        Input:
+            - argument_list: Arguments interepred from user input
+        """
+        if len(argument_list) > 1:
+            if argument_list[1:] != ["-r"]:
+                print("intek-sh: parse-cache: usage: parse-cache [-r]")
+                return 1
+            self.parse_cache.clear()
+            return 0
+        statistics = self.parse_cache.get_statistics()
+        lookup_count = statistics["hits"] + statistics["misses"]
+        print("entries   %d/%d" % (statistics["entries"],
+                                   statistics["max_size"]))
+        print("hits      %d" % statistics["hits"])
+        print("misses    %d" % statistics["misses"])
+        print("bypasses  %d" % statistics["bypasses"])
+        print("hit rate  %.1f%%" % (100 * statistics["hits"] / lookup_count
+                                    if lookup_count else 0))
+        return 0
+
+    def profile_command(self, argument_list):
+        """
+        Show or reset the timings recorded by the profiler in this session
+
+        Input:
+            - argument_list: Arguments interepred from user input
+        """
+        if len(argument_list) > 1:
+            if argument_list[1:] != ["-r"]:
+                print("intek-sh: profile: usage: profile [-r]")
+                return 1
+            profiler.reset()
+            return 0
+        summary_list, call_count_dict = profiler.get_summary()
+        if not summary_list:
+            print("intek-sh: profile: no line has been profiled,"
+                  " run set -o profile first")
+            return 1
+        print("%-10s%8s%14s%14s" % ("phase", "lines", "p50 (us)", "p99 (us)"))
+        for phase, line_count, p50, p99 in summary_list:
+            print("%-10s%8d%14.1f%14.1f" % (phase, line_count, p50 / 1000,
+                                            p99 / 1000))
+        for name, count in sorted(call_count_dict.items()):
+            print("%-24s%8d calls" % (name, count))
+        return 0
+
+    def set_option(self, argument_list):
+        """
+        Turn the options of the shell on with -o or off with +o, the only
+        option is profile. Without a name, the state of the options is
+        printed.
+
+        Input:
+            - argument_list: Arguments interepred from user input
+        """
+        if argument_list[1:] in (["-o"], ["+o"], []):
+            print("profile        %s" % ("on" if profiler.enabled else "off"))
+            return 0
+        if len(argument_list) != 3 or argument_list[1] not in ("-o", "+o"):
+            print("intek-sh: set: usage: set [-o|+o] [option]")
+            return 2
+        if argument_list[2] != "profile":
+            print("intek-sh: set: %s: invalid option name" % argument_list[2])
+            return 1
+        if argument_list[1] == "-o":
+            profiler.enable(self.variables.get("INTEK_SH_PROFILE"))
+        else:
+            profiler.disable()
+        return 0
+
+    def echo(self, argument_list):
+        """
+        Write the arguments separated by spaces
+
+        Input:
+            - argument_list: Arguments interepred from user input
+        """
+        # Leading options, as long as every character is a valid option
+        index = 1
+        newline = True
+        escape = False
+        while (index < len(argument_list) and
+               argument_list[index].startswith("-") and
+               len(argument_list[index]) > 1 and
+               not argument_list[index][1:].strip("neE")):
+            for char in argument_list[index][1:]:
+                if char == "n":
+                    newline = False
+                else:
+                    escape = char == "e"
+            index += 1
+        string = " ".join(argument_list[index:])
+        if escape:
+            string, is_stopped = interpret_escapes(string,
+                                                   ECHO_ESCAPE_PATTERN)
+            # \c stops the output, including the newline
+            newline = newline and not is_stopped
+        self.output.write(string + "\n" if newline else string)
+        return 0
+
+    def printf(self, argument_list):
+        """
+        Write the arguments formatted by the format string
+
+        Input:
+            - argument_list: Arguments interepred from user input
+        """
+        if len(argument_list) < 2:
+            self.output.write_line("printf: usage: printf format [arguments]")
+            return 2
+        format_string = interpret_escapes(argument_list[1],
+                                          FORMAT_ESCAPE_PATTERN)[0]
+        string, error_list = format_printf(format_string, argument_list[2:])
+        self.output.write(string)
+        for error in error_list:
+            self.output.write_line(error)
+        return 1 if error_list else 0
+
+    def print_working_directory(self, argument_list):
+        """
+        Write the path of the current working directory
+
+        Input:
+            - argument_list: Arguments interepred from user input
+        """
+        try:
+            directory = getcwd()
+        except FileNotFoundError:
+            self.output.write_line("intek-sh: pwd: No such file or directory")
+            return 1
+        self.output.write_line(realpath(directory) if "-P" in argument_list
+                               else directory)
+        return 0
+
+    def test(self, argument_list):
+        """
+        Evaluate a conditional expression, for the test and [ commands
+
+        Input:
+            - argument_list: Arguments interepred from user input
+
+        Output:
+            - 0 if the expression is true, 1 if it is false and 2 if it is
+            invalid
+        """
+        expression_list = argument_list[1:]
+        if argument_list[0] == "[":
+            if not expression_list or expression_list[-1] != "]":
+                self.output.write_line("intek-sh: [: missing `]'")
+                return 2
+            expression_list.pop()
+        try:
+            return 0 if Test_Expression(expression_list).evaluate() else 1
+        except Test_Error as e:
+            self.output.write_line("intek-sh: %s: %s" % (argument_list[0],
+                                                         e.message))
+            return 2
+
+    def type_command(self, argument_list):
+        """
+        Tell how each argument would be run as a command
+
+        Input:
+            - argument_list: Arguments interepred from user input
+        """
+        exit_code = 0
+        for argument in argument_list[1:]:
+            if argument in self.builtin_commands:
+                self.output.write_line("%s is a shell builtin" % argument)
+                continue
+            command_path = self.find_command(argument)
+            if command_path:
+                self.output.write_line("%s is %s" % (argument, command_path))
+            else:
+                self.output.write_line("intek-sh: type: %s: not found"
+                                       % argument)
+                exit_code = 1
+        return exit_code
+
+    #################################
+    #             Jobs              #
+    #################################
+
+    def find_job(self, argument_list, name):
+        """
+        Find the job of the first argument of a job control builtin
+
+        Input:
+            - argument_list: the arguments of the builtin
+            - name: the name of the builtin used in the error message
+
+        Output:
+            - The Job object, None if there is no such job
+        """
+        job_spec = argument_list[1] if len(argument_list) > 1 else None
+        job = self.jobs.find(job_spec)
+        if not job:
+            print("intek-sh: %s: %s: no such job"
+                  % (name, job_spec or "current"))
+        return job
+
+    def list_jobs(self, argument_list):
+        """
+        Print the state of the given jobs, or of every job if there is no
+        argument. The finished ones are then removed from the table.
+
+        Output:
+            - 1 if a job cannot be found, else 0
+        """
+        job_list = ([self.jobs.find(job_spec)
+                     for job_spec in argument_list[1:]]
+                    if len(argument_list) > 1 else list(self.jobs))
+        for job in job_list:
+            if job and job.state != Job.DONE:
+                job.poll()
+        exit_code = 0
+        for index, job in enumerate(job_list):
+            if not job:
+                self.output.write_line("intek-sh: jobs: %s: no such job"
+                                       % argument_list[index + 1])
+                exit_code = 1
+                continue
+            self.output.write_line("[%d]%s  %s" % (job.number,
+                                                   self.jobs.get_marker(job),
+                                                   job))
+        for job in job_list:
+            if job and job.state == Job.DONE:
+                self.jobs.remove(job)
+        return exit_code
+
+    def wait(self, argument_list):
+        """
+        Wait for the given jobs or process ids, or for every job
+
+        Output:
+            - The exit code of the last job waited for, 0 if there is no
+            argument
+        """
+        exit_code = 0
+        if len(argument_list) == 1:
+            for job in list(self.jobs):
+                job.wait()
+                self.jobs.remove(job)
+            return 0
+        for job_spec in argument_list[1:]:
+            job = self.jobs.find(job_spec)
+            if not job:
+                print("intek-sh: wait: %s: no such job" % job_spec)
+                exit_code = 127
+                continue
+            exit_code = job.wait()
+            self.jobs.remove(job)
+        return exit_code
+
+    def give_terminal(self, process_group):
+        """
+        Make a process group the foreground group of the terminal, if the
+        shell runs in one
+        """
+        if self.is_interactive and isatty(0):
+            try:
+                tcsetpgrp(0, process_group)
+            except OSError:
+                pass
+
+    def foreground(self, argument_list):
+        """
+        Continue a job in the foreground and wait for it
+
+        Output:
+            - The exit code of the job
+        """
+        job = self.find_job(argument_list, "fg")
+        if not job:
+            return 1
+        print(job.command_string)
+        self.give_terminal(job.process_group)
+        try:
+            job.resume()
+            exit_code = job.wait(until_stopped=True)
+        finally:
+            self.give_terminal(getpgrp())
+        if job.state == Job.STOPPED:
+            print("\n[%d]%s  %s" % (job.number, self.jobs.get_marker(job),
+                                    job))
         else:
-            print("\n".join(converted_history_log[-number:]))
+            self.jobs.remove(job)
+        return exit_code
+
+    def background(self, argument_list):
+        """
+        Continue a stopped job in the background
+        """
+        job = self.find_job(argument_list, "bg")
+        if not job:
+            return 1
+        job.resume()
+        print("[%d]%s %s &" % (job.number, self.jobs.get_marker(job),
+                               job.command_string))
+        return 0
 
+    def parallel(self, argument_list):
+        """
+        Run a command for each input, several of them at the same time
+
+        Input:
+            - argument_list: [parallel, options..., command, args...,
+            :::, inputs...]
+
+        Output:
+            - The number of failed jobs
+        """
+        return run_parallel(argument_list, self, self.stdin_fd)
+
+    def let(self, argument_list):
+        """
+        Evaluate arithmetic expressions, for the let and (( commands
+
+        Input:
+            - argument_list: [let, expression, ...], or [((, expression]
+
+        Output:
+            - 0 if the value of the last expression isn't 0, 1 if it is 0 or
+            if an expression is invalid
+        """
+        if len(argument_list) == 1:
+            print("intek-sh: %s: expression expected" % argument_list[0])
+            return 1
+        value = 0
+        try:
+            for expression in argument_list[1:]:
+                value = evaluate_expression(expression, self.variables)
+        except ArithmeticExpressionError as e:
+            print("intek-sh: %s: %s" % (argument_list[0], e.argument))
+            return 1
+        return 0 if value else 1
+
+    def arithmetic_command(self, argument_list):
+        # The lexer turns ((expression)) into the (( command with the
+        # expression as a single argument
+        return self.let(["(("] + [" ".join(argument_list[1:])])
+
+    def true(self, argument_list):
+        return 0
+
+    def false(self, argument_list):
+        return 1
 
     def run_builtin_command(self, argument_list, command):
-        # Dictionary contains command that will run the built-in functions
-        built_in_functions = {"cd": self.change_dir,
-                              "exit": self.exit_shell,
-                              "printenv": self.print_environment,
-                              "export": self.export,
-                              "unset": self.unset,
-                              "history": self.execute_history_command}
-        return built_in_functions[command](argument_list)
+        return self.builtin_functions[command](self, argument_list)
+
+    # Dictionary contains command that will run the built-in functions
+    builtin_functions = {"cd": change_dir,
+                         "exit": exit_shell,
+                         "printenv": print_environment,
+                         "export": export,
+                         "unset": unset,
+                         "history": execute_history_command,
+                         "hash": hash_command,
+                         "parse-cache": parse_cache_command,
+                         "profile": profile_command,
+                         "set": set_option,
+                         "echo": echo,
+                         "printf": printf,
+                         "pwd": print_working_directory,
+                         "test": test,
+                         "[": test,
+                         "type": type_command,
+                         "let": let,
+                         "((": arithmetic_command,
+                         "true": true,
+                         "false": false,
+                         "jobs": list_jobs,
+                         "wait": wait,
+                         "fg": foreground,
+                         "bg": background,
+                         "parallel": parallel}
+    # Names of the commands that are run inside the shell process
+    builtin_commands = frozenset(builtin_functions)
+    # Builtins that write through the buffered output instead of print, so
+    # they don't need the stdout of the shell to be redirected
+    buffered_builtins = frozenset(["echo", "printf", "pwd", "test", "[",
+                                   "type", "true", "false", "jobs"])
@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+from os.path import dirname, abspath, join
+from subprocess import run
+import sys
+import pytest
+
+
+# The modules of the shell are at the root of the repository
+ROOT_DIRECTORY = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, ROOT_DIRECTORY)
+
+
+@pytest.fixture
+def run_shell(tmp_path):
+    """
+    Get a function that runs a command line with intek-sh in a temporary
+    directory and returns its output
+    """
+    def run_command_line(command_line):
+        return run([sys.executable, "-W", "ignore",
+                    join(ROOT_DIRECTORY, "intek-sh.py"), "-c", command_line],
+                   cwd=str(tmp_path), capture_output=True, text=True,
+                   timeout=30).stdout
+    return run_command_line
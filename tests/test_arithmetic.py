@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+from arithmetic import evaluate_expression
+from exception import ArithmeticExpressionError
+from shutil import which
+from subprocess import run
+import pytest
+
+
+# Expressions evaluated with x=7, y=3 and n=x+1, with the value bash gives
+# and the values of x and y after the evaluation
+EXPRESSION_CASES = [
+    ('1+2*3', 7, 7, 3),
+    ('(1+2)*3', 9, 7, 3),
+    ('7/2', 3, 7, 3),
+    ('-7/2', -3, 7, 3),
+    ('7%3', 1, 7, 3),
+    ('-7%3', -1, 7, 3),
+    ('2**10', 1024, 7, 3),
+    ('2**3**2', 512, 7, 3),
+    ('1<<4', 16, 7, 3),
+    ('256>>2', 64, 7, 3),
+    ('5&3', 1, 7, 3),
+    ('5|3', 7, 7, 3),
+    ('5^3', 6, 7, 3),
+    ('~5', -6, 7, 3),
+    ('!0', 1, 7, 3),
+    ('!5', 0, 7, 3),
+    ('3>2', 1, 7, 3),
+    ('3<2', 0, 7, 3),
+    ('2<=2', 1, 7, 3),
+    ('2>=3', 0, 7, 3),
+    ('1==1', 1, 7, 3),
+    ('1!=1', 0, 7, 3),
+    ('1&&0', 0, 7, 3),
+    ('1||0', 1, 7, 3),
+    ('0?4:5', 5, 7, 3),
+    ('1?4:5', 4, 7, 3),
+    ('1,2', 2, 7, 3),
+    ('x=5', 5, 5, 3),
+    ('x+=3', 10, 10, 3),
+    ('x-=2', 5, 5, 3),
+    ('x*=4', 28, 28, 3),
+    ('x/=2', 3, 3, 3),
+    ('x%=3', 1, 1, 3),
+    ('x<<=2', 28, 28, 3),
+    ('x>>=1', 3, 3, 3),
+    ('x&=6', 6, 6, 3),
+    ('x|=9', 15, 15, 3),
+    ('x^=5', 2, 2, 3),
+    ('x++', 7, 8, 3),
+    ('x--', 7, 6, 3),
+    ('++x', 8, 8, 3),
+    ('--x', 6, 6, 3),
+    ('x++ + x', 15, 8, 3),
+    ('y=x=3', 3, 3, 3),
+    ('x*y', 21, 7, 3),
+    ('z', 0, 7, 3),
+    ('z+1', 1, 7, 3),
+    ('n', 8, 7, 3),
+    ('n+1', 9, 7, 3),
+    ('-x', -7, 7, 3),
+    ('+x', 7, 7, 3),
+    ('0x1f', 31, 7, 3),
+    ('010', 8, 7, 3),
+    ('2#101', 5, 7, 3),
+    ('16#ff', 255, 7, 3),
+    ('9223372036854775807+1', -9223372036854775808, 7, 3),
+    ('(x=2)+(x*=3)', 8, 6, 3),
+]
+
+
+def evaluate(expression):
+    variables = {"x": "7", "y": "3", "n": "x+1"}
+    value = evaluate_expression(expression, variables)
+    return value, int(variables["x"]), int(variables["y"])
+
+
+@pytest.mark.parametrize("expression, value, x_value, y_value",
+                         EXPRESSION_CASES)
+def test_expression(expression, value, x_value, y_value):
+    assert evaluate(expression) == (value, x_value, y_value)
+
+
+@pytest.mark.skipif(not which("bash"), reason="bash isn't installed")
+def test_expressions_match_bash():
+    script = "".join('x=7; y=3; n=x+1; echo "$(( %s )) $x $y"\n' % expression
+                     for expression, _, _, _ in EXPRESSION_CASES)
+    output_list = run(["bash", "-c", script], capture_output=True,
+                      text=True).stdout.splitlines()
+    assert output_list == ["%d %d %d" % evaluate(expression)
+                           for expression, _, _, _ in EXPRESSION_CASES]
+
+
+@pytest.mark.parametrize("expression", ["1/0", "5%0", "1+", "x=", "2#9",
+                                        "(1", "1 2"])
+def test_invalid_expression(expression):
+    with pytest.raises(ArithmeticExpressionError):
+        evaluate(expression)
+
+
+@pytest.mark.parametrize("command_line, expected_output", [
+    ("let x=3 y=x*2; echo $x $y", "3 6\n"),
+    ("let 0 || echo false", "false\n"),
+    ("x=4; ((x*=2)); echo $x", "8\n"),
+    ("((0)) || echo false; ((2)) && echo true", "false\ntrue\n"),
+    ("x=1; echo $((x++)) $((x++)) $x", "1 2 3\n"),
+    ("echo $(( $(echo 6) * 7 ))", "42\n"),
+    ("X=5; echo \"$(( X > 3 ? X : 0 ))\"", "5\n"),
+])
+def test_arithmetic_in_shell(run_shell, command_line, expected_output):
+    assert run_shell(command_line) == expected_output
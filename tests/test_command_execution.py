@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+import pytest
+
+
+@pytest.mark.parametrize("command_line, expected_output", [
+    ("X=1 cd /; echo $PWD", "/\n"),
+    ("X=1 export Y=2; echo $Y", "2\n"),
+    ("X=1 let Z=5; echo $Z", "5\n"),
+    ("X=0; X=1 let Z=X+4; echo $Z $X", "5 0\n"),
+    ("X=1 true; echo ${X-unset}", "unset\n"),
+    ("X=a; X=b echo $X; echo $X", "a\na\n"),
+])
+def test_builtin_prefix_assignment(run_shell, command_line, expected_output):
+    assert run_shell(command_line) == expected_output
+
+
+@pytest.mark.parametrize("command_line, expected_output", [
+    ("x=1; y=$(echo $((x+=5))); echo $x $y", "1 6\n"),
+    ("y=$(echo ${Q=set}); echo ${Q-unset} $y", "unset set\n"),
+    ("y=`echo $((z=3))`; echo ${z-unset} $y", "unset 3\n"),
+    ("x=1; echo $(( $(echo $((x+=1))) + x ))", "3\n"),
+    ("x=1; echo $(echo a; echo $((x*=4))) $x", "a 4 1\n"),
+])
+def test_substitution_keeps_variables(run_shell, command_line,
+                                      expected_output):
+    assert run_shell(command_line) == expected_output
+
+
+@pytest.mark.parametrize("command_line, expected_output", [
+    ("printf 'a\\nb\\n' > list; parallel -k echo x < list", "x a\nx b\n"),
+    ("printf 'a\\nb\\n' > list; X=1 parallel -k echo x < list",
+     "x a\nx b\n"),
+    ("parallel -k echo x <<END\nc\nd\nEND", "x c\nx d\n"),
+    ("printf 'e\\n' | parallel -k echo x", "x e\n"),
+])
+def test_parallel_reads_redirected_input(run_shell, command_line,
+                                         expected_output):
+    assert run_shell(command_line) == expected_output
+
+
+@pytest.mark.parametrize("command_line, expected_output", [
+    ("echo a # b\necho c#d", "a\nc#d\n"),
+    ("( exit 4 ); echo status", "status\n"),
+    ("echo before; exit 3; echo never", "before\n"),
+])
+def test_script_output(run_shell, command_line, expected_output):
+    assert run_shell(command_line) == expected_output
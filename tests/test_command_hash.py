@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+from command_hash import Command_Hash
+from os import chmod, utime
+import pytest
+
+
+def create_command(directory, command_name, output="", mtime=None):
+    """
+    Create an executable script in a directory. The modification time of the
+    directory is set explicitly because file system timestamps are too coarse
+    to tell two changes in a row apart.
+    """
+    command_path = directory / command_name
+    command_path.write_text("#!/bin/sh\necho %s\n" % output)
+    chmod(str(command_path), 0o755)
+    if mtime is not None:
+        utime(str(directory), (mtime, mtime))
+    return str(command_path)
+
+
+@pytest.fixture
+def directories(tmp_path):
+    first_directory = tmp_path / "first"
+    second_directory = tmp_path / "second"
+    first_directory.mkdir()
+    second_directory.mkdir()
+    return first_directory, second_directory
+
+
+@pytest.fixture
+def command_hash():
+    command_hash = Command_Hash()
+    # Check the directories on every lookup
+    command_hash.check_interval = 0
+    return command_hash
+
+
+def test_find_remembers_commands(directories, command_hash):
+    first_directory, second_directory = directories
+    path_string = "%s:%s" % directories
+    command_path = create_command(second_directory, "tool")
+    assert command_hash.find("tool", path_string) == command_path
+    assert command_hash.find("tool", path_string) == command_path
+    assert command_hash.find("missing", path_string) is None
+    assert command_hash.get_table() == [(2, command_path)]
+
+
+def test_path_change_empties_table(directories, command_hash):
+    first_directory, second_directory = directories
+    first_path = create_command(first_directory, "tool")
+    second_path = create_command(second_directory, "tool")
+    assert command_hash.find("tool", str(first_directory)) == first_path
+    assert command_hash.find("tool", str(second_directory)) == second_path
+    assert command_hash.get_table() == [(1, second_path)]
+    assert command_hash.find("tool", "") is None
+    assert command_hash.get_table() == []
+
+
+def test_new_command_in_earlier_directory(directories, command_hash):
+    first_directory, second_directory = directories
+    path_string = "%s:%s" % directories
+    utime(str(first_directory), (1000, 1000))
+    second_path = create_command(second_directory, "tool")
+    assert command_hash.find("tool", path_string) == second_path
+    first_path = create_command(first_directory, "tool", mtime=2000)
+    assert command_hash.find("tool", path_string) == first_path
+
+
+def test_removed_command_is_forgotten(directories, command_hash):
+    first_directory, second_directory = directories
+    command_path = create_command(first_directory, "tool", mtime=1000)
+    assert command_hash.find("tool", str(first_directory)) == command_path
+    (first_directory / "tool").unlink()
+    utime(str(first_directory), (2000, 2000))
+    assert command_hash.find("tool", str(first_directory)) is None
+
+
+def test_directories_checked_after_interval(directories):
+    first_directory, second_directory = directories
+    path_string = "%s:%s" % directories
+    command_hash = Command_Hash()
+    command_hash.check_interval = 3600
+    utime(str(first_directory), (1000, 1000))
+    second_path = create_command(second_directory, "tool")
+    assert command_hash.find("tool", path_string) == second_path
+    create_command(first_directory, "tool", mtime=2000)
+    assert command_hash.find("tool", path_string) == second_path
+
+
+def test_relative_directory_not_remembered(tmp_path, command_hash,
+                                           monkeypatch):
+    monkeypatch.chdir(str(tmp_path))
+    create_command(tmp_path, "tool")
+    assert command_hash.find("tool", ":") == "./tool"
+    assert command_hash.get_table() == []
+
+
+def test_add_and_clear(directories, command_hash):
+    first_directory, second_directory = directories
+    command_path = create_command(first_directory, "tool")
+    assert command_hash.add("tool", str(first_directory)) == command_path
+    assert command_hash.add("missing", str(first_directory)) is None
+    assert command_hash.get_table() == [(0, command_path)]
+    command_hash.clear()
+    assert command_hash.get_table() == []
+
+
+@pytest.mark.parametrize("command_line, expected_output", [
+    ("PATH={0}/first; tool; PATH={0}/second; tool", "first\nsecond\n"),
+    ("export PATH={0}/first; tool; export PATH={0}/second; tool",
+     "first\nsecond\n"),
+    ("PATH={0}/first; tool; unset PATH; tool",
+     "first\nintek-sh: tool: command not found\n"),
+    ("PATH={0}/first; tool; hash -r; hash", "first\nhash: hash table empty\n"),
+    ("PATH={0}/second; hash tool nothing; hash",
+     "intek-sh: hash: nothing: not found\nhits\tcommand\n"
+     "   0\t{0}/second/tool\n"),
+])
+def test_hash_in_shell(run_shell, tmp_path, command_line, expected_output):
+    for directory_name in ("first", "second"):
+        directory = tmp_path / directory_name
+        directory.mkdir()
+        create_command(directory, "tool", directory_name)
+    assert (run_shell(command_line.format(tmp_path))
+            == expected_output.format(tmp_path))
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+from naive_lexer import get_token_list
+from command_splitting import get_command_list_single_pass
+from benchmark import generate_parser_line, get_parser_mismatch
+from exception import UnexpectedTokenError
+from utility import set_continuation_reader
+from random import Random
+import pytest
+
+
+def describe(input_string):
+    """
+    Parse a command line with the single-pass parser and describe its
+    commands
+    """
+    return [str(command) for command in
+            get_command_list_single_pass(get_token_list(input_string)[0])]
+
+
+def read_end_of_file():
+    raise EOFError
+
+
+@pytest.fixture(autouse=True)
+def no_continuation_line():
+    """
+    Make an incomplete command line reach the end of the input instead of
+    asking for more
+    """
+    previous_reader = set_continuation_reader(read_end_of_file)
+    yield
+    set_continuation_reader(previous_reader)
+
+
+@pytest.mark.parametrize("input_string, unexpected_token", [
+    ("| echo a", "|"),
+    ("echo a | | echo b", "|"),
+    ("echo a |  | echo b", "|"),
+    ("echo a && ; echo b", ";"),
+    ("echo a || && echo b", "&&"),
+    ("echo a & & echo b", "&"),
+    ("echo a & ; echo b", ";"),
+    ("echo a; ; echo b", ";"),
+    ("; echo a", ";"),
+    ("  & echo a", "&"),
+    ("&", "&"),
+    ("echo a | && echo b", "&&"),
+])
+def test_empty_command_is_rejected(input_string, unexpected_token):
+    with pytest.raises(UnexpectedTokenError) as error:
+        describe(input_string)
+    assert error.value.args[0] == unexpected_token
+
+
+@pytest.mark.parametrize("input_string", [
+    "echo a |", "echo a | ", "echo a &&", "echo a || "
+])
+def test_unfinished_command_asks_for_more_input(input_string):
+    with pytest.raises(EOFError):
+        describe(input_string)
+
+
+def test_unfinished_pipe_is_continued():
+    set_continuation_reader(lambda: "wc -c")
+    assert describe("echo a |") == describe("echo a |wc -c")
+
+
+@pytest.mark.parametrize("input_string, description", [
+    ("echo a", ["Command(TOKEN = (Word(echo), Seperator( ), Word(a)),"
+                " STDIN = (None), STDOUT = (None))"]),
+    ("echo a | wc -c", ["Pipe(Command(TOKEN = (Word(echo), Seperator( ),"
+                        " Word(a), Seperator( )), STDIN = (None),"
+                        " STDOUT = (None)), Command(TOKEN = (Seperator( ),"
+                        " Word(wc), Seperator( ), Word(-c)), STDIN = (None),"
+                        " STDOUT = (None)))"]),
+    ("a && b", ["And(Command(TOKEN = (Word(a), Seperator( )), STDIN = (None),"
+                " STDOUT = (None)), Command(TOKEN = (Seperator( ), Word(b)),"
+                " STDIN = (None), STDOUT = (None)))"]),
+    ("a &", ["Background(Command(TOKEN = (Word(a), Seperator( )),"
+             " STDIN = (None), STDOUT = (None)))"]),
+    ("a;", ["Command(TOKEN = (Word(a)), STDIN = (None), STDOUT = (None))"]),
+    ("a; ", ["Command(TOKEN = (Word(a)), STDIN = (None), STDOUT = (None))"]),
+    ("  ", []),
+    ("> out", ["Command(TOKEN = (), STDIN = (None),"
+               " STDOUT = (Operator(>), Word(out)))"]),
+])
+def test_command_list(input_string, description):
+    assert describe(input_string) == description
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_parsers_agree(seed):
+    """
+    The single-pass parser builds the same commands as the multi-pass
+    parser, from a token list and from a token stream, on the random command
+    lines of benchmark.py check-parser
+    """
+    random = Random(seed)
+    mismatch_list = [get_parser_mismatch(generate_parser_line(random))
+                     for _ in range(500)]
+    assert [mismatch for mismatch in mismatch_list if mismatch] == []
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+from fast_builtins import Test_Expression, Test_Error, format_printf,\
+                          interpret_escapes, FORMAT_ESCAPE_PATTERN
+from os import chmod, symlink, utime
+from shutil import which
+from subprocess import run
+import pytest
+
+
+# Arguments of the test builtin with the exit status bash gives, run in a
+# directory made by the files fixture
+TEST_CASES = [
+    ([], 1),
+    ([""], 1),
+    (["a"], 0),
+    (["-n"], 0),
+    (["!"], 0),
+    (["!", ""], 0),
+    (["-z", ""], 0),
+    (["-n", ""], 1),
+    (["-n", "a"], 0),
+    (["a", "=", "a"], 0),
+    (["a", "==", "b"], 1),
+    (["a", "!=", "b"], 0),
+    (["abc", "<", "abd"], 0),
+    (["b", ">", "a"], 0),
+    (["10", "-eq", "10"], 0),
+    (["9", "-lt", "10"], 0),
+    (["-3", "-gt", "-4"], 0),
+    ([" 5", "-ge", "5 "], 0),
+    (["5", "-le", "4"], 1),
+    (["2", "-ne", "2"], 1),
+    (["!", "a", "=", "b"], 0),
+    (["(", "a", ")"], 0),
+    (["(", "-z", "a", ")"], 1),
+    (["a", "-a", ""], 1),
+    (["a", "-o", ""], 0),
+    (["", "-o", "", "-o", "x"], 0),
+    (["a", "-a", "b", "-o", ""], 0),
+    (["!", "", "-a", "x"], 0),
+    (["(", "a", "=", "b", ")", "-o", "c", "=", "c"], 0),
+    (["!", "(", "1", "-eq", "2", ")"], 0),
+    (["=", "=", "="], 0),
+    (["-f", "file"], 0),
+    (["-f", "dir"], 1),
+    (["-d", "dir"], 0),
+    (["-e", "missing"], 1),
+    (["-s", "empty"], 1),
+    (["-s", "file"], 0),
+    (["-x", "file"], 0),
+    (["-r", "missing"], 1),
+    (["-L", "link"], 0),
+    (["-h", "file"], 1),
+    (["-f", "link"], 0),
+    (["file", "-nt", "old"], 0),
+    (["old", "-nt", "file"], 1),
+    (["old", "-ot", "file"], 0),
+    (["file", "-nt", "missing"], 0),
+    (["missing", "-ot", "file"], 0),
+    (["file", "-ef", "link"], 0),
+    (["file", "-ef", "old"], 1),
+    (["-t", "99"], 1),
+    (["-z", "-n", "x"], 2),
+    (["1", "-eq", "a"], 2),
+    (["a", "b"], 2),
+    (["a", "b", "c"], 2),
+    (["(", "a"], 2),
+    (["a", "=", "a", "b"], 2),
+]
+# Arguments of printf with the output and the error messages of bash
+PRINTF_CASES = [
+    (["%s\n", "a"], "a\n", []),
+    (["%s-%s\n", "a", "b", "c"], "a-b\nc-\n", []),
+    (["%d %d\n", "1"], "1 0\n", []),
+    (["%5s|%-5s|\n", "ab", "cd"], "   ab|cd   |\n", []),
+    (["%.2s\n", "abcdef"], "ab\n", []),
+    (["%05d\n", "42"], "00042\n", []),
+    (["%+d % d\n", "3", "3"], "+3  3\n", []),
+    (["%x %X %o\n", "255", "255", "8"], "ff FF 10\n", []),
+    (["%#x %#o\n", "255", "8"], "0xff 010\n", []),
+    (["%d\n", "0x1f"], "31\n", []),
+    (["%d\n", "010"], "8\n", []),
+    (["%d\n", "'A"], "65\n", []),
+    (["%d\n", "-12"], "-12\n", []),
+    (["%u\n", "7"], "7\n", []),
+    (["%i\n", "9"], "9\n", []),
+    (["%.3f\n", "3.14159"], "3.142\n", []),
+    (["%e\n", "12345"], "1.234500e+04\n", []),
+    (["%g\n", "0.0001"], "0.0001\n", []),
+    (["%8.2f|\n", "2.5"], "    2.50|\n", []),
+    (["%c%c\n", "hello", "x"], "hx\n", []),
+    (["%b\n", "a\\tb"], "a\tb\n", []),
+    (["%b|\n", "a\\cb"], "a", []),
+    (["%s\n", "a\\tb"], "a\\tb\n", []),
+    (["a\\tb\\n"], "a\tb\n", []),
+    (["\\101\\x42\\n"], "AB\n", []),
+    (["100%%\n"], "100%\n", []),
+    (["%*d|\n", "5", "3"], "    3|\n", []),
+    (["%.*f\n", "1", "2.25"], "2.2\n", []),
+    (["no newline"], "no newline", []),
+    (["%s %s\n"], " \n", []),
+    (["%d\n", ""], "0\n", []),
+    (["x\\cy\n"], "x\\cy\n", []),
+    (["%x %u\n", "-1", "-1"], "ffffffffffffffff 18446744073709551615\n", []),
+    (["%o\n", "-8"], "1777777777777777777770\n", []),
+    (["%X\n", "-255"], "FFFFFFFFFFFFFF01\n", []),
+    (["%d\n", "-0x10"], "-16\n", []),
+    (["%#5o|%-#5o|\n", "8", "8"], "  010|010  |\n", []),
+    (["%#05o|%#.3o|%#o\n", "8", "8", "0"], "00010|010|0\n", []),
+    (["%.3d\n", "5"], "005\n", []),
+    (["%d %d\n", " 12", "+5"], "12 5\n", []),
+    (["%f %f\n", "inf", "-2"], "inf -2.000000\n", []),
+    (["a\\0101\n"], "a\x081\n", []),
+    (["\\x41\\e[0m\n"], "A\x1b[0m\n", []),
+    (["%b\n", "a\\0101b\\101"], "aAbA\n", []),
+    (["%b %b\n", "\\0", "x"], "\x00 x\n", []),
+    (["%s\\c%s\n", "a", "b"], "a\\cb\n", []),
+    (["%d\n", "abc"], "0\n", ["abc: invalid number"]),
+    (["%d %d\n", "1", "2x"], "1 2\n", ["2x: invalid number"]),
+    (["%f\n", "pi"], "0.000000\n", ["pi: invalid number"]),
+    (["%d\n", "3x"], "3\n", ["3x: invalid number"]),
+    (["%f\n", "3.5x"], "3.500000\n", ["3.5x: invalid number"]),
+    (["%d\n", "09"], "0\n", ["09: invalid octal number"]),
+    (["%d\n", "0x"], "0\n", ["0x: invalid hex number"]),
+    (["%d\n", "12 "], "12\n", ["12 : invalid number"]),
+    (["%d\n", "--1"], "0\n", ["--1: invalid number"]),
+    (["%e\n", "1e3x"], "1.000000e+03\n", ["1e3x: invalid number"]),
+    (["%x\n", "0x1g"], "1\n", ["0x1g: invalid hex number"]),
+    (["%d\n", " "], "0\n", [" : invalid number"]),
+]
+requires_bash = pytest.mark.skipif(not which("bash"),
+                                   reason="bash isn't installed")
+
+
+@pytest.fixture
+def files(tmp_path, monkeypatch):
+    """
+    Create an empty file, a non-empty executable file, a directory, a
+    symbolic link and an old file in the current directory
+    """
+    monkeypatch.chdir(str(tmp_path))
+    (tmp_path / "empty").write_text("")
+    (tmp_path / "file").write_text("x\n")
+    chmod("file", 0o755)
+    (tmp_path / "dir").mkdir()
+    symlink("file", "link")
+    (tmp_path / "old").write_text("")
+    utime("old", (946684800, 946684800))
+
+
+def get_test_status(argument_list):
+    try:
+        return 0 if Test_Expression(list(argument_list)).evaluate() else 1
+    except Test_Error:
+        return 2
+
+
+def format_arguments(argument_list):
+    format_string = interpret_escapes(argument_list[0],
+                                      FORMAT_ESCAPE_PATTERN)[0]
+    string, error_list = format_printf(format_string, argument_list[1:])
+    return string, [error[len("intek-sh: printf: "):] for error in error_list]
+
+
+@pytest.mark.parametrize("argument_list, exit_code", TEST_CASES)
+def test_expression(files, argument_list, exit_code):
+    assert get_test_status(argument_list) == exit_code
+
+
+@requires_bash
+def test_expressions_match_bash(files):
+    for argument_list, _ in TEST_CASES:
+        bash_status = run(["bash", "-c", "test \"$@\"", "_"] + argument_list,
+                          capture_output=True).returncode
+        assert get_test_status(argument_list) == bash_status, argument_list
+
+
+def test_expression_error_message():
+    with pytest.raises(Test_Error) as error:
+        Test_Expression(["1", "-eq", "a"]).evaluate()
+    assert error.value.message == "a: integer expression expected"
+
+
+@pytest.mark.parametrize("argument_list, expected_output, expected_errors",
+                         PRINTF_CASES)
+def test_printf(argument_list, expected_output, expected_errors):
+    assert format_arguments(argument_list) == (expected_output,
+                                               expected_errors)
+
+
+@requires_bash
+def test_printf_matches_bash():
+    for argument_list, _, _ in PRINTF_CASES:
+        result = run(["bash", "-c", "printf \"$@\"", "_"] + argument_list,
+                     capture_output=True, text=True)
+        bash_errors = [line.split(": printf: ", 1)[1]
+                       for line in result.stderr.splitlines()]
+        assert (format_arguments(argument_list) ==
+                (result.stdout, bash_errors)), argument_list
+
+
+@pytest.mark.parametrize("command_line, expected_output", [
+    ("test a = a && echo yes; test a = b || echo no", "yes\nno\n"),
+    ("[ -d . ] && [ ! -f . ] && echo directory", "directory\n"),
+    ("[ a = a", "intek-sh: [: missing `]'\n"),
+    ("[ 1 -eq a ] || echo false",
+     "intek-sh: [: a: integer expression expected\nfalse\n"),
+    ("x=; [ -z \"$x\" ] && echo empty", "empty\n"),
+    ("printf '%s=%d\\n' a 1 b 2", "a=1\nb=2\n"),
+    ("printf '%d\\n' 3x || echo failed",
+     "3\nintek-sh: printf: 3x: invalid number\nfailed\n"),
+    ("printf", "printf: usage: printf format [arguments]\n"),
+    ("printf '%s\\n' a b | cat", "a\nb\n"),
+    ("echo -e 'a\\tb\\0101\\101'", "a\tbA\\101\n"),
+    ("echo -e 'a\\cb'; echo -n c; echo", "ac\n"),
+    ("echo -neE 'a\\tb'; echo", "a\\tb\n"),
+    ("echo -x a", "-x a\n"),
+])
+def test_builtins_in_shell(run_shell, command_line, expected_output):
+    assert run_shell(command_line) == expected_output
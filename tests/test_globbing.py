@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+import globbing as globbing_module
+from globbing import globbing, iterate_globbing, directory_cache
+from os import utime
+from shutil import which
+from subprocess import run
+import pytest
+
+
+# Patterns with the words bash gives in the directory made by the tree
+# fixture, with dotglob off and the dot entries kept
+GLOB_CASES = [
+    ("*.py", ["a.py", "b.py"]),
+    ("*", ["a.py", "b.py", "c.txt", "docs", "empty", "sp ace", "src"]),
+    (".*", [".", "..", ".git", ".hidden"]),
+    ("*/", ["docs/", "empty/", "src/"]),
+    (".*/", ["../", "./", ".git/"]),
+    ("src/*.py", ["src/main.py", "src/util.py"]),
+    ("*/*.py", ["src/main.py", "src/util.py"]),
+    ("*/*/*.py", ["src/lib/x.py"]),
+    ("src/*/", ["src/lib/"]),
+    ("s*/l*/x.py", ["src/lib/x.py"]),
+    ("src/lib/../*.py", ["src/lib/../main.py", "src/lib/../util.py"]),
+    ("./*.txt", ["./c.txt"]),
+    ("?.py", ["a.py", "b.py"]),
+    ("[ab].py", ["a.py", "b.py"]),
+    ("[!a].py", ["b.py"]),
+    ("*.[pt]*", ["a.py", "b.py", "c.txt"]),
+    ("sp*", ["sp ace"]),
+    ("nothing*", ["nothing*"]),
+    ("src/nothing/*", ["src/nothing/*"]),
+    ("empty/*", ["empty/*"]),
+    ("a.py/*", ["a.py/*"]),
+    ("c.txt", ["c.txt"]),
+]
+
+
+@pytest.fixture
+def tree(tmp_path, monkeypatch):
+    """
+    Create a directory tree and make it the current directory
+    """
+    monkeypatch.chdir(str(tmp_path))
+    for directory in ("src/lib", "docs", ".git", "empty"):
+        (tmp_path / directory).mkdir(parents=True)
+    for path in ("a.py", "b.py", "c.txt", ".hidden", "src/main.py",
+                 "src/util.py", "src/lib/x.py", "docs/readme.md", "sp ace"):
+        (tmp_path / path).write_text("")
+    directory_cache.clear()
+    return tmp_path
+
+
+@pytest.mark.parametrize("pattern, expected_list", GLOB_CASES)
+def test_globbing(tree, pattern, expected_list):
+    assert globbing(pattern) == expected_list
+
+
+@pytest.mark.skipif(not which("bash"), reason="bash isn't installed")
+def test_globbing_matches_bash(tree):
+    # Bash 5.2 skips the dot entries by default, the shell doesn't
+    script = ("shopt -u globskipdots 2> /dev/null\n"
+              'for pattern; do for word in $pattern; do echo "$word"; done; '
+              "echo; done")
+    pattern_list = [pattern for pattern, _ in GLOB_CASES if " " not in pattern]
+    output = run(["bash", "-c", script, "_"] + pattern_list,
+                 capture_output=True, text=True,
+                 env={"LC_ALL": "C", "PATH": "/usr/bin:/bin"}).stdout
+    expected_output = "".join("".join(word + "\n"
+                                      for word in globbing(pattern)) + "\n"
+                              for pattern in pattern_list)
+    assert output == expected_output
+
+
+def test_absolute_pattern(tree):
+    assert globbing(str(tree) + "/src/*.py") == [str(tree) + "/src/main.py",
+                                                 str(tree) + "/src/util.py"]
+
+
+def test_iterate_without_sorting(tree):
+    assert sorted(iterate_globbing("*/*.py")) == ["src/main.py",
+                                                  "src/util.py"]
+
+
+def test_listing_is_reused(tree, monkeypatch):
+    scanned_list = []
+    original_scandir = globbing_module.scandir
+
+    def counting_scandir(path):
+        scanned_list.append(path)
+        return original_scandir(path)
+
+    monkeypatch.setattr(globbing_module, "scandir", counting_scandir)
+    assert globbing("*.py") == ["a.py", "b.py"]
+    assert globbing("*.txt") == ["c.txt"]
+    assert globbing("?.py") == ["a.py", "b.py"]
+    assert scanned_list == ["."]
+
+
+def test_modified_directory_is_read_again(tree):
+    utime(str(tree), (1000, 1000))
+    assert globbing("*.py") == ["a.py", "b.py"]
+    (tree / "d.py").write_text("")
+    utime(str(tree), (2000, 2000))
+    assert globbing("*.py") == ["a.py", "b.py", "d.py"]
+
+
+def test_other_directory_with_same_path(tree, monkeypatch):
+    utime(str(tree / "src"), (1000, 1000))
+    utime(str(tree / "docs"), (1000, 1000))
+    monkeypatch.chdir(str(tree / "src"))
+    assert globbing("*") == ["lib", "main.py", "util.py"]
+    monkeypatch.chdir(str(tree / "docs"))
+    assert globbing("*") == ["readme.md"]
+
+
+@pytest.mark.parametrize("command_line, expected_output", [
+    ("echo *.py src/*", "a.py b.py src/lib src/main.py src/util.py\n"),
+    ("echo nothing*", "nothing*\n"),
+    ("echo '*.py' \"*.txt\"", "*.py *.txt\n"),
+    ("cd src; echo *; cd ..; echo *.txt", "lib main.py util.py\nc.txt\n"),
+])
+def test_globbing_in_shell(run_shell, tree, command_line, expected_output):
+    assert run_shell(command_line) == expected_output
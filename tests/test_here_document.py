@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+from token_definition import Here_Document_Token
+from expansion_plan import compile_here_document
+from shell import Shell
+import pytest
+
+
+def expand_body(line_list, is_expanded=True):
+    """
+    Expand the body of a here-document in a shell where X is set to v
+    """
+    part = compile_here_document(
+        Here_Document_Token(line_list, "END", is_expanded)
+    )
+    if part is None:
+        return "".join(line_list)
+    return part if isinstance(part, str) else part(Shell({"X": "v"}))
+
+
+@pytest.mark.parametrize("line, expected_line", [
+    ("$X ${X} end\n", "v v end\n"),
+    ("${Y:-default} ${X:+set} ${Y=assigned}\n", "default set assigned\n"),
+    ("${X#v}a ${X%%*}b ${X:-d}\n", "a b v\n"),
+    ("$(echo hi) $(echo $X)\n", "hi v\n"),
+    ("`echo bq` `echo \\$X`\n", "bq v\n"),
+    ("$((1+1)) $((X == 0)) $(( $(echo 3) * 2 ))\n", "2 1 6\n"),
+    ("$(echo hi) $((1+1)) ${X:-d} $X\n", "hi 2 v v\n"),
+    ("\"$X\" '$X'\n", "\"v\" 'v'\n"),
+    ("\\$X \\`x\\` \\\\ \\\" \\a\n", "$X `x` \\ \\\" \\a\n"),
+])
+def test_expanded_body(line, expected_line):
+    assert expand_body([line]) == expected_line
+
+
+def test_escaped_newline_joins_lines():
+    assert expand_body(["a \\\n", "b $X\n"]) == "a b v\n"
+
+
+def test_quoted_delimiter_keeps_body():
+    line_list = ["$X $(echo no) `echo no` $((1+1)) \\$\n"]
+    assert compile_here_document(
+        Here_Document_Token(line_list, "END", False)
+    ) is None
+    assert expand_body(line_list, False) == line_list[0]
+
+
+def test_plain_body_is_not_compiled():
+    assert compile_here_document(
+        Here_Document_Token(["plain \"text\"\n"], "END", True)
+    ) is None
+
+
+@pytest.mark.parametrize("command_line, expected_output", [
+    ("X=v\ncat <<- EOF\n\ta $X\n\tEOF\necho after", "a v\nafter\n"),
+    ("cat <<-EOF\n\tb\n\tEOF\necho after", "b\nafter\n"),
+    ("cat <<- 'E' | tr a-z A-Z\n\tc $X\n\tE\necho after", "C $X\nafter\n"),
+    ("cat <<EOF\n\td\nEOF\necho after", "\td\nafter\n"),
+])
+def test_strip_tabs_operator(run_shell, command_line, expected_output):
+    assert run_shell(command_line) == expected_output
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+from history_store import History_Store
+import pytest
+
+
+def create_history(command_list, **keyword_arguments):
+    history = History_Store(**keyword_arguments)
+    for command in command_list:
+        history.add_command(command)
+    return history
+
+
+@pytest.mark.parametrize("search_string, expected_command", [
+    ("e", "echo bye"),
+    ("echo h", "echo hello"),
+    ("ls", "ls -l"),
+    ("ls -a", "ls -a"),
+    ("echo hello", "echo hello"),
+    ("echo hello!", None),
+    ("cd", None),
+    ("", "echo bye"),
+])
+def test_search_latest_prefix(search_string, expected_command):
+    history = create_history(["ls -a", "echo hello", "ls -l", "echo bye"])
+    assert history.search(search_string) == expected_command
+
+
+def test_search_after_repeated_command():
+    history = create_history(["echo a", "echo b", "echo a"])
+    assert history.search("echo") == "echo a"
+    history.add_command("echo b")
+    assert history.search("echo") == "echo b"
+    assert history.search("echo a") == "echo a"
+
+
+def test_search_skips_dropped_commands():
+    history = create_history(["cat a", "ls", "pwd", "echo"], max_length=2)
+    assert history.get_log() == ["pwd", "echo"]
+    assert history.search("cat") is None
+    assert history.search("ls") is None
+    assert history.search("p") == "pwd"
+
+
+def test_search_after_rebuild():
+    command_list = ["echo %d" % number for number in range(20)]
+    history = create_history(command_list, max_length=3)
+    assert history.get_log() == command_list[-3:]
+    assert history.search("echo 1") == "echo 19"
+    assert history.search("echo 5") is None
+    assert history.search("echo 17") == "echo 17"
+
+
+def test_search_longer_than_indexed_prefix():
+    long_command = "echo " + "a" * 100
+    history = create_history([long_command + "b", long_command + "c",
+                              "echo"])
+    assert history.search(long_command + "b") == long_command + "b"
+    assert history.search(long_command) == long_command + "c"
+    assert history.search(long_command + "d") is None
+
+
+def test_numbered_lookup():
+    history = create_history(["a", "b", "c", "d"], max_length=3)
+    assert len(history) == 3
+    assert (history[0], history[-1]) == ("b", "d")
+    with pytest.raises(IndexError):
+        history[3]
+
+
+def test_load_and_append(tmp_path):
+    history_file = tmp_path / "history"
+    history_file.write_text("ls\necho old\n")
+    history = History_Store(str(history_file))
+    history.load()
+    history.append("echo new")
+    assert history.search("echo") == "echo new"
+    assert history_file.read_text() == "ls\necho old\necho new\n"
+    reloaded_history = History_Store(str(history_file))
+    reloaded_history.load()
+    assert reloaded_history.get_log() == ["ls", "echo old", "echo new"]
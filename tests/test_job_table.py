@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+from job_table import Job, Job_Table
+from os import posix_spawn, environ, kill
+from signal import SIGSTOP
+import pytest
+
+
+def start_process(script):
+    """
+    Start a shell script in a child process of its own process group, as
+    the processes of a job are, and get its process id
+    """
+    return posix_spawn("/bin/sh", ["sh", "-c", script], environ,
+                       setpgroup=0)
+
+
+@pytest.fixture
+def jobs():
+    jobs = Job_Table()
+    yield jobs
+    # Don't leave running children behind
+    for job in jobs:
+        for process_id in job.running_set:
+            kill(process_id, 9)
+        job.wait()
+
+
+def test_exit_code_of_last_process(jobs):
+    job = jobs.add([start_process("exit 3"), start_process("exit 0")],
+                   "false | true")
+    assert job.wait() == 0
+    assert job.state == Job.DONE
+    job = jobs.add([start_process("exit 0"), start_process("exit 3")],
+                   "true | false")
+    assert job.wait() == 3
+    assert str(job) == "Exit 3                  true | false"
+
+
+def test_killed_job_exit_code(jobs):
+    job = jobs.add([start_process("kill -TERM $$")], "kill")
+    assert job.wait() == 143
+
+
+def test_stopped_job(jobs):
+    job = jobs.add([start_process("sleep 0.2")], "sleep 0.2")
+    kill(job.process_group, SIGSTOP)
+    assert job.wait(until_stopped=True) == 147
+    assert str(job) == "Stopped                 sleep 0.2"
+    job.resume()
+    assert str(job) == "Running                 sleep 0.2 &"
+    assert job.wait() == 0
+
+
+def test_reap_removes_finished_jobs(jobs):
+    running_job = jobs.add([start_process("sleep 5")], "sleep 5")
+    done_job = jobs.add([start_process("exit 0")], "true")
+    done_job.wait()
+    assert jobs.reap() == [done_job]
+    assert list(jobs) == [running_job]
+    assert running_job.state == Job.RUNNING
+
+
+def test_signal_driven_reap(jobs):
+    jobs.is_signal_driven = True
+    job = jobs.add([start_process("exit 0")], "true")
+    job.wait()
+    job.state = Job.RUNNING
+    # Nothing is polled until a SIGCHLD has been received
+    assert jobs.reap() == []
+    jobs.handle_child_signal(None, None)
+    assert jobs.reap() == [job]
+    assert not jobs.child_signal_received
+
+
+def test_find_and_markers(jobs):
+    first_job = jobs.add([start_process("exit 0")], "sleep 1")
+    second_job = jobs.add([start_process("exit 0")], "cat file")
+    third_job = jobs.add([start_process("exit 0")], "sleep 2")
+    assert jobs.find() is third_job
+    assert jobs.find("%+") is jobs.find("%%") is third_job
+    assert jobs.find("%-") is second_job
+    assert jobs.find("%1") is first_job
+    assert jobs.find("%sleep") is third_job
+    assert jobs.find("%cat") is second_job
+    assert jobs.find(str(second_job.process_group)) is second_job
+    assert jobs.find("%4") is None
+    assert [jobs.get_marker(job) for job in jobs] == [" ", "-", "+"]
+    jobs.remove(third_job)
+    assert jobs.add([start_process("exit 0")], "ls").number == 3
+
+
+def test_single_job_is_previous_job(jobs):
+    job = jobs.add([start_process("exit 0")], "true")
+    assert jobs.find("%-") is job
+    assert Job_Table().find("%-") is None
+
+
+@pytest.mark.parametrize("command_line, expected_output", [
+    ("echo a & wait; echo b", "a\nb\n"),
+    ("sleep 0.5 & sleep 0.5 & jobs",
+     "[1]-  Running                 sleep 0.5 &\n"
+     "[2]+  Running                 sleep 0.5 &\n"),
+    ("sleep 0.5 | cat & jobs %1; wait %1; jobs; echo end",
+     "[1]+  Running                 sleep 0.5 | cat &\nend\n"),
+    ("sleep 0.5 & sleep 0.5 & jobs %1 %3 %- || echo missing",
+     "[1]-  Running                 sleep 0.5 &\n"
+     "intek-sh: jobs: %3: no such job\n"
+     "[1]-  Running                 sleep 0.5 &\nmissing\n"),
+    ("(exit 3) & wait %1 || echo failed", "failed\n"),
+    ("false & wait && echo zero", "zero\n"),
+    ("wait %5 || echo missing",
+     "intek-sh: wait: %5: no such job\nmissing\n"),
+    ("sleep 0.2 && echo x & echo y; wait", "y\nx\n"),
+    ("echo a > f & wait; cat f", "a\n"),
+    ("fg", "intek-sh: fg: current: no such job\n"),
+])
+def test_jobs_in_shell(run_shell, command_line, expected_output):
+    assert run_shell(command_line) == expected_output
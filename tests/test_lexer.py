@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+from naive_lexer import get_token_list, check_lexer_engines
+import pytest
+
+
+def describe(input_string):
+    return [str(token) for token in get_token_list(input_string)[0]]
+
+
+@pytest.mark.parametrize("input_string, description", [
+    ("echo a # b", ["Word(echo)", "Seperator( )", "Word(a)", "Seperator( )"]),
+    ("#x", []),
+    ("a;# b", ["Word(a)", "Operator(;)"]),
+    ("a &&# b", ["Word(a)", "Seperator( )", "Operator(&&)"]),
+    ("a # b\nc", ["Word(a)", "Seperator( )", "Separator(\\n)", "Word(c)"]),
+    ("c#d", ["Word(c#d)"]),
+    ("$x#t", ["Variable(x)", "Word(#t)"]),
+    ("\"a\"#b", ["Double_Quote(Word(a))", "Word(#b)"]),
+    ("'# a'", ["Single_Quote(# a)"]),
+])
+def test_comment(input_string, description):
+    assert describe(input_string) == description
+    assert check_lexer_engines(input_string)
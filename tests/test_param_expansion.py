@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+from param_expansion import expand_parameter, compile_pattern
+from random import Random
+from shutil import which
+from subprocess import run
+import pytest
+
+
+# A value, a removal operator and a pattern with the result bash gives
+REMOVAL_CASES = [
+    ("/usr/local/bin:/usr/bin:/bin", "##", "*:", "/bin"),
+    ("/usr/local/bin:/usr/bin:/bin", "#", "*:", "/usr/bin:/bin"),
+    ("/usr/local/bin:/usr/bin:/bin", "%%", ":*", "/usr/local/bin"),
+    ("/usr/local/bin:/usr/bin:/bin", "%", ":*", "/usr/local/bin:/usr/bin"),
+    ("archive.tar.gz", "%", ".*", "archive.tar"),
+    ("archive.tar.gz", "%%", ".*", "archive"),
+    ("archive.tar.gz", "#", "*.", "tar.gz"),
+    ("archive.tar.gz", "##", "*.", "gz"),
+    ("archive.tar.gz", "#", "archive", ".tar.gz"),
+    ("archive.tar.gz", "%", "zip", "archive.tar.gz"),
+    ("abcabc", "#", "*", "abcabc"),
+    ("abcabc", "##", "*", ""),
+    ("abcabc", "%", "*", "abcabc"),
+    ("abcabc", "#", "?", "bcabc"),
+    ("abcabc", "%%", "?", "abcab"),
+    ("abcabc", "#", "[ab]", "bcabc"),
+    ("abcabc", "##", "[!c]*", ""),
+    ("abcabc", "%", "[!a]", "abcab"),
+    ("abcabc", "#", "a*c", "abc"),
+    ("abcabc", "##", "a*c", ""),
+    ("abcabc", "%", "b*", "abca"),
+    ("abcabc", "%%", "b*", "a"),
+    ("a[b", "#", "a[", "b"),
+    ("a.b", "#", "?.", "b"),
+    ("", "#", "*", ""),
+    ("a b c", "##", "* ", "c"),
+]
+
+
+@pytest.mark.parametrize("value, operator, pattern, expected_value",
+                         REMOVAL_CASES)
+def test_pattern_removal(value, operator, pattern, expected_value):
+    assert expand_parameter("v", operator, pattern,
+                            {"v": value}) == expected_value
+
+
+def generate_removal_case(random):
+    """
+    Generate a random value, removal operator and pattern
+    """
+    value = "".join(random.choice("ab/.") for _ in range(random.randint(0, 8)))
+    pattern = "".join(random.choice(["a", "b", "/", "?", "*", "*", "[ab]",
+                                     "[!a]"])
+                      for _ in range(random.randint(1, 4)))
+    return value, random.choice(["#", "##", "%", "%%"]), pattern
+
+
+@pytest.mark.skipif(not which("bash"), reason="bash isn't installed")
+def test_random_removal_matches_bash():
+    random = Random(0)
+    case_list = [generate_removal_case(random) for _ in range(500)]
+    script = "".join('v=\'%s\'; echo "<${v%s%s}>"\n' % case
+                     for case in case_list)
+    output_list = run(["bash", "-c", script], capture_output=True,
+                      text=True).stdout.splitlines()
+    assert output_list == ["<%s>" % expand_parameter("v", operator, pattern,
+                                                      {"v": value})
+                           for value, operator, pattern in case_list]
+
+
+def test_long_value_removal():
+    value = ":".join("/opt/tool%d/bin" % number for number in range(5000))
+    variables = {"PATH": value}
+    assert (expand_parameter("PATH", "##", "*:", variables) ==
+            "/opt/tool4999/bin")
+    assert (expand_parameter("PATH", "%%", ":*", variables) ==
+            "/opt/tool0/bin")
+    assert expand_parameter("PATH", "#", "*:",
+                            variables) == value[len("/opt/tool0/bin:"):]
+
+
+def test_compiled_pattern_is_cached():
+    compile_pattern.cache_clear()
+    for _ in range(3):
+        expand_parameter("v", "##", "*.", {"v": "a.b.c"})
+    assert compile_pattern.cache_info().hits == 2
+
+
+@pytest.mark.parametrize("operator, value, variables, expected_value", [
+    (":-", "d", {"v": ""}, "d"),
+    ("-", "d", {"v": ""}, ""),
+    ("-", "d", {}, "d"),
+    (":+", "alt", {"v": ""}, ""),
+    ("+", "alt", {"v": ""}, "alt"),
+    ("+", "alt", {}, ""),
+    (":=", "d", {"v": ""}, "d"),
+    ("=", "d", {"v": "x"}, "x"),
+    ("#", "*", {}, ""),
+])
+def test_default_values(operator, value, variables, expected_value):
+    assert expand_parameter("v", operator, value, variables) == expected_value
+
+
+@pytest.mark.parametrize("command_line, expected_output", [
+    ("x=archive.tar.gz; echo ${x%%.*} ${x##*.} ${x%.*}",
+     "archive gz archive.tar\n"),
+    ("y=; echo ${y:-d} ${y-d} ${z-d} ${z:-d}", "d d d\n"),
+    ("echo ${z:=v} $z", "v v\n"),
+    ("y=; echo ${y:+alt} ${y+alt} ${z+alt}.", "alt .\n"),
+    ("p=/usr/local/bin:/usr/bin:/bin; echo \"${p##*:}\" \"${p%%:*}\"",
+     "/bin /usr/local/bin\n"),
+])
+def test_expansion_in_shell(run_shell, command_line, expected_output):
+    assert run_shell(command_line) == expected_output
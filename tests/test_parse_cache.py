@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+from history_store import shell_history
+from parse_cache import Parse_Cache, parse_input_string
+import pytest
+
+
+@pytest.fixture
+def parse_cache():
+    return Parse_Cache(max_size=2)
+
+
+def test_repeated_line_is_reused(parse_cache):
+    command_list, input_string = parse_cache.parse("echo a | cat; ls")
+    assert input_string == "echo a | cat; ls"
+    assert parse_cache.parse("echo a | cat; ls") == (command_list,
+                                                     "echo a | cat; ls")
+    assert parse_cache.parse("echo a | cat; ls")[0] is command_list
+    statistics = parse_cache.get_statistics()
+    assert (statistics["hits"], statistics["misses"]) == (2, 1)
+
+
+def test_cached_result_matches_parser(parse_cache):
+    input_string = "x=1 echo $x && (cd /; pwd) > out; echo $(ls) | cat"
+    parse_cache.parse(input_string)
+    assert ([str(command) for command in parse_cache.parse(input_string)[0]]
+            == [str(command)
+                for command in parse_input_string(input_string)[0]])
+
+
+def test_least_recently_used_line_is_dropped(parse_cache):
+    parse_cache.parse("echo a")
+    parse_cache.parse("echo b")
+    parse_cache.parse("echo a")
+    parse_cache.parse("echo c")
+    assert list(parse_cache.entry_dict) == ["echo a", "echo c"]
+    parse_cache.parse("echo b")
+    assert parse_cache.get_statistics()["misses"] == 4
+
+
+def test_history_expansion_bypasses_cache(parse_cache, monkeypatch):
+    monkeypatch.setattr(shell_history, "expansion_enabled", True)
+    monkeypatch.setattr(shell_history, "history_file", None)
+    monkeypatch.setattr(shell_history, "command_list", [])
+    monkeypatch.setattr(shell_history, "first_index", 0)
+    monkeypatch.setattr(shell_history, "prefix_tree", [{}, -1])
+    shell_history.append("echo first")
+    assert parse_cache.parse("!e")[1] == "echo first"
+    shell_history.append("echo second")
+    assert parse_cache.parse("!e")[1] == "echo second"
+    statistics = parse_cache.get_statistics()
+    assert (statistics["bypasses"], statistics["entries"]) == (2, 0)
+
+
+def test_exclamation_mark_cached_without_expansion(parse_cache,
+                                                   monkeypatch):
+    monkeypatch.setattr(shell_history, "expansion_enabled", False)
+    parse_cache.parse("echo hi!")
+    assert parse_cache.parse("echo hi!")[1] == "echo hi!"
+    statistics = parse_cache.get_statistics()
+    assert (statistics["hits"], statistics["bypasses"]) == (1, 0)
+
+
+def test_clear(parse_cache):
+    parse_cache.parse("echo a")
+    parse_cache.parse("echo a")
+    parse_cache.clear()
+    assert parse_cache.get_statistics() == {"hits": 0, "misses": 0,
+                                            "bypasses": 0, "entries": 0,
+                                            "max_size": 2}
+
+
+@pytest.mark.parametrize("command_line, expected_output", [
+    ("x=1\necho $x\nx=2\necho $x", "1\n2\n"),
+    ("name=a\necho $name > f\nname=b\necho $name >> f\ncat f", "a\nb\n"),
+    ("echo hi!\necho hi!\nparse-cache",
+     "hi!\nhi!\nentries   2/512\nhits      1\nmisses    2\nbypasses  0\n"
+     "hit rate  33.3%\n"),
+    ("echo a\nparse-cache -r\nparse-cache",
+     "a\nentries   1/512\nhits      0\nmisses    1\nbypasses  0\n"
+     "hit rate  0.0%\n"),
+])
+def test_cached_lines_in_shell(run_shell, command_line, expected_output):
+    assert run_shell(command_line) == expected_output
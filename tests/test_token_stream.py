@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+from naive_lexer import get_token_list, get_token_stream
+from command_splitting import get_command_list
+from token_definition import Token_Stream, Word_Token
+from utility import set_continuation_reader
+import pytest
+
+
+def describe(token_list):
+    return [str(command) for command in get_command_list(token_list)]
+
+
+@pytest.mark.parametrize("input_string", [
+    "echo a",
+    "grep -e \"pattern $HOME\" file.txt | sort -u > out.log && echo done",
+    "ls -l ${DIR:-/tmp} 'x y'; echo $(echo hi) `pwd` $((1+2)) &",
+    "(cd /tmp; ls) | cat >> log || echo failed",
+    "echo a\necho b",
+])
+def test_stream_builds_same_commands(input_string):
+    token_stream = get_token_stream(input_string)[0]
+    assert isinstance(token_stream, Token_Stream)
+    assert describe(token_stream) == describe(get_token_list(input_string)[0])
+
+
+def test_stream_keeps_text_tokens_as_offsets():
+    token_stream = get_token_stream("echo a | wc -c > out")[0]
+    assert not token_stream.object_list
+    assert [token_stream.get_text(index)
+            for index in range(len(token_stream))] == [
+        "echo", " ", "a", " ", "|", " ", "wc", " ", "-c", " ", ">", " ", "out"
+    ]
+
+
+def test_stream_shares_operators_and_separators():
+    first_list = list(get_token_stream("a | b")[0])
+    second_list = list(get_token_stream("c | d")[0])
+    assert first_list[1] is second_list[1]
+    assert first_list[2] is second_list[2]
+    assert isinstance(first_list[0], Word_Token)
+
+
+def test_stream_reads_here_document():
+    line_list = iter(["body $X", "END"])
+    previous_reader = set_continuation_reader(lambda: next(line_list))
+    try:
+        token_stream = get_token_stream("cat <<END | wc -l")[0]
+    finally:
+        set_continuation_reader(previous_reader)
+    command_list = get_command_list(token_stream)
+    here_document_token = command_list[0].left_command.stdin[1]
+    assert here_document_token.content == ["body $X\n"]
+    assert here_document_token.original_string == "END"
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+from variable_store import Variable_Store
+
+
+def test_scope_changes_are_dropped():
+    variables = Variable_Store({"HOME": "/root", "PATH": "/bin"})
+    variables["X"] = "1"
+    variables.push_scope()
+    variables["X"] = "2"
+    variables.set("Y", "3", True)
+    variables.unset("HOME")
+    assert variables.get("X") == "2"
+    assert "HOME" not in variables
+    assert variables.get_exported() == {"PATH": "/bin", "Y": "3"}
+    assert sorted(variables) == ["PATH", "X", "Y"]
+    variables.pop_scope()
+    assert variables.get("X") == "1"
+    assert "Y" not in variables
+    assert variables.get_exported() == {"HOME": "/root", "PATH": "/bin"}
+
+
+def test_scope_frame_only_keeps_its_changes():
+    variables = Variable_Store({"NAME%d" % index: str(index)
+                                for index in range(1000)})
+    variables.push_scope()
+    variables["NAME1"] = "changed"
+    assert variables.frame_list[-1] == {"NAME1": ("changed", True)}
+    assert variables["NAME1"] == "changed"
+    assert variables["NAME2"] == "2"
+    assert len(variables) == 1000
+
+
+def test_nested_scopes():
+    variables = Variable_Store()
+    variables["X"] = "outer"
+    variables.push_scope()
+    variables["X"] = "middle"
+    variables.push_scope()
+    variables.unset("X")
+    assert variables.get("X") is None
+    variables.pop_scope()
+    assert variables["X"] == "middle"
+    variables.pop_scope()
+    assert variables["X"] == "outer"
+
+
+def test_generations_follow_changes():
+    variables = Variable_Store({"PATH": "/bin"})
+    generation = variables.generation
+    export_generation = variables.export_generation
+    variables["X"] = "1"
+    assert variables.generation > generation
+    assert variables.export_generation == export_generation
+    variables.export("X")
+    assert variables.export_generation > export_generation
+    assert variables.is_exported("X")
@@ -1,5 +1,10 @@
 #!/usr/bin/env python3
+from array import array
+
+
 class Token:
+    __slots__ = ("content", "original_string")
+
     def __init__(self, content, original_string):
         self.content = content
         self.original_string = original_string
@@ -9,63 +14,137 @@ class Token:
 
 
 class Word_Token(Token):
+    __slots__ = ()
+
     def __str__(self):
         return "Word(%s)" % str(self.content)
 
 
 class Double_Quote_Token(Token):
+    __slots__ = ()
+
     def __str__(self):
         return "Double_Quote(%s)" % ", ".join([str(item)
                                               for item in self.content])
 
 
 class Single_Quote_Token(Token):
+    __slots__ = ()
+
     def __str__(self):
         return "Single_Quote(%s)" % str(self.content)
 
 
 class Param_Expand_Token(Token):
+    __slots__ = ()
+
     def __str__(self):
         return "Param_Expand(%s)" % ", ".join([str(item)
                                               for item in self.content])
 
 
 class Operator_Token(Token):
+    __slots__ = ()
+
     def __str__(self):
         return "Operator(%s)" % str(self.content)
 
 
 class Variable_Token(Token):
+    __slots__ = ()
+
     def __str__(self):
         return "Variable(%s)" % str(self.content)
 
 
 class Param_Value_Token(Token):
+    __slots__ = ()
+
     def __str__(self):
         return "Param_Value(%s)" % ", ".join([str(item)
                                              for item in self.content])
 
 
 class Subshell_Token(Token):
+    # The tokens inside the parentheses, kept by the lexer, and the command
+    # list built from them when the command line is parsed
+    __slots__ = ("token_list", "command_list")
+
+    def __init__(self, content, original_string):
+        Token.__init__(self, content, original_string)
+        self.token_list = None
+        self.command_list = None
+
     def __str__(self):
         return "Subshell(%s)" % self.content
 
 
+class Command_Substitution_Token(Token):
+    # The content is the whole substitution, with its $( ) or backquotes.
+    # As in a subshell, the tokens of the commands are kept by the lexer and
+    # the command list is built from them when it is first expanded
+    __slots__ = ("token_list", "command_list")
+
+    def __init__(self, content, original_string):
+        Token.__init__(self, content, original_string)
+        self.token_list = None
+        self.command_list = None
+
+    def __str__(self):
+        return "Command_Substitution(%s)" % self.content
+
+
+class Arithmetic_Token(Token):
+    # The content is the tokens of the expression, lexed as the content of a
+    # double quote since its parameters are expanded before it is evaluated
+    __slots__ = ()
+
+    def __str__(self):
+        return "Arithmetic(%s)" % ", ".join([str(item)
+                                            for item in self.content])
+
+
+class Here_Document_Token(Token):
+    # The content is the list of the lines of the body, the original string
+    # is the delimiter. The body is expanded if the delimiter isn't quoted,
+    # its encoded lines are kept when it is written as it is
+    __slots__ = ("is_expanded", "data_list")
+
+    def __init__(self, content, original_string, is_expanded):
+        Token.__init__(self, content, original_string)
+        self.is_expanded = is_expanded
+        self.data_list = None
+
+    def __str__(self):
+        return "Here_Document(%s, %d lines)" % (self.original_string,
+                                                len(self.content))
+
+
 class Separator_Token(Token):
+    __slots__ = ()
+
     def __str__(self):
         return ("Seperator( )" if self.content == " "
                 else "Separator(\\n)")
 
 
 class Command:
+    __slots__ = ("token_list", "stdin", "stdout", "argument_string",
+                 "argument_list", "plan")
+
     def __init__(self, token_list, stdin=None, stdout=None):
         self.token_list = token_list
         self.stdin = stdin
         self.stdout = stdout
         self.argument_string = []
+        # The compiled expansions of the command, created when it is first
+        # executed
+        self.plan = None
 
     def is_empty(self):
-        return False if len(self.token_list) else True
+        # A command made of separators only is empty
+        return not any(not isinstance(token, Separator_Token)
+                       for token in self.token_list)
 
     def __str__(self):
         return "Command(TOKEN = (%s), STDIN = (%s), STDOUT = (%s))" % (
@@ -78,6 +157,8 @@ class Command:
 
 
 class Binary_Command:
+    __slots__ = ("left_command", "right_command", "stdin", "stdout")
+
     def __init__(self, left_command, right_command=None,
                  stdin=None, stdout=None):
         self.left_command = left_command
@@ -90,6 +171,8 @@ class Binary_Command:
 
 
 class Or_Command(Binary_Command):
+    __slots__ = ()
+
     def __str__(self):
         return "Or(%s, %s)" % (
             str(self.left_command),
@@ -98,6 +181,8 @@ class Or_Command(Binary_Command):
 
 
 class And_Command(Binary_Command):
+    __slots__ = ()
+
     def __str__(self):
         return "And(%s, %s)" % (
             str(self.left_command),
@@ -106,8 +191,147 @@ class And_Command(Binary_Command):
 
 
 class Pipe_Command(Binary_Command):
+    __slots__ = ()
+
     def __str__(self):
         return "Pipe(%s, %s)" % (
             str(self.left_command),
             str(self.right_command)
         )
+
+
+class Background_Command(Binary_Command):
+    # The left command is run in the background, there is no right command
+    __slots__ = ()
+
+    def __str__(self):
+        return "Background(%s)" % str(self.left_command)
+
+
+class Token_Stream:
+    """
+    Compact token list. Words, operators and separators are stored as a kind
+    code and the offsets of their text in the source string, the other
+    tokens are kept as objects. Tokens are only created when they are
+    accessed, and get_command_list goes through the stream once.
+    """
+    __slots__ = ("source", "kind_array", "begin_array", "end_array",
+                 "object_list")
+    # Kind codes of the tokens
+    WORD = 0
+    OPERATOR = 1
+    SEPARATOR = 2
+    OBJECT = 3
+
+    def __init__(self, source):
+        self.source = source
+        self.kind_array = array("B")
+        # For the OBJECT kind, the begin offset is the index of the token in
+        # the object list
+        self.begin_array = array("l")
+        self.end_array = array("l")
+        self.object_list = []
+
+    def __len__(self):
+        return len(self.kind_array)
+
+    def append_text(self, kind, begin, end):
+        """
+        Add a token whose content is a slice of the source string
+        """
+        self.kind_array.append(kind)
+        self.begin_array.append(begin)
+        self.end_array.append(end)
+
+    def append_object(self, token):
+        """
+        Add a token that cannot be represented by a slice of the source
+        string
+        """
+        self.kind_array.append(self.OBJECT)
+        self.begin_array.append(len(self.object_list))
+        self.end_array.append(0)
+        self.object_list.append(token)
+
+    def get_kind(self, index):
+        return self.kind_array[index]
+
+    def get_text(self, index):
+        """
+        Get the content of a token without creating it
+        """
+        if self.kind_array[index] == self.OBJECT:
+            return self.object_list[self.begin_array[index]].content
+        return self.source[self.begin_array[index]:self.end_array[index]]
+
+    def replace(self, index, token):
+        """
+        Replace a token by a token object
+        """
+        self.kind_array[index] = self.OBJECT
+        self.begin_array[index] = len(self.object_list)
+        self.end_array[index] = 0
+        self.object_list.append(token)
+
+    def delete(self, begin, end):
+        """
+        Remove the tokens from the begin index to the end index
+        """
+        del self.kind_array[begin:end]
+        del self.begin_array[begin:end]
+        del self.end_array[begin:end]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[item] for item in range(*index.indices(len(self)))]
+        kind = self.kind_array[index]
+        if kind == self.OBJECT:
+            return self.object_list[self.begin_array[index]]
+        return create_text_token(
+            kind, self.source[self.begin_array[index]:self.end_array[index]]
+        )
+
+    def __iter__(self):
+        # The parser goes through the tokens once, so a word token is only
+        # created when the parser reaches it and the operators and the
+        # separators are shared
+        source = self.source
+        object_list = self.object_list
+        for kind, begin, end in zip(self.kind_array, self.begin_array,
+                                    self.end_array):
+            if kind == self.OBJECT:
+                yield object_list[begin]
+            elif kind == self.WORD:
+                content = source[begin:end]
+                yield Word_Token(content, content)
+            else:
+                yield create_text_token(kind, source[begin:end])
+
+
+# Operator and separator tokens never change, so a single token is shared
+# for each content
+shared_token_dict = {}
+
+
+def create_text_token(kind, content):
+    """
+    Create the token of a word, operator or separator
+
+    Input:
+        - kind: the kind code of the token in a Token_Stream
+        - content: the content of the token
+
+    Output:
+        - The token, shared with the other tokens of the same content if it
+        is an operator or a separator
+    """
+    if kind == Token_Stream.WORD:
+        return Word_Token(content, content)
+    try:
+        return shared_token_dict[kind, content]
+    except KeyError:
+        token = (Operator_Token(content, content)
+                 if kind == Token_Stream.OPERATOR else
+                 Separator_Token(content, content))
+        shared_token_dict[kind, content] = token
+        return token
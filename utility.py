@@ -1,5 +1,5 @@
 #!/usr/bin/env python3
-from readline import get_current_history_length, get_history_item
+from history_store import shell_history
 
 
 def read_file(file_name):
@@ -10,13 +10,65 @@ def read_file(file_name):
 
 
 def get_error_message(argument, error, command_name=None):
-    return ""
+    """
+    Get the error message printed by the shell when an OSError is raised
+
+    Input:
+        - argument: the argument that caused the error
+        - error: the class of the error
+        - command_name: the name of the command that raised the error
+
+    Output:
+        - The error message
+    """
+    error_descriptions = {
+        PermissionError: "Permission denied",
+        FileNotFoundError: "No such file or directory",
+        NotADirectoryError: "Not a directory",
+        IsADirectoryError: "Is a directory"
+    }
+    return "intek-sh: %s%s: %s" % (
+        command_name + ": " if command_name else "",
+        argument,
+        error_descriptions.get(error, "Input/output error")
+    )
 # def write_file(file_name, mode="w+"):
 #     with open(file_name, mode) as write
 
 
 def get_history_log():
-    history_log = []
-    for index in range(1, get_current_history_length() + 1):
-        history_log.append(get_history_item(index))
-    return history_log
\ No newline at end of file
+    return shell_history.get_log()
+
+
+# Function called to read the next line when a command is incomplete, the
+# user is asked for it if there is none
+continuation_reader = None
+
+
+def set_continuation_reader(reader):
+    """
+    Change the function that reads the next line of an incomplete command
+
+    Input:
+        - reader: a function without arguments that returns the next line or
+        raises EOFError, None to ask the user
+
+    Output:
+        - The previous function
+    """
+    global continuation_reader
+    previous_reader = continuation_reader
+    continuation_reader = reader
+    return previous_reader
+
+
+def read_continuation_line():
+    """
+    Read the next line of an incomplete command
+
+    Output:
+        - The next line without its newline character
+    """
+    if continuation_reader is None:
+        return input(">")
+    return continuation_reader()
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+
+
+# Value of a variable unset in a scope, which hides the variable of the
+# outer scopes
+UNSET = None
+
+
+class Variable_Store:
+    """
+    Variables of the shell with an exported flag for each of them. Each
+    scope is a small frame dictionary that only keeps the variables changed
+    in the scope, a lookup goes through the frames from the innermost one.
+    Ending a scope drops its frame.
+    The generation number increases on every change, so that the data
+    derived from the variables can be cached. The export generation only
+    increases when the exported variables change.
+    """
+
+    def __init__(self, environ=None):
+        # Dictionary maps the name of a variable to a tuple of its value and
+        # whether it is exported
+        self.variable_dict = {name: (value, True)
+                              for name, value in (environ or {}).items()}
+        # Frames of the scopes, the last one is the current scope whose
+        # dictionary is variable_dict
+        self.frame_list = [self.variable_dict]
+        self.generation = 0
+        self.export_generation = 0
+
+    #################################
+    #            Lookup             #
+    #################################
+
+    def lookup(self, name):
+        """
+        Get the tuple of the value of a variable and its exported flag, None
+        if it isn't set
+        """
+        if len(self.frame_list) == 1:
+            return self.variable_dict.get(name)
+        for frame in reversed(self.frame_list):
+            if name in frame:
+                return frame[name]
+        return UNSET
+
+    def get_merged_dict(self):
+        """
+        Get the dictionary of every variable that is set, through the frames
+        of the scopes
+        """
+        if len(self.frame_list) == 1:
+            return self.variable_dict
+        merged_dict = {}
+        for frame in self.frame_list:
+            merged_dict.update(frame)
+        return {name: entry for name, entry in merged_dict.items()
+                if entry is not UNSET}
+
+    def __contains__(self, name):
+        return self.lookup(name) is not UNSET
+
+    def __getitem__(self, name):
+        entry = self.lookup(name)
+        if entry is UNSET:
+            raise KeyError(name)
+        return entry[0]
+
+    def __iter__(self):
+        return iter(self.get_merged_dict())
+
+    def __len__(self):
+        return len(self.get_merged_dict())
+
+    def get(self, name, default=None):
+        entry = self.lookup(name)
+        return default if entry is UNSET else entry[0]
+
+    def is_exported(self, name):
+        entry = self.lookup(name)
+        return entry is not UNSET and entry[1]
+
+    def items(self):
+        return ((name, value)
+                for name, (value, _) in self.get_merged_dict().items())
+
+    def get_exported(self):
+        """
+        Get the exported variables
+
+        Output:
+            - A dictionary maps the name of each exported variable to its
+            value
+        """
+        return {name: value
+                for name, (value, exported) in self.get_merged_dict().items()
+                if exported}
+
+    #################################
+    #            Changes            #
+    #################################
+
+    def __setitem__(self, name, value):
+        self.set(name, value)
+
+    def set(self, name, value, exported=None):
+        """
+        Change the value of a variable
+
+        Input:
+            - name: the name of the variable
+            - value: the new value
+            - exported: whether the variable is exported, None to keep the
+            current flag
+        """
+        was_exported = self.is_exported(name)
+        if exported is None:
+            exported = was_exported
+        self.variable_dict[name] = (value, exported)
+        self.generation += 1
+        if exported or was_exported:
+            self.export_generation += 1
+
+    def export(self, name, value=None):
+        """
+        Export a variable
+
+        Input:
+            - name: the name of the variable
+            - value: the new value, None to export the current value
+
+        Output:
+            - False if there is no value to export, True otherwise
+        """
+        if value is None:
+            entry = self.lookup(name)
+            if entry is UNSET:
+                return False
+            value = entry[0]
+        self.variable_dict[name] = (value, True)
+        self.generation += 1
+        self.export_generation += 1
+        return True
+
+    def unset(self, name):
+        """
+        Remove a variable
+
+        Output:
+            - True if the variable existed, False otherwise
+        """
+        entry = self.lookup(name)
+        if entry is UNSET:
+            return False
+        if entry[1]:
+            self.export_generation += 1
+        # The outer scopes keep the variable, it is only hidden in this one
+        if len(self.frame_list) == 1:
+            del self.variable_dict[name]
+        else:
+            self.variable_dict[name] = UNSET
+        self.generation += 1
+        return True
+
+    def restore(self, name, entry):
+        """
+        Put back a variable saved by lookup
+
+        Input:
+            - name: the name of the variable
+            - entry: the tuple returned by lookup, None to unset it
+        """
+        if entry is UNSET:
+            self.unset(name)
+        else:
+            self.set(name, *entry)
+
+    #################################
+    #            Scopes             #
+    #################################
+
+    def push_scope(self):
+        """
+        Start a scope whose changes are dropped when it ends
+        """
+        self.variable_dict = {}
+        self.frame_list.append(self.variable_dict)
+
+    def pop_scope(self):
+        """
+        End the current scope and restore the variables of the outer one
+        """
+        frame = self.frame_list.pop()
+        self.variable_dict = self.frame_list[-1]
+        if frame:
+            self.generation += 1
+            self.export_generation += 1